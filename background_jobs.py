@@ -0,0 +1,94 @@
+# background_jobs.py
+# Registry of background jobs run on a shared thread pool.
+# Routes submit slow work (LLM extraction) and answer immediately with a job ID; the
+# client polls the job (or the data the job stores) for the result.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Parallel jobs
+DEFAULT_MAX_WORKERS = 4
+# Finished jobs remembered for polling (oldest are forgotten first)
+DEFAULT_MAX_JOBS = 200
+
+class JobRegistry:
+    """
+    Runs callables on a thread pool and keeps their state by job ID.
+    Job states: queued -> running -> done | error.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_jobs=DEFAULT_MAX_JOBS, name="job"):
+        """
+        Parameters:
+        - max_workers: Thread pool size
+        - max_jobs: Jobs kept in the registry
+        - name: Thread name prefix
+        """
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()     # job_id -> job dict
+        self._futures = {}             # job_id -> Future, while the job exists
+
+    def submit(self, kind, fn, *args):
+        """
+        Queue fn(*args)
+
+        Parameters:
+        - kind: Label reported with the job (e.g. "coding:Gemini")
+
+        Returns:
+        - Job ID
+        """
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "kind": kind, "state": "queued", "result": None, "error": None,
+               "created_at": time.time(), "elapsed_ms": None}
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                old_id, _ = self._jobs.popitem(last=False)
+                self._futures.pop(old_id, None)
+            self._futures[job_id] = self._executor.submit(self._run, job, fn, args)
+        return job_id
+
+    def _run(self, job, fn, args):
+        """Worker: run the job and record its outcome"""
+        start = time.perf_counter()
+        with self._lock:
+            job["state"] = "running"
+        try:
+            result = fn(*args)
+            with self._lock:
+                job["result"] = result
+                job["state"] = "done"
+        except Exception as e:
+            print(f"Error in background {job['kind']} job {job['id']}: {e}")
+            with self._lock:
+                job["error"] = str(e)
+                job["state"] = "error"
+        finally:
+            with self._lock:
+                job["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+
+    def get(self, job_id):
+        """Copy of a job's state, or None if the ID is unknown (or forgotten)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Block until a job finishes
+
+        Returns:
+        - The job's state (see get), or None if the ID is unknown
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass  # recorded in the job (or still running after timeout)
+        return self.get(job_id)
@@ -1,12 +1,14 @@
 import os
 import base64
-import requests
 import json
 from typing import Optional, Dict
 
 # Import the specific prompt function needed for Claude React solutions
 # (We might add a dedicated prompt file for Claude later if needed)
 from gemini_api.prompts import get_react_solution_prompt_for_claude
+from image_encoding import CapturedImage, image_base64_for_provider
+from screenshot_ocr import confident_ocr_text, ocr_extraction_prompt, OCR_MODE
+from provider_clients import post_json, post_json_events
 
 # --- Constants ---
 CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
@@ -67,36 +69,62 @@ Please provide the complete solution following these instructions. Ensure the ou
 
 # --- Helper Functions ---
 
-def encode_image_to_base64(image_path: str) -> str:
+def encode_image_to_base64(image_path) -> str:
     """
     Encode an image file to base64 string
     
     Parameters:
-    - image_path: Path to the image file
+    - image_path: Path to the image file, or an in-memory CapturedImage
     
     Returns:
     - Base64 encoded string of the image
     """
+    if isinstance(image_path, CapturedImage):
+        return image_path.base64()[0]
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
-def extract_coding_question(image_path: str) -> Optional[str]:
+def extract_coding_question(image_path) -> Optional[str]:
     """
     Send an image to Claude Sonnet API to extract a coding question
     
     Parameters:
-    - image_path: Path to the screenshot image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
     
     Returns:
     - Extracted coding question as a string, or None if extraction failed
     """
+    # Local OCR fast path (OCR_MODE): confident text skips the vision call
+    ocr_text = confident_ocr_text(image_path)
+    if ocr_text and OCR_MODE == "skip":
+        print("Returning OCR text without calling Claude")
+        return ocr_text
+
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         print("Error: ANTHROPIC_API_KEY environment variable not set")
         return None
     
-    # Encode the image to base64
-    base64_image = encode_image_to_base64(image_path)
+    if ocr_text:
+        # Text-only request built from the OCR result
+        content = [{"type": "text", "text": ocr_extraction_prompt(ocr_text)}]
+    else:
+        # Encode the image to base64 (downscaled and encoded for Claude)
+        base64_image, media_type = image_base64_for_provider(image_path, "claude")
+        content = [
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": media_type,
+                    "data": base64_image
+                }
+            },
+            {
+                "type": "text",
+                "text": "Extract the coding question from this screenshot. Return only the question text without any additional commentary or explanation."
+            }
+        ]
     
     # Prepare the API request
     headers = {
@@ -105,67 +133,87 @@ def extract_coding_question(image_path: str) -> Optional[str]:
         "content-type": "application/json"
     }
     
-    # Construct the message with the image
+    # Construct the message (with the image, unless OCR text is sent)
     payload = {
         "model": CLAUDE_DEFAULT_MODEL, # Use constant
         "max_tokens": 1000,
         "messages": [
             {
                 "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/png",
-                            "data": base64_image
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": "Extract the coding question from this screenshot. Return only the question text without any additional commentary or explanation."
-                    }
-                ]
+                "content": content
             }
         ]
     }
     
     try:
-        # Make the API request
-        response = requests.post(
-            CLAUDE_API_URL, # Use constant
-            headers=headers,
-            json=payload
-        )
+        # Make the API request (pooled keep-alive connection, with timeouts)
+        response_text = _request_claude_text(headers, payload)
         
         # Check if the request was successful
-        if response.status_code == 200:
-            response_data = response.json()
+        if response_text is not None:
             # Extract the question from Claude's response
-            extracted_question = response_data["content"][0]["text"]
+            extracted_question = response_text
             return extracted_question.strip()
         else:
-            print(f"Error from Claude API: {response.status_code}")
-            print(response.text)
-            return None
+            return None # Error printed by _request_claude_text
     
     except Exception as e:
         print(f"Exception when calling Claude API: {str(e)}")
         return None
 
-def get_solution_for_question(question: str) -> Optional[Dict[str, str]]:
+def _request_claude_text(headers, payload, on_token=None, label=None):
+    """
+    Send a Messages API request and return the response text
+
+    Parameters:
+    - headers: Request headers
+    - payload: Messages API payload
+    - on_token: Optional callable receiving each text delta as it is generated (streams the response)
+    - label: Request name for error messages
+
+    Returns:
+    - Response text, or None if Claude returned an error
+    """
+    label = f" ({label})" if label else ""
+    if on_token is None:
+        response = post_json(CLAUDE_API_URL, headers=headers, payload=payload)
+        if response.status_code == 200:
+            return response.json()["content"][0]["text"]
+        print(f"Error from Claude API{label}: {response.status_code}")
+        print(response.text)
+        return None
+
+    # Streamed: text arrives in content_block_delta events
+    parts = []
+    try:
+        for event, data in post_json_events(CLAUDE_API_URL, headers, dict(payload, stream=True)):
+            if event == "content_block_delta":
+                delta = json.loads(data).get("delta", {})
+                if delta.get("type") == "text_delta":
+                    parts.append(delta["text"])
+                    on_token(delta["text"])
+            elif event == "error":
+                print(f"Error from Claude API stream{label}: {data}")
+                return None
+    except RuntimeError as e:
+        print(f"Error from Claude API{label}: {e}")
+        return None
+    return "".join(parts)
+
+def get_solution_for_question(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a coding question to Claude Sonnet API to get a solution
     
     Parameters:
     - question: The coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation, code, complexity, and strategy, or None if failed
     """
-    return _get_solution_with_prompt(question, _create_solution_prompt)
+    return _get_solution_with_prompt(question, _create_solution_prompt, on_token)
 
-def get_followup_solution(current_problem: str, current_code: str, transcript: str) -> Optional[Dict[str, str]]:
+def get_followup_solution(current_problem: str, current_code: str, transcript: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a follow-up request to Claude Sonnet API to get an updated solution
     
@@ -173,21 +221,24 @@ def get_followup_solution(current_problem: str, current_code: str, transcript: s
     - current_problem: The original coding problem
     - current_code: The current solution code
     - transcript: Recent transcript text containing the follow-up question
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation and updated code, or None if failed
     """
     return _get_solution_with_prompt(
         {"problem": current_problem, "code": current_code, "transcript": transcript},
-        _create_followup_prompt
+        _create_followup_prompt,
+        on_token
     )
 
-def get_react_solution(question: str) -> Optional[Dict[str, str]]:
+def get_react_solution(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a React-specific coding question to Claude Sonnet API to get a solution
     
     Parameters:
     - question: The React coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing only the 'code' field populated, or None if failed
@@ -223,17 +274,12 @@ def get_react_solution(question: str) -> Optional[Dict[str, str]]:
     # print(payload) # Avoid printing potentially large prompts
 
     try:
-        # Make the API request
-        response = requests.post(
-            CLAUDE_API_URL, # Use constant
-            headers=headers,
-            json=payload
-        )
+        # Make the API request (pooled keep-alive connection, with timeouts; streamed with on_token)
+        response_text = _request_claude_text(headers, payload, on_token)
 
         # Check if the request was successful
-        if response.status_code == 200:
-            response_data = response.json()
-            code_text = response_data["content"][0]["text"]
+        if response_text is not None:
+            code_text = response_text
             
             print("React code solution is ready")
             # print(code_text) # Avoid printing potentially large code blocks
@@ -247,15 +293,13 @@ def get_react_solution(question: str) -> Optional[Dict[str, str]]:
                 "strategy": ""
             }
         else:
-            print(f"Error from Claude API: {response.status_code}")
-            print(response.text)
-            return None
+            return None # Error printed by _request_claude_text
 
     except Exception as e:
         print(f"Exception when calling Claude API for React code solution: {str(e)}")
         return None
 
-def get_followup_solution_with_claude_react(transcript: str, react_question: str, current_solution: str) -> Optional[str]:
+def get_followup_solution_with_claude_react(transcript: str, react_question: str, current_solution: str, on_token=None) -> Optional[str]:
     """
     Send transcript, react question, and current solution to Claude to get a follow-up answer.
     Returns the raw text response.
@@ -264,6 +308,7 @@ def get_followup_solution_with_claude_react(transcript: str, react_question: str
     - transcript: Recent transcript text.
     - react_question: The current React question being discussed.
     - current_solution: The current solution code (React or standard).
+    - on_token: Optional callable receiving each text delta as it is generated.
 
     Returns:
     - Raw text response from Claude, or None if failed.
@@ -323,24 +368,17 @@ Then, provide your suggested response below that line. Do not include any other
     # print(f"Prompt: {prompt}") # Avoid printing potentially large prompts/solutions
 
     try:
-        # Make the API request
-        response = requests.post(
-            CLAUDE_API_URL, # Use constant
-            headers=headers,
-            json=payload
-        )
+        # Make the API request (pooled keep-alive connection, with timeouts; streamed with on_token)
+        response_text = _request_claude_text(headers, payload, on_token, label="React Followup")
 
         # Check if the request was successful
-        if response.status_code == 200:
-            response_data = response.json()
-            raw_response_text = response_data["content"][0]["text"]
+        if response_text is not None:
+            raw_response_text = response_text
             print("Claude React follow-up response received.")
             # print(f"Raw Response: {raw_response_text}") # Avoid printing potentially large responses
             return raw_response_text.strip() # Return the raw text
         else:
-            print(f"Error from Claude API (React Followup): {response.status_code}")
-            print(response.text)
-            return None
+            return None # Error printed by _request_claude_text
 
     except Exception as e:
         print(f"Exception when calling Claude API for React follow-up solution: {str(e)}")
@@ -348,12 +386,13 @@ Then, provide your suggested response below that line. Do not include any other
 
 # --- New Function for Design Solutions ---
 
-def get_design_solution_with_claude(question_text: str) -> Optional[str]:
+def get_design_solution_with_claude(question_text: str, on_token=None) -> Optional[str]:
     """
     Send a system design question to Claude API using the RADIO prompt.
 
     Parameters:
     - question_text: The system design question text.
+    - on_token: Optional callable receiving each text delta as it is generated.
 
     Returns:
     - Raw Markdown response from Claude, or None if failed.
@@ -389,24 +428,17 @@ def get_design_solution_with_claude(question_text: str) -> Optional[str]:
     # print(f"Full Prompt: {prompt}") # Avoid printing potentially very large prompts
 
     try:
-        # Make the API request
-        response = requests.post(
-            CLAUDE_API_URL,
-            headers=headers,
-            json=payload
-        )
+        # Make the API request (pooled keep-alive connection, with timeouts; streamed with on_token)
+        response_text = _request_claude_text(headers, payload, on_token, label="Design Solution")
 
         # Check if the request was successful
-        if response.status_code == 200:
-            response_data = response.json()
-            solution_markdown = response_data["content"][0]["text"]
+        if response_text is not None:
+            solution_markdown = response_text
             print("✅ Claude design solution response received successfully.")
             # print(f"Raw Response: {solution_markdown[:500]}...") # Avoid printing large responses
             return solution_markdown.strip() # Return the raw Markdown
         else:
-            print(f"Error from Claude API (Design Solution): {response.status_code}")
-            print(response.text)
-            return None
+            return None # Error printed by _request_claude_text
 
     except Exception as e:
         print(f"Exception when calling Claude API for design solution: {str(e)}")
@@ -483,13 +515,14 @@ IMPORTANT: Format your response as a valid JSON object with the following struct
 Make sure to properly escape any special characters in the JSON strings, especially quotes and newlines.
 """
 
-def _get_solution_with_prompt(context, prompt_creator) -> Optional[Dict[str, str]]:
+def _get_solution_with_prompt(context, prompt_creator, on_token=None) -> Optional[Dict[str, str]]:
     """
     Generic function to get a solution from Claude API
     
     Parameters:
     - context: The context for the prompt (string or dict)
     - prompt_creator: Function to create the prompt
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing solution components, or None if failed
@@ -524,17 +557,12 @@ def _get_solution_with_prompt(context, prompt_creator) -> Optional[Dict[str, str
     print("Get solution with Claude");
     print(payload)
     try:
-        # Make the API request
-        response = requests.post(
-            CLAUDE_API_URL, # Use constant
-            headers=headers,
-            json=payload
-        )
+        # Make the API request (pooled keep-alive connection, with timeouts; streamed with on_token)
+        response_text = _request_claude_text(headers, payload, on_token)
         
         # Check if the request was successful
-        if response.status_code == 200:
-            response_data = response.json()
-            solution_text = response_data["content"][0]["text"]
+        if response_text is not None:
+            solution_text = response_text
             
             print("solution is ready")
             print(solution_text)
@@ -612,9 +640,7 @@ def _get_solution_with_prompt(context, prompt_creator) -> Optional[Dict[str, str
                 return fallback_result
 
         else:
-            print(f"Error from Claude API: {response.status_code}")
-            print(response.text)
-            return None
+            return None # Error printed by _request_claude_text
     
     except Exception as e:
         print(f"Exception when calling Claude API for solution: {str(e)}")
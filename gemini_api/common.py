@@ -1,9 +1,12 @@
 import os
 import base64
-import requests
+import io
 import json
 from typing import Optional, Dict
 import google.generativeai as genai
+from image_encoding import prepare_image_for_provider
+from provider_uploads import UploadCache
+from provider_clients import configure_gemini_client, GEMINI_REQUEST_OPTIONS
 
 def configure_gemini() -> bool:
     """
@@ -17,5 +20,56 @@ def configure_gemini() -> bool:
         print("Error: GEMINI_API_KEY environment variable not set")
         return False
     
-    genai.configure(api_key=api_key)
+    # Configured once per key, so the SDK keeps its client (and open connection)
+    configure_gemini_client(genai, api_key)
     return True
+
+class GeminiModel(genai.GenerativeModel):
+    """
+    GenerativeModel whose generate_content calls time out after the shared read timeout
+    and can stream: with on_token, each text delta is passed to it as it is generated and
+    the returned response holds the complete text, as without streaming.
+    """
+    def generate_content(self, contents, on_token=None, **kwargs):
+        kwargs.setdefault("request_options", GEMINI_REQUEST_OPTIONS)
+        if on_token is None:
+            return super().generate_content(contents, **kwargs)
+        response = super().generate_content(contents, stream=True, **kwargs)
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # chunk without text (e.g. safety metadata)
+            if text:
+                on_token(text)
+        return response
+
+# Gemini keeps uploaded files for 48 hours; references are reused for a little less
+GEMINI_UPLOAD_TTL_SECONDS = 47 * 3600
+
+def _upload_to_gemini(data, mime_type):
+    """Upload image bytes through the Gemini File API"""
+    return genai.upload_file(io.BytesIO(data), mime_type=mime_type)
+
+gemini_uploads = UploadCache(_upload_to_gemini, GEMINI_UPLOAD_TTL_SECONDS, name="Gemini")
+
+def generate_content_with_image(model, prompt, image_path):
+    """
+    Ask a Gemini model about a screenshot
+
+    Parameters:
+    - model: GeminiModel
+    - prompt: Instruction sent with the image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
+
+    Returns:
+    - The response. The image is uploaded once and referenced; it is sent inline if
+      uploading is off, the image is small, the upload failed or Gemini rejects the
+      uploaded file (expired or deleted)
+    """
+    image_data, mime_type = prepare_image_for_provider(image_path, "gemini")
+    return gemini_uploads.call_with_reference(
+        image_data, mime_type,
+        lambda uploaded: model.generate_content([prompt, uploaded]),
+        lambda: model.generate_content([prompt, {"mime_type": mime_type, "data": image_data}])
+    )
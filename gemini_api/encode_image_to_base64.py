@@ -1,14 +1,17 @@
 from .common import base64
+from image_encoding import CapturedImage
 
-def encode_image_to_base64(image_path: str) -> str:
+def encode_image_to_base64(image_path) -> str:
     """
     Encode an image file to base64 string
     
     Parameters:
-    - image_path: Path to the image file
+    - image_path: Path to the image file, or an in-memory CapturedImage
     
     Returns:
     - Base64 encoded string of the image
     """
+    if isinstance(image_path, CapturedImage):
+        return image_path.base64()[0]
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
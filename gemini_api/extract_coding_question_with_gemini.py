@@ -1,34 +1,38 @@
 from typing import Optional
-from .common import genai, configure_gemini
+from .common import configure_gemini, generate_content_with_image, GeminiModel
+from screenshot_ocr import confident_ocr_text, ocr_extraction_prompt, OCR_MODE
 from .prompts import get_coding_question_extraction_prompt
 
 
-def extract_coding_question_with_gemini(image_path: str) -> Optional[str]:
+def extract_coding_question_with_gemini(image_path) -> Optional[str]:
     """
     Send an image to Google Gemini API to extract a coding question
     
     Parameters:
-    - image_path: Path to the screenshot image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
     
     Returns:
     - Extracted coding question as a string, or None if extraction failed
     """
+    # Local OCR fast path (OCR_MODE): confident text skips the vision call
+    ocr_text = confident_ocr_text(image_path)
+    if ocr_text and OCR_MODE == "skip":
+        print("Returning OCR text without calling Gemini")
+        return ocr_text
+
     if not configure_gemini():
         return None
     
     try:
-        # Load the image
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-        
         # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = GeminiModel('gemini-2.0-flash')
         
-        # Create a prompt with the image
-        response = model.generate_content([
-            get_coding_question_extraction_prompt(),
-            {"mime_type": "image/png", "data": image_data}
-        ])
+        if ocr_text:
+            # Text-only request built from the OCR result
+            response = model.generate_content(ocr_extraction_prompt(ocr_text))
+        else:
+            # Send the image, downscaled and encoded for Gemini (uploaded once, then referenced)
+            response = generate_content_with_image(model, get_coding_question_extraction_prompt(), image_path)
         
         # Extract the question from Gemini's response
         if response and response.text:
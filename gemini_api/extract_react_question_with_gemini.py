@@ -1,14 +1,14 @@
 from typing import Optional
-from .common import genai, configure_gemini
+from .common import configure_gemini, generate_content_with_image, GeminiModel
 from .prompts import get_react_question_extraction_prompt
 
 
-def extract_react_question_with_gemini(image_path: str) -> Optional[str]:
+def extract_react_question_with_gemini(image_path) -> Optional[str]:
     """
     Send an image to Google Gemini API to extract a React-specific question
     
     Parameters:
-    - image_path: Path to the screenshot image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
     
     Returns:
     - Extracted React question as a string, or None if extraction failed
@@ -17,18 +17,11 @@ def extract_react_question_with_gemini(image_path: str) -> Optional[str]:
         return None
     
     try:
-        # Load the image
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-        
         # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = GeminiModel('gemini-2.0-flash')
         
-        # Create a prompt with the image
-        response = model.generate_content([
-            get_react_question_extraction_prompt(),
-            {"mime_type": "image/png", "data": image_data}
-        ])
+        # Send the image, downscaled and encoded for Gemini (uploaded once, then referenced)
+        response = generate_content_with_image(model, get_react_question_extraction_prompt(), image_path)
         
         # Extract the question from Gemini's response
         if response and response.text:
@@ -1,11 +1,121 @@
-from typing import Optional, Dict
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List
 from .prompts import get_frontend_system_design_extraction_prompt_with_details # Changed import
-from .common import genai, configure_gemini, json # Ensure json is imported
+from .prompts import get_frontend_system_design_update_prompt
+from .prompts import get_transcript_shard_candidates_prompt, get_frontend_system_design_reduce_prompt
+from .common import configure_gemini, json, GeminiModel # Ensure json is imported
 
-def extract_question_from_transcript_with_gemini(transcript_text: str) -> Optional[str]: # Return type is str for now
+# Model used for structured design extraction
+DESIGN_EXTRACTION_MODEL = 'gemini-2.5-pro-exp-03-25'
+# Fast model for the per-shard candidate extraction of the map-reduce path
+SHARD_EXTRACTION_MODEL = 'gemini-2.0-flash'
+
+# Rough chars-per-token ratio used for sharding
+CHARS_PER_TOKEN = 4
+# Transcripts larger than this (in tokens) are extracted with map-reduce instead of a single prompt.
+# Compared against the full transcript when the caller passes it: the budgeted prompt
+# context (TRANSCRIPT_TOKEN_BUDGET, 12000 by default) never gets this large on its own.
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.environ.get("MAP_REDUCE_THRESHOLD_TOKENS", 30000))
+# Maximum size of one shard
+SHARD_MAX_TOKENS = 8000
+# Lines repeated at the start of each shard so a question split across a boundary stays intact
+SHARD_OVERLAP_LINES = 5
+# Maximum number of concurrent shard requests
+MAP_REDUCE_MAX_WORKERS = 4
+
+# Response schema for structured output
+DESIGN_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "question": {
+            "type": "string",
+            "description": "The complete extracted frontend system design question, including all requirements and details."
+        },
+        "entities": {
+            "type": "string",
+            "description": "A string containing TypeScript interface/type definitions for relevant data entities."
+        },
+        "api": {
+            "type": "string",
+            "description": "A string describing the REST API endpoints, including method, path, purpose, and example payloads."
+        }
+    },
+    "required": ["question", "entities", "api"]
+}
+
+# Schema for incremental updates: empty fields mean "unchanged"
+DESIGN_UPDATE_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "new_question": {
+            "type": "boolean",
+            "description": "True if the new transcript starts a different design question."
+        },
+        **DESIGN_RESPONSE_SCHEMA["properties"]
+    },
+    "required": ["new_question", "question", "entities", "api"]
+}
+
+def _generate_design_json(full_prompt: str, response_schema: Dict) -> Optional[str]:
+    """
+    Send a structured extraction prompt to Gemini and return the raw JSON string
+
+    Parameters:
+    - full_prompt: Complete prompt text
+    - response_schema: JSON schema the response must follow
+
+    Returns:
+    - JSON string, or None if the request failed
+    """
+    model = GeminiModel(DESIGN_EXTRACTION_MODEL)
+    response = model.generate_content(
+        full_prompt,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": response_schema
+        }
+    )
+
+    if response and response.text:
+        return response.text.strip()
+
+    print("Gemini did not return a response or response.text was empty.")
+    # Check for potential safety blocks or other issues
+    if response and hasattr(response, 'prompt_feedback') and response.prompt_feedback:
+        print(f"Gemini prompt feedback: {response.prompt_feedback}")
+    if response and hasattr(response, 'candidates') and response.candidates and hasattr(response.candidates[0], 'finish_reason'):
+         print(f"Finish Reason: {response.candidates[0].finish_reason}")
+    return None
+
+def extract_question_from_transcript_with_gemini(transcript_text: str, full_transcript_text: Optional[str] = None) -> Optional[str]: # Return type is str for now
     """
     Uses Gemini to extract the latest frontend system design question, entities, and API details
     from the provided transcript text, returning as a JSON string.
+    Transcripts above MAP_REDUCE_THRESHOLD_TOKENS go through the map-reduce path.
+
+    Args:
+        transcript_text: The transcript text for a single prompt (may be a token-budgeted context).
+        full_transcript_text: The complete, unbudgeted transcript, if transcript_text is a
+            budgeted context. Its size decides the path, and map-reduce reads it.
+
+    Returns:
+        A JSON string containing the extracted question, entities, and API details,
+        or None if extraction fails.
+    """
+    long_text = full_transcript_text or transcript_text
+    if len(long_text) // CHARS_PER_TOKEN > MAP_REDUCE_THRESHOLD_TOKENS:
+        result = extract_question_map_reduce_with_gemini(long_text)
+        if result:
+            return result
+        print("Map-reduce extraction failed; falling back to a single prompt")
+    return extract_question_single_shot_with_gemini(transcript_text)
+
+def extract_question_single_shot_with_gemini(transcript_text: str) -> Optional[str]:
+    """
+    Extract the structured design question from the whole transcript in one prompt.
 
     Args:
         transcript_text: The full text of the interview transcript.
@@ -19,60 +129,21 @@ def extract_question_from_transcript_with_gemini(transcript_text: str) -> Option
         return None
 
     try:
-        # 2. Initialize the model
-        # Using 1.5 flash as it's generally good for structured output and speed
-        model = genai.GenerativeModel('gemini-2.5-pro-exp-03-25')
-
-        # 3. Get the prompt
+        # 2. Get the prompt
         prompt = get_frontend_system_design_extraction_prompt_with_details()
 
-        # 4. Construct the full prompt including the transcript
+        # 3. Construct the full prompt including the transcript
         full_prompt = f"{prompt}\n\nTranscript:\n```\n{transcript_text}\n```"
 
-        # 5. Define the response schema for structured output
-        response_schema = {
-            "type": "object",
-            "properties": {
-                "question": {
-                    "type": "string",
-                    "description": "The complete extracted frontend system design question, including all requirements and details."
-                },
-                "entities": {
-                    "type": "string",
-                    "description": "A string containing TypeScript interface/type definitions for relevant data entities."
-                },
-                "api": {
-                    "type": "string",
-                    "description": "A string describing the REST API endpoints, including method, path, purpose, and example payloads."
-                }
-            },
-            "required": ["question", "entities", "api"]
-        }
-
-        # 6. Call the Gemini API
+        # 4. Call the Gemini API
         print("Sending request to Gemini to extract structured frontend system design details...")
-        response = model.generate_content(
-            full_prompt,
-            generation_config={
-                "response_mime_type": "application/json",
-                "response_schema": response_schema
-            }
-        )
-
-        # 7. Process the response
-        if response and response.text:
+        extracted_json_string = _generate_design_json(full_prompt, DESIGN_RESPONSE_SCHEMA)
+
+        # 5. Process the response
+        if extracted_json_string:
             # For now, return the raw JSON string as per user request for testing
-            extracted_json_string = response.text.strip()
             print(f"Successfully received JSON string from Gemini: {extracted_json_string}")
-            return extracted_json_string
-        else:
-            print("Gemini did not return a response or response.text was empty.")
-            # Check for potential safety blocks or other issues
-            if response and hasattr(response, 'prompt_feedback') and response.prompt_feedback:
-                print(f"Gemini prompt feedback: {response.prompt_feedback}")
-            if response and hasattr(response, 'candidates') and response.candidates and hasattr(response.candidates[0], 'finish_reason'):
-                 print(f"Finish Reason: {response.candidates[0].finish_reason}")
-            return None
+        return extracted_json_string
 
     except Exception as e:
         print(f"Error extracting structured data with Gemini: {e}")
@@ -80,7 +151,154 @@ def extract_question_from_transcript_with_gemini(transcript_text: str) -> Option
         # traceback.print_exc() # Uncomment for detailed debugging if needed
         return None
 
+def split_transcript_into_shards(transcript_text: str, max_tokens: int = SHARD_MAX_TOKENS,
+                                 overlap_lines: int = SHARD_OVERLAP_LINES) -> List[str]:
+    """
+    Split a transcript on line boundaries into shards of at most max_tokens
+
+    Args:
+        transcript_text: The transcript (one segment per line).
+        max_tokens: Maximum approximate size of a shard.
+        overlap_lines: Number of trailing lines of a shard repeated at the start of the next.
+
+    Returns:
+        List of shard texts in transcript order.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    lines = [line for line in transcript_text.splitlines() if line.strip()]
+    shards = []
+    current = []
+    current_chars = 0
+    for line in lines:
+        # A single line longer than a shard is hard-split so no shard exceeds the limit
+        pieces = [line[i:i + max_chars] for i in range(0, len(line), max_chars)]
+        for piece in pieces:
+            if current and current_chars + len(piece) + 1 > max_chars:
+                shards.append("\n".join(current))
+                current = current[-overlap_lines:] if overlap_lines else []
+                current_chars = sum(len(item) + 1 for item in current)
+            current.append(piece)
+            current_chars += len(piece) + 1
+    if current:
+        shards.append("\n".join(current))
+    return shards
+
+def _extract_shard_candidates(shard_text: str, shard_number: int, shard_count: int) -> Optional[str]:
+    """Map step: list the candidate questions in one shard with the fast model"""
+    try:
+        model = GeminiModel(SHARD_EXTRACTION_MODEL)
+        response = model.generate_content(get_transcript_shard_candidates_prompt(shard_text, shard_number, shard_count))
+        if response and response.text:
+            candidates = response.text.strip()
+            return None if candidates.upper() == "NONE" else candidates
+        print(f"Empty response from Gemini for transcript shard {shard_number}")
+        return None
+    except Exception as e:
+        print(f"Error extracting candidates from transcript shard {shard_number}: {e}")
+        return None
+
+def extract_question_map_reduce_with_gemini(transcript_text: str, max_workers: int = MAP_REDUCE_MAX_WORKERS) -> Optional[str]:
+    """
+    Extract the structured design question from a very long transcript with map-reduce:
+    candidate questions are extracted from token-bounded shards concurrently, then
+    reduced into one structured result.
+
+    Args:
+        transcript_text: The full text of the interview transcript.
+        max_workers: Maximum number of concurrent shard requests.
+
+    Returns:
+        A JSON string containing the extracted question, entities, and API details,
+        or None if extraction fails.
+    """
+    if not configure_gemini():
+        return None
+
+    try:
+        # 1. Map: candidate questions per shard, with a bounded pool
+        shards = split_transcript_into_shards(transcript_text)
+        print(f"Map-reduce extraction: {len(shards)} shards, up to {max_workers} concurrent requests")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            candidates = list(executor.map(
+                lambda item: _extract_shard_candidates(item[1], item[0] + 1, len(shards)),
+                enumerate(shards)
+            ))
+
+        parts = [f"Part {index + 1}:\n{text}" for index, text in enumerate(candidates) if text]
+        if not parts:
+            print("No candidate questions found in any transcript shard.")
+            return None
+
+        # 2. Reduce: one structured extraction over the ordered candidates
+        full_prompt = get_frontend_system_design_reduce_prompt("\n\n".join(parts))
+        print("Sending shard candidates to Gemini to reduce into one structured question...")
+        return _generate_design_json(full_prompt, DESIGN_RESPONSE_SCHEMA)
+
+    except Exception as e:
+        print(f"Error in map-reduce extraction with Gemini: {e}")
+        return None
+
+def benchmark_extraction(transcript_text: str) -> Dict:
+    """
+    Time the single-shot and map-reduce extraction paths on the same transcript
+
+    Args:
+        transcript_text: Transcript to extract from.
+
+    Returns:
+        Dictionary with wall-clock seconds and success for each path.
+    """
+    results = {}
+    for name, extract in (("single_shot", extract_question_single_shot_with_gemini),
+                          ("map_reduce", extract_question_map_reduce_with_gemini)):
+        start = time.perf_counter()
+        output = extract(transcript_text)
+        results[name] = {"seconds": round(time.perf_counter() - start, 2), "success": bool(output)}
+        print(f"{name}: {results[name]['seconds']}s (success: {results[name]['success']})")
+    return results
+
+def update_question_from_transcript_delta_with_gemini(current_structure: Dict, new_transcript: str) -> Optional[Dict]:
+    """
+    Uses Gemini to update a previously extracted design question with only the
+    transcript segments spoken since it was extracted.
+
+    Args:
+        current_structure: The current extraction (dict with question, entities and api).
+        new_transcript: Transcript text that follows the current extraction.
+
+    Returns:
+        The update as a dict (new_question flag plus fields; empty fields mean unchanged),
+        or None if the update fails.
+    """
+    if not configure_gemini():
+        return None
+
+    try:
+        full_prompt = get_frontend_system_design_update_prompt(json.dumps(current_structure, indent=2), new_transcript)
+
+        print(f"Sending transcript delta to Gemini for incremental extraction ({len(new_transcript)} chars)...")
+        update_json_string = _generate_design_json(full_prompt, DESIGN_UPDATE_RESPONSE_SCHEMA)
+        if not update_json_string:
+            return None
+        return json.loads(update_json_string)
+
+    except Exception as e:
+        print(f"Error updating structured data with Gemini: {e}")
+        return None
+
 if __name__ == '__main__':
+    # Benchmark: python -m gemini_api.extract_transcript_question_with_gemini --benchmark transcription_liveperson.txt [repeat]
+    if len(sys.argv) >= 3 and sys.argv[1] == "--benchmark":
+        with open(sys.argv[2], "r") as f:
+            benchmark_text = f.read()
+        repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        # Repeating the file simulates a longer session
+        benchmark_text = "\n".join([benchmark_text] * repeat)
+        print(f"Transcript: {len(benchmark_text)} chars (~{len(benchmark_text) // CHARS_PER_TOKEN} tokens), "
+              f"{len(split_transcript_into_shards(benchmark_text))} shards")
+        benchmark_extraction(benchmark_text)
+        sys.exit(0)
+
     # Example usage (replace with actual transcript)
     sample_transcript = """
 Interviewer: Okay, thanks for walking me through that. So, let's switch gears a bit. Can you tell me about a time you had to handle conflicting requirements?
@@ -1,13 +1,14 @@
-from .common import genai, configure_gemini, json
+from .common import configure_gemini, json, GeminiModel
 from typing import Dict, Optional
 from .prompts import get_design_solution_prompt
 
-def get_design_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
+def get_design_solution_with_gemini(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a system design question to Google Gemini API to get a solution
     
     Parameters:
     - question: The system design question
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing components and explanations, or None if failed
@@ -17,7 +18,7 @@ def get_design_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
     
     try:
         # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = GeminiModel('gemini-2.0-flash')
         
         # Construct the prompt for Gemini
         prompt = get_design_solution_prompt(question)
@@ -27,7 +28,8 @@ def get_design_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
             prompt,
             generation_config={
                 "response_mime_type": "application/json"
-            }
+            },
+            on_token=on_token
         )
         
         if response and response.text:
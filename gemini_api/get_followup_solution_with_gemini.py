@@ -1,8 +1,8 @@
-from .common import genai, configure_gemini, json
+from .common import configure_gemini, json, GeminiModel
 from .prompts import get_followup_solution_prompt, get_react_followup_solution_prompt_for_gemini # Added new prompt import
 from typing import Dict, Optional, Union
 
-def get_followup_solution_with_gemini(current_problem: str, current_code: str, transcript: str) -> Optional[Dict[str, str]]:
+def get_followup_solution_with_gemini(current_problem: str, current_code: str, transcript: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a follow-up request to Google Gemini API to get an updated solution
     
@@ -10,6 +10,7 @@ def get_followup_solution_with_gemini(current_problem: str, current_code: str, t
     - current_problem: The original coding problem
     - current_code: The current solution code
     - transcript: Recent transcript text containing the follow-up question
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation and updated code, or None if failed
@@ -19,7 +20,7 @@ def get_followup_solution_with_gemini(current_problem: str, current_code: str, t
     
     try:
         # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = GeminiModel('gemini-2.0-flash')
         
         # Get the prompt from prompts.py
         prompt = get_followup_solution_prompt(current_problem, current_code, transcript)
@@ -50,7 +51,8 @@ def get_followup_solution_with_gemini(current_problem: str, current_code: str, t
             generation_config={
                 "response_mime_type": "application/json",
                 "response_schema": response_schema
-            }
+            },
+            on_token=on_token
         )
         
         if response and response.text:
@@ -97,7 +99,7 @@ def get_followup_solution_with_gemini(current_problem: str, current_code: str, t
         return None
 
 
-def get_react_followup_solution_with_gemini(transcript: str, react_question: str, current_solution: str) -> Optional[str]:
+def get_react_followup_solution_with_gemini(transcript: str, react_question: str, current_solution: str, on_token=None) -> Optional[str]:
     """
     Send a React follow-up request to Google Gemini API to get raw updated code.
 
@@ -105,6 +107,7 @@ def get_react_followup_solution_with_gemini(transcript: str, react_question: str
     - transcript: Recent transcript text containing the follow-up question.
     - react_question: The original React coding question.
     - current_solution: The current React solution code.
+    - on_token: Optional callable receiving each text delta as it is generated.
 
     Returns:
     - Raw updated code string, or None if failed.
@@ -116,13 +119,13 @@ def get_react_followup_solution_with_gemini(transcript: str, react_question: str
     try:
         # Use a model suitable for code generation/modification, e.g., gemini-1.5-flash or gemini-pro
         # Note: The original code used 'gemini-2.0-flash' which might be incorrect. Using 'gemini-1.5-flash'.
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        model = GeminiModel('gemini-1.5-flash')
 
         # Get the specific prompt for raw React follow-up
         prompt = get_react_followup_solution_prompt_for_gemini(transcript, react_question, current_solution)
 
         # Generate the content (expecting raw text based on the prompt)
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, on_token=on_token)
 
         if response and response.text:
             # Return the raw text directly as requested by the prompt
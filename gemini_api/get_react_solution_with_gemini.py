@@ -1,16 +1,16 @@
 import os
 import json
 from typing import Dict, Optional
-import google.generativeai as genai
 from .prompts import get_react_solution_prompt
-from .common import configure_gemini
+from .common import configure_gemini, GeminiModel
 
-def get_react_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
+def get_react_solution_with_gemini(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a React-specific coding question to Google Gemini API to get a solution using structured JSON output
     
     Parameters:
     - question: The React coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation, code, complexity, and strategy, or None if failed
@@ -23,8 +23,8 @@ def get_react_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
     
     try:
         # Initialize the model
-        # model = genai.GenerativeModel('gemini-2.5-pro-exp-03-25')
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        # model = GeminiModel('gemini-2.5-pro-exp-03-25')
+        model = GeminiModel('gemini-2.0-flash')
         
         # Get the prompt from prompts.py
         prompt = get_react_solution_prompt(question)
@@ -48,7 +48,8 @@ def get_react_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
             generation_config={
                 "response_mime_type": "application/json",
                 "response_schema": response_schema
-            }
+            },
+            on_token=on_token
         )
         
         
@@ -102,12 +103,13 @@ def get_react_solution_with_gemini(question: str) -> Optional[Dict[str, str]]:
         print(f"Exception when calling Gemini API for React solution: {str(e)}")
         return None
 
-def get_react_solution2_with_gemini(question: str) -> Optional[Dict[str, str]]:
+def get_react_solution2_with_gemini(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a React-specific coding question to Google Gemini API using Claude's prompt format
     
     Parameters:
     - question: The React coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing only the 'code' field populated, or None if failed
@@ -120,7 +122,7 @@ def get_react_solution2_with_gemini(question: str) -> Optional[Dict[str, str]]:
     try:
         # Initialize the model
         # Using a potentially newer or experimental model if available, adjust as needed
-        model = genai.GenerativeModel('gemini-1.5-pro-latest') 
+        model = GeminiModel('gemini-1.5-pro-latest') 
         
         # Get the Claude prompt from prompts.py
         # Make sure get_react_solution_prompt_for_claude is imported or defined
@@ -129,7 +131,7 @@ def get_react_solution2_with_gemini(question: str) -> Optional[Dict[str, str]]:
         
         # Generate the solution - Note: Gemini might not strictly adhere to "only code"
         # We might need to adjust the prompt or post-process the response if Gemini adds extra text
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, on_token=on_token)
         
         if response and response.text:
             code_text = response.text
@@ -2,14 +2,17 @@ import os
 import json
 from typing import Dict, Optional
 import google.generativeai as genai
+from .common import GeminiModel
+from provider_clients import configure_gemini_client
 from .prompts import get_solution_prompt
 
-def get_solution_for_question_with_gemini(question: str) -> Optional[Dict[str, str]]:
+def get_solution_for_question_with_gemini(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a coding question to Google Gemini API to get a solution using structured JSON output
     
     Parameters:
     - question: The coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation, code, complexity, and strategy, or None if failed
@@ -19,12 +22,12 @@ def get_solution_for_question_with_gemini(question: str) -> Optional[Dict[str, s
         print("Error: GEMINI_API_KEY environment variable not set")
         return None
     
-    # Configure the Gemini API
-    genai.configure(api_key=api_key)
+    # Configure the Gemini API (once per key)
+    configure_gemini_client(genai, api_key)
     
     try:
         # Initialize the model
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = GeminiModel('gemini-2.0-flash')
         
         # Get the prompt from prompts.py
         prompt = get_solution_prompt(question)
@@ -63,7 +66,8 @@ def get_solution_for_question_with_gemini(question: str) -> Optional[Dict[str, s
             generation_config={
                 "response_mime_type": "application/json",
                 "response_schema": response_schema
-            }
+            },
+            on_token=on_token
         )
         
         if response and response.text:
@@ -243,3 +243,76 @@ Provide the information structured as follows:
 - "entities": A string containing TypeScript interface/type definitions for relevant data entities. Each definition should be on a new line. Example:\\ninterface User {\\n  id: string;\\n  name: string;\\n}\\ninterface Product {\\n  productId: string;\\n  productName: string;\\n}
 - "api": A string describing the REST API endpoints. Each endpoint definition should be clearly delineated. Example:\\nGET /api/users/{userId}\\nPurpose: Retrieve user.\\nResponse: { 'id': '123', 'name': 'John' }\\nPOST /api/orders\\nPurpose: Create order.\\nRequest: { 'userId': '123', 'items': [] }\\nResponse: { 'orderId': 'abc' }
 """
+
+def get_transcript_rolling_summary_prompt(previous_summary: str, new_transcript: str) -> str:
+    """Returns the prompt for folding older transcript segments into a rolling summary"""
+    return f"""You are maintaining a running summary of a technical interview transcript so that later prompts do not need the full transcript.
+
+Current summary of the conversation so far (may be empty):
+<summary>
+{previous_summary}
+</summary>
+
+Next part of the transcript, which follows the summary:
+<transcript>
+{new_transcript}
+</transcript>
+
+Update the summary to also cover the new part of the transcript.
+Instructions:
+1. Keep every question or task the interviewer asked, with ALL of its requirements, constraints, numbers, names and examples, worded as closely to the original as possible.
+2. Keep follow-up questions and any decisions or clarifications agreed on.
+3. Compress small talk, greetings, filler and transcription noise (e.g. repeated "you", "Thank you.") to nothing.
+4. Keep the summary in chronological order and under 500 words.
+
+Return only the updated summary text, without any introductory phrases or commentary."""
+
+def get_frontend_system_design_update_prompt(current_structure: str, new_transcript: str) -> str:
+    """Returns the prompt for updating an extracted frontend system design question with new transcript segments"""
+    return f"""You previously extracted a frontend system design question from an interview transcript, with TypeScript entities and REST API endpoints.
+
+Current extraction (JSON with "question", "entities" and "api"):
+<current>
+{current_structure}
+</current>
+
+New part of the transcript, spoken after the current extraction was made:
+<transcript>
+{new_transcript}
+</transcript>
+
+Update the extraction using only what the new transcript adds or changes.
+Instructions:
+1. If the interviewer starts a different design question, set "new_question" to true and return the complete "question", "entities" and "api" for the new question.
+2. Otherwise set "new_question" to false. For each field the new transcript changes (added requirements, constraints, clarifications, entities or endpoints), return the complete updated field, keeping everything still valid from the current value.
+3. Return an empty string for every field that does not change.
+4. Ignore conversational filler, greetings, the candidate's own answers unless the interviewer confirms them, and transcription noise.
+5. Use the same formats as the current extraction: TypeScript interfaces/types in "entities"; method, path, purpose and example payloads for each endpoint in "api".
+"""
+
+def get_transcript_shard_candidates_prompt(shard_text: str, shard_number: int, shard_count: int) -> str:
+    """Returns the prompt for listing candidate interview questions in one part of a long transcript"""
+    return f"""You are reading part {shard_number} of {shard_count} of a long technical interview transcript.
+
+<transcript_part>
+{shard_text}
+</transcript_part>
+
+List every question or task the interviewer gives in this part, in the order they appear.
+Instructions:
+1. For each one, include ALL requirements, constraints, clarifications, numbers, names and examples mentioned in this part, worded as closely to the original as possible.
+2. Include follow-up requirements that refine a question asked earlier, even if the question itself is not in this part.
+3. Ignore greetings, small talk, the candidate's own answers and transcription noise (e.g. repeated "you", "Thank you.").
+4. If this part contains no question, task or requirement, return exactly: NONE
+
+Return only the list, one item per paragraph, without any introductory phrases or commentary."""
+
+def get_frontend_system_design_reduce_prompt(candidates: str) -> str:
+    """Returns the prompt for combining per-part candidate questions into one structured design extraction"""
+    return f"""A long interview transcript was split into consecutive parts, and the interviewer's questions and requirements were listed for each part (oldest part first):
+
+{candidates}
+
+Treat these lists as the transcript for the following task.
+
+{get_frontend_system_design_extraction_prompt_with_details()}"""
@@ -0,0 +1,34 @@
+from typing import Optional
+from .common import configure_gemini, GeminiModel
+from .prompts import get_transcript_rolling_summary_prompt
+
+def summarize_transcript_with_gemini(previous_summary: str, new_transcript: str) -> Optional[str]:
+    """
+    Fold a chunk of older transcript into the rolling summary using Gemini
+
+    Parameters:
+    - previous_summary: The current rolling summary (empty string for the first chunk)
+    - new_transcript: Transcript text that follows the summary
+
+    Returns:
+    - The updated summary as a string, or None if summarization failed
+    """
+    if not configure_gemini():
+        return None
+
+    try:
+        # A fast model is enough for summarization and keeps the background work cheap
+        model = GeminiModel('gemini-2.0-flash')
+
+        prompt = get_transcript_rolling_summary_prompt(previous_summary, new_transcript)
+        response = model.generate_content(prompt)
+
+        if response and response.text:
+            return response.text.strip()
+        else:
+            print("Empty response from Gemini API for transcript summary")
+            return None
+
+    except Exception as e:
+        print(f"Exception when calling Gemini API for transcript summary: {str(e)}")
+        return None
@@ -0,0 +1,137 @@
+# generation_stream.py
+# Token streams for LLM generations relayed to the browser.
+# A background generation appends text deltas to its stream as the provider produces
+# them; any number of readers (SSE responses) replay the stream from an offset and then
+# follow it live. Time to first token and total time are recorded per provider.
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# Finished streams kept for late or reconnecting readers
+DEFAULT_MAX_STREAMS = 50
+# Timing samples kept per provider
+TIMING_SAMPLES = 100
+
+class GenerationStream:
+    """Text deltas of one generation, with timing"""
+    def __init__(self, provider, condition):
+        """
+        Parameters:
+        - provider: Provider label (e.g. "claude", "gemini-react")
+        - condition: Registry condition notified on every change
+        """
+        self.id = uuid.uuid4().hex
+        self.provider = provider
+        self.chunks = []
+        self.done = False
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self._condition = condition
+
+    def append(self, text):
+        """Add a text delta (used as the provider functions' on_token callback)"""
+        if not text:
+            return
+        with self._condition:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+                print(f"{self.provider} first token after {self.ttft_ms():.0f} ms")
+            self.chunks.append(text)
+            self._condition.notify_all()
+
+    def finish(self):
+        """Mark the generation complete (successful or not)"""
+        with self._condition:
+            if self.done:
+                return
+            self.done = True
+            self.finished_at = time.perf_counter()
+            self._condition.notify_all()
+
+    def ttft_ms(self):
+        """Milliseconds from start to the first token, or None before it arrives"""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    def total_ms(self):
+        """Milliseconds from start to completion, or None while running"""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at) * 1000
+
+class StreamRegistry:
+    """
+    Open generation streams by ID, plus per-provider time-to-first-token statistics
+    """
+    def __init__(self, max_streams=DEFAULT_MAX_STREAMS):
+        """Create an empty registry that keeps up to max_streams streams"""
+        self.max_streams = max_streams
+        self._condition = threading.Condition()
+        self._streams = OrderedDict()   # stream_id -> GenerationStream
+        self._timings = {}              # provider -> {"ttft_ms": deque, "total_ms": deque}
+
+    def open(self, provider):
+        """Start a stream for a new generation"""
+        stream = GenerationStream(provider, self._condition)
+        with self._condition:
+            self._streams[stream.id] = stream
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        return stream
+
+    def finish(self, stream):
+        """Complete a stream and record its timings"""
+        stream.finish()
+        with self._condition:
+            timings = self._timings.setdefault(stream.provider, {
+                "ttft_ms": deque(maxlen=TIMING_SAMPLES), "total_ms": deque(maxlen=TIMING_SAMPLES)})
+            if stream.ttft_ms() is not None:
+                timings["ttft_ms"].append(stream.ttft_ms())
+            timings["total_ms"].append(stream.total_ms())
+
+    def get(self, stream_id):
+        """The stream with stream_id, or None"""
+        with self._condition:
+            return self._streams.get(stream_id)
+
+    def follow(self, stream, offset=0, keepalive_seconds=15):
+        """
+        Generator over a stream's deltas from chunk index offset until it is done
+
+        Yields:
+        - (index, text) for each delta; (None, None) when keepalive_seconds pass without one
+        """
+        while True:
+            with self._condition:
+                if offset >= len(stream.chunks) and not stream.done:
+                    self._condition.wait(timeout=keepalive_seconds)
+                chunks = stream.chunks[offset:]
+                done = stream.done
+            if not chunks and not done:
+                yield None, None
+            for text in chunks:
+                yield offset, text
+                offset += 1
+            if done and offset >= len(stream.chunks):
+                return
+
+    def stats(self):
+        """Per-provider generation count and median/p90 time to first token and total time (ms)"""
+        def percentile(values, fraction):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(len(values) * fraction))]) if values else None
+
+        with self._condition:
+            return {
+                provider: {
+                    "generations": len(timings["total_ms"]),
+                    "ttft_p50_ms": percentile(timings["ttft_ms"], 0.5),
+                    "ttft_p90_ms": percentile(timings["ttft_ms"], 0.9),
+                    "total_p50_ms": percentile(timings["total_ms"], 0.5),
+                    "total_p90_ms": percentile(timings["total_ms"], 0.9),
+                }
+                for provider, timings in self._timings.items()
+            }
@@ -0,0 +1,390 @@
+# image_encoding.py
+# Pluggable screenshot encoders and per-provider downscaling for LLM uploads.
+# Screenshots stay on disk as full-resolution PNG; what is sent to a provider is
+# resized to the long edge that provider actually uses and re-encoded in its format.
+# Fresh captures are handed around in memory as CapturedImage objects, which compute
+# each encoding (PNG, per-provider upload, base64) once, on first use.
+import base64
+import io
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import mss.tools
+
+# Pillow is optional: without it screenshots are uploaded as the original PNG
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# NumPy is optional too: without it uploads are not cropped
+try:
+    from screenshot_roi import crop_to_text_region
+except ImportError:
+    crop_to_text_region = None
+
+# zlib level for screenshots written to disk (1 = fastest; the file is local only)
+SCREENSHOT_PNG_LEVEL = int(os.environ.get("SCREENSHOT_PNG_LEVEL", 1))
+
+# Upload settings per provider. Providers downscale larger images themselves, so
+# sending more pixels than max_long_edge only costs upload and encode time.
+PROVIDER_IMAGE_SETTINGS = {
+    "claude": {"format": "png", "max_long_edge": 1568, "png_level": 6},
+    "openai": {"format": "jpeg", "max_long_edge": 2048, "quality": 90},
+    "gemini": {"format": "webp", "max_long_edge": 3072, "quality": 90},
+}
+# Override every provider's format with IMAGE_UPLOAD_FORMAT (png, jpeg or webp)
+IMAGE_UPLOAD_FORMAT = os.environ.get("IMAGE_UPLOAD_FORMAT", "")
+
+# Crop uploads to the dominant text region (SCREENSHOT_ROI_CROP=0 to send the full frame)
+SCREENSHOT_ROI_CROP = os.environ.get("SCREENSHOT_ROI_CROP", "1") != "0"
+
+# Number of prepared uploads kept (the same screenshot is often sent to several providers)
+PREPARED_CACHE_SIZE = 16
+# Recent captures kept in memory by path (a 3440x1440 frame is ~20 MB of raw pixels)
+CAPTURED_IMAGE_CACHE_SIZE = 4
+
+# --- Encoders ---
+
+def _encode_png(image, png_level=6, **options):
+    """PNG via mss.tools.to_png (no Pillow needed) at the given zlib level"""
+    return mss.tools.to_png(image.tobytes(), image.size, level=png_level)
+
+def _encode_jpeg(image, quality=90, **options):
+    """JPEG via Pillow"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=False)
+    return buffer.getvalue()
+
+def _encode_webp(image, quality=90, **options):
+    """WebP via Pillow (method 0 = fastest)"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=0)
+    return buffer.getvalue()
+
+# name -> (mime type, encode function taking an RGB PIL image and options)
+ENCODERS = {
+    "png": ("image/png", _encode_png),
+    "jpeg": ("image/jpeg", _encode_jpeg),
+    "webp": ("image/webp", _encode_webp),
+}
+
+def register_encoder(name, mime_type, encode_fn):
+    """
+    Add or replace an encoder
+
+    Parameters:
+    - name: Format name used in PROVIDER_IMAGE_SETTINGS
+    - mime_type: MIME type sent to providers
+    - encode_fn: Callable (rgb_pil_image, **options) -> bytes
+    """
+    ENCODERS[name] = (mime_type, encode_fn)
+
+# --- Resizing and preparation ---
+
+def downscale(image, max_long_edge):
+    """Resize image so its long edge is at most max_long_edge (returns image unchanged if already small)"""
+    width, height = image.size
+    long_edge = max(width, height)
+    if not max_long_edge or long_edge <= max_long_edge:
+        return image
+    scale = max_long_edge / long_edge
+    return image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+def encode_image(image, image_format="png", max_long_edge=None, **options):
+    """
+    Downscale and encode an RGB image
+
+    Parameters:
+    - image: PIL image
+    - image_format: Encoder name (see ENCODERS)
+    - max_long_edge: Target long edge in pixels (None keeps the native size)
+    - options: Encoder options (png_level, quality)
+
+    Returns:
+    - (bytes, mime_type)
+    """
+    mime_type, encode_fn = ENCODERS[image_format]
+    image = downscale(image.convert("RGB"), max_long_edge)
+    return encode_fn(image, **options), mime_type
+
+def _provider_settings(provider):
+    """Upload settings for provider, with the IMAGE_UPLOAD_FORMAT override applied"""
+    settings = dict(PROVIDER_IMAGE_SETTINGS.get(provider, {"format": "png"}))
+    if IMAGE_UPLOAD_FORMAT:
+        settings["format"] = IMAGE_UPLOAD_FORMAT
+    return settings
+
+def prepare_pil_image(image, provider, name="screenshot"):
+    """
+    Crop an image to its text region and encode it for upload to a provider
+
+    Parameters:
+    - image: PIL image
+    - provider: "claude", "openai" or "gemini"
+    - name: Label used in log messages
+
+    Returns:
+    - (bytes, mime_type)
+    """
+    settings = _provider_settings(provider)
+    image_format = settings.pop("format")
+    max_long_edge = settings.pop("max_long_edge", None)
+    if SCREENSHOT_ROI_CROP and crop_to_text_region is not None:
+        image, box = crop_to_text_region(image)
+        if box:
+            print(f"Cropped {name} to text region {box} for {provider}")
+    return encode_image(image, image_format, max_long_edge, **settings)
+
+# --- In-memory captures ---
+
+class CapturedImage:
+    """
+    A screenshot held in memory straight from the capture (raw BGRA pixels).
+    Encodings are computed on first use and cached, so the PNG written to disk, each
+    provider's upload and its base64 form are each produced at most once.
+    """
+    def __init__(self, bgra, size, path=None):
+        """
+        Parameters:
+        - bgra: Raw BGRA pixel buffer (as captured by mss)
+        - size: (width, height)
+        - path: Where the screenshot is (or will be) saved; also its key in interview data
+        """
+        self.bgra = bgra
+        self.size = size
+        self.path = path
+        self.saved = threading.Event()  # set once the PNG is on disk
+        self.save_done = threading.Event()  # set once a save attempt ends (saved or failed)
+        self.save_error = None  # exception of the last failed save
+        self._lock = threading.Lock()
+        self._pil = None
+        self._png = None
+        self._prepared = {}
+        self._base64 = {}
+
+    def to_pil(self):
+        """RGB PIL image sharing the raw buffer (requires Pillow)"""
+        with self._lock:
+            if self._pil is None:
+                self._pil = Image.frombuffer("RGB", self.size, self.bgra, "raw", "BGRX", 0, 1)
+            return self._pil
+
+    def _rgb_bytes(self):
+        """Packed RGB bytes (what mss.tools.to_png expects)"""
+        if Image is not None:
+            return self.to_pil().tobytes()
+        rgb = bytearray(self.size[0] * self.size[1] * 3)
+        rgb[0::3] = self.bgra[2::4]
+        rgb[1::3] = self.bgra[1::4]
+        rgb[2::3] = self.bgra[0::4]
+        return bytes(rgb)
+
+    def png_bytes(self):
+        """Full-resolution PNG at SCREENSHOT_PNG_LEVEL"""
+        if self._png is None:
+            png = mss.tools.to_png(self._rgb_bytes(), self.size, level=SCREENSHOT_PNG_LEVEL)
+            with self._lock:
+                self._png = png
+        return self._png
+
+    def prepared(self, provider):
+        """(bytes, mime_type) upload for provider (see prepare_image_for_provider)"""
+        with self._lock:
+            cached = self._prepared.get(provider)
+        if cached is None:
+            if Image is None:
+                cached = (self.png_bytes(), "image/png")
+            else:
+                cached = prepare_pil_image(self.to_pil(), provider, os.path.basename(self.path or "capture"))
+            with self._lock:
+                self._prepared[provider] = cached
+        return cached
+
+    def base64(self, provider=None):
+        """
+        Base64 of the provider's upload (of the full-resolution PNG when provider is None)
+
+        Returns:
+        - (base64_string, mime_type)
+        """
+        with self._lock:
+            cached = self._base64.get(provider)
+        if cached is None:
+            data, mime_type = self.prepared(provider) if provider else (self.png_bytes(), "image/png")
+            cached = (base64.b64encode(data).decode('utf-8'), mime_type)
+            with self._lock:
+                self._base64[provider] = cached
+        return cached
+
+    def save(self):
+        """Write the PNG to self.path (through a temporary file, so readers never see a partial one)"""
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as image_file:
+            image_file.write(self.png_bytes())
+        os.replace(temporary_path, self.path)
+        self.mark_saved()
+
+    def mark_saved(self):
+        """Record that the PNG is on disk"""
+        self.save_error = None
+        self.saved.set()
+        self.save_done.set()
+
+    def mark_save_failed(self, error):
+        """Record that writing the PNG failed (wakes callers waiting for the save)"""
+        self.save_error = error
+        self.save_done.set()
+
+    def reset_save(self):
+        """Forget the save state before the PNG is written again"""
+        self.saved.clear()
+        self.save_done.clear()
+        self.save_error = None
+
+    def wait_saved(self, timeout=None):
+        """
+        Wait for the PNG to be written
+
+        Returns:
+        - True once it is on disk; False if the save failed or did not finish within timeout
+        """
+        if not self.save_done.wait(timeout):
+            return False
+        return self.saved.is_set()
+
+_captured_images = OrderedDict()
+_captured_images_lock = threading.Lock()
+
+def remember_captured_image(image):
+    """Keep a capture available by path, so path-based callers and the file route use memory"""
+    with _captured_images_lock:
+        _captured_images[image.path] = image
+        _captured_images.move_to_end(image.path)
+        while len(_captured_images) > CAPTURED_IMAGE_CACHE_SIZE:
+            _captured_images.popitem(last=False)
+
+def get_captured_image(image_path):
+    """The in-memory capture saved (or being saved) at image_path, or None"""
+    with _captured_images_lock:
+        return _captured_images.get(image_path)
+
+# --- Provider uploads ---
+
+_prepared_cache = OrderedDict()
+_prepared_cache_lock = threading.Lock()
+
+def prepare_image_for_provider(image, provider):
+    """
+    Crop a screenshot to its text region and encode it for upload to a provider.
+    The file on disk is not modified.
+
+    Parameters:
+    - image: CapturedImage, or path to the screenshot
+    - provider: "claude", "openai" or "gemini"
+
+    Returns:
+    - (bytes, mime_type); the original PNG bytes if Pillow is not installed
+    """
+    if isinstance(image, CapturedImage):
+        return image.prepared(provider)
+    captured = get_captured_image(image)
+    if captured is not None:
+        return captured.prepared(provider)
+
+    image_path = image
+    if Image is None:
+        with open(image_path, "rb") as image_file:
+            return image_file.read(), "image/png"
+
+    cache_key = (image_path, os.path.getmtime(image_path), tuple(sorted(_provider_settings(provider).items())))
+    with _prepared_cache_lock:
+        if cache_key in _prepared_cache:
+            _prepared_cache.move_to_end(cache_key)
+            return _prepared_cache[cache_key]
+
+    with Image.open(image_path) as opened:
+        prepared = prepare_pil_image(opened, provider, os.path.basename(image_path))
+
+    with _prepared_cache_lock:
+        _prepared_cache[cache_key] = prepared
+        while len(_prepared_cache) > PREPARED_CACHE_SIZE:
+            _prepared_cache.popitem(last=False)
+    return prepared
+
+def image_base64_for_provider(image, provider):
+    """
+    Base64 form of prepare_image_for_provider (cached for in-memory captures)
+
+    Returns:
+    - (base64_string, mime_type)
+    """
+    if not isinstance(image, CapturedImage):
+        image = get_captured_image(image) or image
+    if isinstance(image, CapturedImage):
+        return image.base64(provider)
+    data, mime_type = prepare_image_for_provider(image, provider)
+    return base64.b64encode(data).decode('utf-8'), mime_type
+
+# --- Benchmark ---
+
+def benchmark_encoding(image_path, runs=3, extract=False):
+    """
+    Measure encode time and upload size for every encoder at each provider's size,
+    and optionally the Gemini extraction latency for each variant
+
+    Parameters:
+    - image_path: Full-resolution screenshot to encode
+    - runs: Encodes per variant (the median time is reported)
+    - extract: Also time extract_coding_question_with_gemini on each variant
+
+    Returns:
+    - List of result dicts
+    """
+    if Image is None:
+        print("Pillow is not installed; only the original PNG can be uploaded")
+        return []
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+    print(f"Source: {image_path} {image.size[0]}x{image.size[1]}, {os.path.getsize(image_path)} bytes on disk")
+
+    variants = [("native png level 6", "png", None, {"png_level": 6}),
+                ("native png level 1", "png", None, {"png_level": 1})]
+    for provider, settings in PROVIDER_IMAGE_SETTINGS.items():
+        for image_format in ENCODERS:
+            options = {k: v for k, v in settings.items() if k not in ("format", "max_long_edge")}
+            variants.append((f"{provider} {image_format} {settings['max_long_edge']}px",
+                             image_format, settings["max_long_edge"], options))
+
+    results = []
+    for name, image_format, max_long_edge, options in variants:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            data, mime_type = encode_image(image, image_format, max_long_edge, **options)
+            timings.append((time.perf_counter() - start) * 1000)
+        result = {"variant": name, "encode_ms": round(sorted(timings)[len(timings) // 2], 1), "bytes": len(data)}
+
+        if extract:
+            from gemini_api.common import genai, configure_gemini
+            from gemini_api.prompts import get_coding_question_extraction_prompt
+            if configure_gemini():
+                start = time.perf_counter()
+                genai.GenerativeModel('gemini-2.0-flash').generate_content(
+                    [get_coding_question_extraction_prompt(), {"mime_type": mime_type, "data": data}])
+                result["extract_ms"] = round((time.perf_counter() - start) * 1000)
+
+        print(", ".join(f"{key}={value}" for key, value in result.items()))
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    # python image_encoding.py screenshots/screenshot_x.png [--extract]
+    if len(sys.argv) < 2:
+        print("Usage: python image_encoding.py <screenshot.png> [--extract]")
+        sys.exit(1)
+    benchmark_encoding(sys.argv[1], extract="--extract" in sys.argv)
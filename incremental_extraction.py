@@ -0,0 +1,120 @@
+# incremental_extraction.py
+# Incremental structured question extraction.
+# Keeps the last structured result (question / entities / api) together with the
+# transcript cursor it was computed at; later extractions send only the segments
+# after the cursor plus the current structure, and merge the answer field by field.
+import json
+import threading
+
+from transcript_context import estimate_tokens
+
+# Fields of the structured design extraction
+STRUCTURE_FIELDS = ("question", "entities", "api")
+# Deltas larger than this are re-extracted from the full transcript context instead
+DEFAULT_MAX_DELTA_TOKENS = 4000
+
+def merge_structure(current, update):
+    """
+    Merge an incremental update into the current structure
+
+    Parameters:
+    - current: Current structure dict
+    - update: Update dict from the model (new_question flag plus fields; empty means unchanged)
+
+    Returns:
+    - New merged structure dict
+    """
+    if update.get("new_question") and (update.get("question") or "").strip():
+        # A different question replaces the old structure entirely
+        return {field: update.get(field) or "" for field in STRUCTURE_FIELDS}
+
+    merged = dict(current)
+    for field in STRUCTURE_FIELDS:
+        value = update.get(field)
+        if isinstance(value, str) and value.strip():
+            merged[field] = value
+    return merged
+
+class IncrementalDesignExtractor:
+    """
+    Stateful wrapper around the full and delta extraction calls.
+    Extractions are serialized because each one builds on the previous result.
+    """
+    def __init__(self, full_extract_fn, delta_extract_fn, max_delta_tokens=DEFAULT_MAX_DELTA_TOKENS):
+        """
+        Parameters:
+        - full_extract_fn: Callable (transcript_text) -> JSON string or None
+        - delta_extract_fn: Callable (current_structure, new_transcript) -> update dict or None
+        - max_delta_tokens: Largest delta sent incrementally
+        """
+        self.full_extract_fn = full_extract_fn
+        self.delta_extract_fn = delta_extract_fn
+        self.max_delta_tokens = max_delta_tokens
+
+        self._extract_lock = threading.Lock()  # one extraction at a time
+        self._state_lock = threading.Lock()
+        self._structure = None
+        self._cursor = 0            # last segment ID covered by _structure
+        self._generation = 0        # bumped on reset so in-flight results are discarded
+
+    def reset(self):
+        """Forget the structure and cursor (call when the transcript is cleared)"""
+        with self._state_lock:
+            self._structure = None
+            self._cursor = 0
+            self._generation += 1
+
+    def extract(self, full_transcript_text, segments_after_fn, through_id):
+        """
+        Extract the structured question, incrementally when possible
+
+        Parameters:
+        - full_transcript_text: Prompt-ready transcript context, used for full extractions
+        - segments_after_fn: Callable (segment_id) -> segments with a larger ID
+        - through_id: Last segment ID the result should cover
+
+        Returns:
+        - The structure as a JSON string, or None if extraction failed
+        """
+        with self._extract_lock:
+            with self._state_lock:
+                structure = self._structure
+                cursor = self._cursor
+                generation = self._generation
+
+            # 1. Collect what is new since the last extraction
+            new_segments = []
+            if structure is not None:
+                new_segments = [segment for segment in segments_after_fn(cursor) if segment["id"] <= through_id]
+                if not new_segments:
+                    print(f"No new transcript segments since {cursor}; reusing extracted question")
+                    return json.dumps(structure)
+            delta_text = "\n".join(segment.get("text", "") for segment in new_segments)
+
+            # 2. Delta extraction when there is a base structure and the delta is small enough
+            updated = None
+            if structure is not None and estimate_tokens(delta_text) <= self.max_delta_tokens:
+                update = self.delta_extract_fn(structure, delta_text)
+                if isinstance(update, dict):
+                    updated = merge_structure(structure, update)
+                    print(f"Incremental extraction merged {len(new_segments)} new segments (after segment {cursor})")
+
+            # 3. Otherwise (first extraction, large delta or failed update) extract from the full context
+            if updated is None:
+                result = self.full_extract_fn(full_transcript_text)
+                if not result:
+                    return None
+                try:
+                    parsed = json.loads(result)
+                except ValueError:
+                    # Keep returning the raw string; the next call starts from scratch again
+                    print("Full extraction did not return valid JSON; not caching it for incremental updates")
+                    return result
+                updated = {field: parsed.get(field) or "" for field in STRUCTURE_FIELDS}
+
+            # 4. Remember the result and the cursor it was computed at
+            with self._state_lock:
+                if generation == self._generation:
+                    self._structure = updated
+                    self._cursor = through_id
+            return json.dumps(updated)
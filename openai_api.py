@@ -1,47 +1,77 @@
 import os
 import base64
-import requests
 import json
 from typing import Optional, Dict
-from openai import OpenAI
+from provider_clients import get_openai_client
+from image_encoding import CapturedImage, image_base64_for_provider, prepare_image_for_provider
+from provider_uploads import UploadCache
+from screenshot_ocr import confident_ocr_text, ocr_extraction_prompt, OCR_MODE
 
-def encode_image_to_base64(image_path: str) -> str:
+def encode_image_to_base64(image_path) -> str:
     """
     Encode an image file to base64 string
     
     Parameters:
-    - image_path: Path to the image file
+    - image_path: Path to the image file, or an in-memory CapturedImage
     
     Returns:
     - Base64 encoded string of the image
     """
+    if isinstance(image_path, CapturedImage):
+        return image_path.base64()[0]
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
-def extract_coding_question_with_openai(image_path: str) -> Optional[str]:
+# Uploaded screenshots are referenced for this long, and deleted by OpenAI an hour later
+OPENAI_UPLOAD_TTL_SECONDS = int(os.environ.get("OPENAI_UPLOAD_TTL_SECONDS", 24 * 3600))
+
+def _upload_to_openai(data, mime_type, client):
+    """Upload image bytes through the OpenAI Files API and return the file ID"""
+    extension = mime_type.split("/")[-1]
+    uploaded = client.files.create(
+        file=(f"screenshot.{extension}", data, mime_type),
+        purpose="vision",
+        expires_after={"anchor": "created_at", "seconds": OPENAI_UPLOAD_TTL_SECONDS + 3600}
+    )
+    return uploaded.id
+
+openai_uploads = UploadCache(_upload_to_openai, OPENAI_UPLOAD_TTL_SECONDS, name="OpenAI")
+
+def _complete_with_image(client, prompt_text, image_path, max_tokens):
     """
-    Send an image to OpenAI API to extract a coding question
-    
+    Ask gpt-4o-mini about a screenshot
+
+    The image is uploaded once and referenced by file ID (Responses API); if uploading is
+    off, the image is small, the upload failed or OpenAI rejects the file ID (expired or
+    deleted), it is sent inline as base64 (Chat Completions).
+
     Parameters:
-    - image_path: Path to the screenshot image
-    
+    - client: OpenAI client
+    - prompt_text: Instruction sent with the image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
+    - max_tokens: Output token limit
+
     Returns:
-    - Extracted coding question as a string, or None if extraction failed
+    - Response text, or None if the response was empty
     """
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        print("Error: OPENAI_API_KEY environment variable not set")
-        return None
-    
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=api_key)
-    
-    try:
-        # Load the image
-        with open(image_path, "rb") as image_file:
-            image_data = image_file.read()
-        
-        # Create a prompt with the image
+    def with_file(file_id):
+        response = client.responses.create(
+            model="gpt-4o-mini",
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": prompt_text},
+                        {"type": "input_image", "file_id": file_id}
+                    ]
+                }
+            ],
+            max_output_tokens=max_tokens
+        )
+        return response.output_text if response else None
+
+    def inline():
+        base64_image, mime_type = image_base64_for_provider(image_path, "openai")
         response = client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
@@ -50,23 +80,75 @@ def extract_coding_question_with_openai(image_path: str) -> Optional[str]:
                     "content": [
                         {
                             "type": "text",
-                            "text": "Extract the coding question from this screenshot. Return only the question text without any additional commentary or explanation."
+                            "text": prompt_text
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{encode_image_to_base64(image_path)}"
+                                "url": f"data:{mime_type};base64,{base64_image}"
                             }
                         }
                     ]
                 }
             ],
-            max_tokens=1000
+            max_tokens=max_tokens
         )
+        if response and response.choices and len(response.choices) > 0:
+            return response.choices[0].message.content
+        return None
+
+    image_data, mime_type = prepare_image_for_provider(image_path, "openai")
+    return openai_uploads.call_with_reference(image_data, mime_type, with_file, inline, client)
+
+def extract_coding_question_with_openai(image_path) -> Optional[str]:
+    """
+    Send an image to OpenAI API to extract a coding question
+    
+    Parameters:
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
+    
+    Returns:
+    - Extracted coding question as a string, or None if extraction failed
+    """
+    # Local OCR fast path (OCR_MODE): confident text skips the vision call
+    ocr_text = confident_ocr_text(image_path)
+    if ocr_text and OCR_MODE == "skip":
+        print("Returning OCR text without calling OpenAI")
+        return ocr_text
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY environment variable not set")
+        return None
+    
+    # Shared OpenAI client (keep-alive pool, timeouts)
+    client = get_openai_client(api_key)
+    
+    try:
+        if ocr_text:
+            # Text-only request built from the OCR result
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": ocr_extraction_prompt(ocr_text)
+                    }
+                ],
+                max_tokens=1000
+            )
+            extracted_question = response.choices[0].message.content if response and response.choices else None
+        else:
+            # Send the image (downscaled and encoded for OpenAI, uploaded once, then referenced)
+            extracted_question = _complete_with_image(
+                client,
+                "Extract the coding question from this screenshot. Return only the question text without any additional commentary or explanation.",
+                image_path,
+                1000
+            )
         
         # Extract the question from OpenAI's response
-        if response and response.choices and len(response.choices) > 0:
-            extracted_question = response.choices[0].message.content
+        if extracted_question:
             return extracted_question.strip()
         else:
             print("Empty response from OpenAI API")
@@ -76,12 +158,42 @@ def extract_coding_question_with_openai(image_path: str) -> Optional[str]:
         print(f"Exception when calling OpenAI API: {str(e)}")
         return None
 
-def get_solution_for_question_with_openai(question: str) -> Optional[Dict[str, str]]:
+def _complete_text(client, prompt, max_tokens, on_token=None):
+    """
+    Ask gpt-4o-mini for a text completion
+
+    Parameters:
+    - client: OpenAI client
+    - prompt: User message
+    - max_tokens: Output token limit
+    - on_token: Optional callable receiving each text delta as it is generated (streams the response)
+
+    Returns:
+    - Response text, or None if the response was empty
+    """
+    messages = [{"role": "user", "content": prompt}]
+    if on_token is None:
+        response = client.chat.completions.create(model="gpt-4o-mini", messages=messages, max_tokens=max_tokens)
+        if response and response.choices and len(response.choices) > 0:
+            return response.choices[0].message.content
+        return None
+
+    parts = []
+    stream = client.chat.completions.create(model="gpt-4o-mini", messages=messages, max_tokens=max_tokens, stream=True)
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    return "".join(parts) or None
+
+def get_solution_for_question_with_openai(question: str, on_token=None) -> Optional[Dict[str, str]]:
     """
     Send a coding question to OpenAI API to get a solution
     
     Parameters:
     - question: The coding question to solve
+    - on_token: Optional callable receiving each text delta as it is generated
     
     Returns:
     - Dictionary containing explanation, code, complexity, and strategy, or None if failed
@@ -91,8 +203,8 @@ def get_solution_for_question_with_openai(question: str) -> Optional[Dict[str, s
         print("Error: OPENAI_API_KEY environment variable not set")
         return None
     
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=api_key)
+    # Shared OpenAI client (keep-alive pool, timeouts)
+    client = get_openai_client(api_key)
     
     # Construct the prompt for OpenAI
     prompt = f"""
@@ -114,17 +226,10 @@ Format your response with clear section headers for each component.
 """
     
     try:
-        # Generate the solution
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000
-        )
+        # Generate the solution (streamed when on_token is given)
+        solution_text = _complete_text(client, prompt, 4000, on_token)
         
-        if response and response.choices and len(response.choices) > 0:
-            solution_text = response.choices[0].message.content
+        if solution_text:
             
             # Parse the solution text to extract the different sections
             explanation = ""
@@ -177,12 +282,12 @@ Format your response with clear section headers for each component.
         print(f"Exception when calling OpenAI API for solution: {str(e)}")
         return None
 
-def extract_react_question_with_openai(image_path: str) -> Optional[str]:
+def extract_react_question_with_openai(image_path) -> Optional[str]:
     """
     Send an image to OpenAI API to extract a React-specific question
 
     Parameters:
-    - image_path: Path to the screenshot image
+    - image_path: Path to the screenshot image, or the in-memory CapturedImage
 
     Returns:
     - Extracted React question as a string, or None if extraction failed
@@ -192,42 +297,18 @@ def extract_react_question_with_openai(image_path: str) -> Optional[str]:
         print("Error: OPENAI_API_KEY environment variable not set")
         return None
 
-    # Initialize the OpenAI client
-    client = OpenAI(api_key=api_key)
+    # Shared OpenAI client (keep-alive pool, timeouts)
+    client = get_openai_client(api_key)
 
     # Simplified prompt for OpenAI React question extraction
     prompt_text = """Extract the React coding question shown in this image. Return only the question text."""
 
     try:
-        # Encode the image
-        base64_image = encode_image_to_base64(image_path)
-
-        # Create a prompt with the image
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", # Using gpt-4o-mini as in other functions
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt_text
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000 # Allow sufficient tokens for potentially long questions
-        )
+        # Send the image (downscaled and encoded for OpenAI, uploaded once, then referenced)
+        extracted_question = _complete_with_image(client, prompt_text, image_path, 1000) # Allow sufficient tokens for potentially long questions
 
         # Extract the question from OpenAI's response
-        if response and response.choices and len(response.choices) > 0:
-            extracted_question = response.choices[0].message.content
+        if extracted_question:
             return extracted_question.strip()
         else:
             print("Empty response from OpenAI API for React question extraction")
@@ -0,0 +1,204 @@
+# provider_clients.py
+# Shared, long-lived HTTP clients for the LLM providers.
+# Every provider call used to open its own connection (a fresh TCP + TLS handshake, and
+# for OpenAI a fresh client object) and had no timeout, so a hung request blocked its
+# thread forever. Calls now go through one keep-alive pool per provider with connect and
+# read timeouts; HTTP/2 is used for Claude when httpx with h2 is installed and enabled.
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# httpx (with the h2 extra) is optional: without it Claude calls use the requests pool
+try:
+    import httpx
+    import h2  # noqa: F401 (httpx needs it for http2=True)
+except ImportError:
+    httpx = None
+
+# Seconds to establish a connection, and to wait for response data once connected
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("PROVIDER_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT_SECONDS = float(os.environ.get("PROVIDER_READ_TIMEOUT", 120))
+# Keep-alive connections per host (concurrent extraction and solution calls)
+POOL_SIZE = int(os.environ.get("PROVIDER_POOL_SIZE", 10))
+# Use HTTP/2 where the client supports it (PROVIDER_HTTP2=1, needs httpx[http2])
+PROVIDER_HTTP2 = os.environ.get("PROVIDER_HTTP2", "0") == "1"
+
+_lock = threading.Lock()
+_session = None
+_http2_client = None
+_openai_clients = {}    # api_key -> OpenAI client
+_gemini_api_key = None  # key genai was last configured with
+
+def get_session():
+    """Shared requests.Session with a keep-alive pool of POOL_SIZE connections per host"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def get_http2_client():
+    """Shared HTTP/2 httpx client, or None if HTTP/2 is off or httpx[http2] is missing"""
+    global _http2_client
+    if not PROVIDER_HTTP2 or httpx is None:
+        return None
+    with _lock:
+        if _http2_client is None:
+            _http2_client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            )
+        return _http2_client
+
+def post_json(url, headers, payload, timeout=None):
+    """
+    POST a JSON payload through the shared pool
+
+    Parameters:
+    - url: Endpoint URL
+    - headers: Request headers
+    - payload: JSON-serialisable body
+    - timeout: Read timeout in seconds (default READ_TIMEOUT_SECONDS)
+
+    Returns:
+    - Response with status_code, text and json() (requests or httpx)
+    """
+    read_timeout = timeout or READ_TIMEOUT_SECONDS
+    client = get_http2_client()
+    if client is not None:
+        return client.post(url, headers=headers, json=payload,
+                           timeout=httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT_SECONDS))
+    return get_session().post(url, headers=headers, json=payload,
+                              timeout=(CONNECT_TIMEOUT_SECONDS, read_timeout))
+
+def _parse_sse(lines):
+    """(event, data) pairs from the lines of a Server-Sent Events body"""
+    event, data = None, []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+def post_json_events(url, headers, payload, timeout=None):
+    """
+    POST a JSON payload through the shared pool and iterate the streamed (SSE) response
+
+    Parameters:
+    - url: Endpoint URL
+    - headers: Request headers
+    - payload: JSON-serialisable body (asking the provider to stream)
+    - timeout: Read timeout in seconds between chunks (default READ_TIMEOUT_SECONDS)
+
+    Yields:
+    - (event, data) pairs; data is the raw data string
+
+    Raises:
+    - RuntimeError with the status code and body if the request was rejected
+    """
+    read_timeout = timeout or READ_TIMEOUT_SECONDS
+    client = get_http2_client()
+    if client is not None:
+        with client.stream("POST", url, headers=headers, json=payload,
+                           timeout=httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT_SECONDS)) as response:
+            if response.status_code != 200:
+                response.read()
+                raise RuntimeError(f"{response.status_code}: {response.text}")
+            yield from _parse_sse(response.iter_lines())
+        return
+    with get_session().post(url, headers=headers, json=payload, stream=True,
+                            timeout=(CONNECT_TIMEOUT_SECONDS, read_timeout)) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.text}")
+        response.encoding = "utf-8"
+        yield from _parse_sse(response.iter_lines(decode_unicode=True))
+
+def get_openai_client(api_key):
+    """
+    Cached OpenAI client for api_key (the SDK keeps its own keep-alive pool per client)
+
+    Returns:
+    - OpenAI client with connect/read timeouts (and HTTP/2 when enabled and available)
+    """
+    from openai import OpenAI
+    with _lock:
+        client = _openai_clients.get(api_key)
+        if client is None:
+            options = {"api_key": api_key, "timeout": READ_TIMEOUT_SECONDS}
+            if httpx is not None:
+                timeout = httpx.Timeout(READ_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+                options["timeout"] = timeout
+                if PROVIDER_HTTP2:
+                    options["http_client"] = httpx.Client(
+                        http2=True, timeout=timeout,
+                        limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
+            client = OpenAI(**options)
+            _openai_clients[api_key] = client
+        return client
+
+def configure_gemini_client(genai, api_key):
+    """
+    Configure google.generativeai once per API key.
+    Re-running genai.configure drops the SDK's cached clients (and their open channel),
+    so it is only called again when the key changes.
+    """
+    global _gemini_api_key
+    with _lock:
+        if _gemini_api_key != api_key:
+            genai.configure(api_key=api_key)
+            _gemini_api_key = api_key
+
+# Per-call options for Gemini generate_content (the SDK has no client-wide timeout)
+GEMINI_REQUEST_OPTIONS = {"timeout": READ_TIMEOUT_SECONDS}
+
+# --- Benchmark ---
+
+def benchmark_connections(url, runs=5):
+    """
+    Compare request latency on a cold connection (new session per request) with the
+    shared keep-alive pool
+
+    Parameters:
+    - url: Any HTTPS URL on the provider host (the status code does not matter)
+    - runs: Requests per mode
+
+    Returns:
+    - Dictionary with cold_ms and warm_ms lists
+    """
+    results = {"cold_ms": [], "warm_ms": []}
+    for _ in range(runs):
+        with requests.Session() as session:
+            start = time.perf_counter()
+            session.get(url, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+            results["cold_ms"].append(round((time.perf_counter() - start) * 1000, 1))
+    session = get_session()
+    session.get(url, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))  # open the pooled connection
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.get(url, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+        results["warm_ms"].append(round((time.perf_counter() - start) * 1000, 1))
+    return results
+
+if __name__ == "__main__":
+    # python provider_clients.py [url] [runs]
+    import sys
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://api.anthropic.com/v1/messages"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    results = benchmark_connections(url, runs)
+    for mode, times in results.items():
+        print(f"{mode}: median {sorted(times)[len(times) // 2]} ms  {times}")
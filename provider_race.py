@@ -0,0 +1,128 @@
+# provider_race.py
+# Races one request across several providers.
+# Every candidate gets the same input at once; the first valid (non-empty) result wins
+# and the rest are ignored (queued ones are cancelled, running ones finish in the
+# background and still count towards the latency statistics). Per-provider wins and
+# latencies are recorded so the race set can be tuned.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Parallel provider calls across all races
+DEFAULT_MAX_WORKERS = 8
+# Seconds a race waits for a valid result
+DEFAULT_RACE_TIMEOUT_SECONDS = 60
+# Latency samples kept per provider
+LATENCY_SAMPLES = 100
+
+def is_valid_result(result):
+    """Default validity check: a non-empty string (or any other non-empty value)"""
+    if isinstance(result, str):
+        return bool(result.strip())
+    return bool(result)
+
+class ProviderRace:
+    """
+    Runs candidate functions concurrently and returns the first valid result,
+    keeping win and latency statistics per provider name.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_RACE_TIMEOUT_SECONDS,
+                 is_valid=is_valid_result):
+        """
+        Parameters:
+        - max_workers: Thread pool size shared by all races
+        - timeout: Seconds a race waits for a valid result
+        - is_valid: Callable (result) -> bool deciding whether a result can win
+        """
+        self.timeout = timeout
+        self.is_valid = is_valid
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="race")
+        self._lock = threading.Lock()
+        self._stats = {}   # name -> {"races", "wins", "failures", "latencies"}
+
+    def _provider_stats(self, name):
+        return self._stats.setdefault(name, {"races": 0, "wins": 0, "failures": 0,
+                                             "latencies": deque(maxlen=LATENCY_SAMPLES)})
+
+    def _timed_call(self, name, fn, args):
+        """Worker: call fn and record its latency and outcome"""
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            print(f"Error from {name} in race: {e}")
+            result = None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        valid = self.is_valid(result)
+        with self._lock:
+            stats = self._provider_stats(name)
+            if valid:
+                stats["latencies"].append(elapsed_ms)
+            else:
+                stats["failures"] += 1
+        return result if valid else None, elapsed_ms
+
+    def run(self, candidates, *args):
+        """
+        Race candidates on the same arguments
+
+        Parameters:
+        - candidates: List of (name, fn) pairs
+        - args: Arguments passed to every fn
+
+        Returns:
+        - (winner_name, result, elapsed_ms), or (None, None, None) if no candidate
+          produced a valid result in time
+        """
+        if not candidates:
+            return None, None, None
+        start = time.perf_counter()
+        with self._lock:
+            for name, _ in candidates:
+                self._provider_stats(name)["races"] += 1
+        futures = {self._executor.submit(self._timed_call, name, fn, args): name for name, fn in candidates}
+
+        pending = set(futures)
+        deadline = start + self.timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break  # timed out
+            for future in done:
+                result, _ = future.result()
+                if result is None:
+                    continue
+                name = futures[future]
+                for other in pending:
+                    other.cancel()  # only stops calls that have not started
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    self._provider_stats(name)["wins"] += 1
+                print(f"{name} won the race in {elapsed_ms:.0f} ms")
+                return name, result, elapsed_ms
+        print(f"No valid result from {', '.join(futures.values())}")
+        return None, None, None
+
+    def stats(self):
+        """Per-provider races, wins, win rate, failures and latency (ms) of valid results"""
+        with self._lock:
+            summary = {}
+            for name, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                summary[name] = {
+                    "races": stats["races"],
+                    "wins": stats["wins"],
+                    "win_rate": round(stats["wins"] / stats["races"], 3) if stats["races"] else 0.0,
+                    "failures": stats["failures"],
+                    "mean_ms": round(sum(latencies) / len(latencies)) if latencies else None,
+                    "p50_ms": round(latencies[len(latencies) // 2]) if latencies else None,
+                    "p90_ms": round(latencies[int(len(latencies) * 0.9)]) if latencies else None,
+                }
+            return summary
+
+    def reset_stats(self):
+        """Forget all statistics"""
+        with self._lock:
+            self._stats.clear()
@@ -0,0 +1,152 @@
+# provider_uploads.py
+# Upload cache for provider file APIs.
+# Inline base64 images make every request carry the whole screenshot again. With the
+# cache, a prepared upload is sent once through the provider's file API and later calls
+# reference the returned file, keyed by a digest of the uploaded bytes, until the
+# provider-side file is due to expire.
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from single_flight import SingleFlight
+
+# Send screenshots through the provider file APIs (PROVIDER_UPLOADS=0 to always inline them)
+PROVIDER_UPLOADS = os.environ.get("PROVIDER_UPLOADS", "1") != "0"
+# Smaller uploads are inlined: the extra upload round trip costs more than the bytes saved
+UPLOAD_MIN_BYTES = int(os.environ.get("UPLOAD_MIN_BYTES", 256 * 1024))
+# Uploads remembered per provider
+UPLOAD_CACHE_SIZE = 64
+
+# HTTP statuses with which providers reject a file reference (expired or deleted on their side)
+REJECTED_REFERENCE_STATUSES = (400, 403, 404)
+# Error messages of those rejections; other errors with the same statuses are real bad requests
+# (OpenAI: "No such File object" / "... file ... not found", Gemini: "... access the File ... or it may not exist")
+REJECTED_REFERENCE_MESSAGE = re.compile(
+    r"\bno such file\b|\bfile\b.*\b(not found|not exist|expired|deleted|no longer)|\b(not found|expired|deleted)\b.*\bfile\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+def upload_key(data):
+    """Content key of an upload (hex digest of its bytes)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def is_rejected_reference(error):
+    """Whether a provider error means the referenced file is no longer usable (not found or expired)"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    try:
+        if int(status) not in REJECTED_REFERENCE_STATUSES:
+            return False
+    except (TypeError, ValueError):
+        return False
+    return REJECTED_REFERENCE_MESSAGE.search(str(error)) is not None
+
+class UploadCache:
+    """
+    Remembers the provider file reference for each uploaded content digest, with a TTL.
+    Concurrent requests for the same bytes share one upload.
+    """
+    def __init__(self, upload_fn, ttl_seconds, max_entries=UPLOAD_CACHE_SIZE, name="provider"):
+        """
+        Parameters:
+        - upload_fn: Callable (data, mime_type, *args) -> file reference (ID or file object)
+        - ttl_seconds: How long a reference is used after its upload (keep below the provider's expiry)
+        - max_entries: References kept (least recently used are dropped)
+        - name: Provider name for log messages
+        """
+        self.upload_fn = upload_fn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (reference, expires_at)
+        self._uploads = SingleFlight(max_results=0)
+        self._stats = {"uploads": 0, "hits": 0, "failures": 0}
+
+    def get(self, data, mime_type, *args):
+        """
+        File reference for an upload, uploading it on first use
+
+        Parameters:
+        - data: Upload bytes
+        - mime_type: MIME type of data
+        - args: Extra arguments for upload_fn (e.g. the API client)
+
+        Returns:
+        - The file reference, or None if uploads are off, data is small or the upload failed
+          (the caller then sends the image inline)
+        """
+        if not PROVIDER_UPLOADS or len(data) < UPLOAD_MIN_BYTES:
+            return None
+        key = upload_key(data)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[0]
+
+        try:
+            reference, shared = self._uploads.do(key, self._upload, key, data, mime_type, *args)
+        except Exception as e:
+            print(f"Error uploading image to {self.name}: {e}")
+            with self._lock:
+                self._stats["failures"] += 1
+            return None
+        return reference
+
+    def _upload(self, key, data, mime_type, *args):
+        """Upload once and remember the reference"""
+        start = time.perf_counter()
+        reference = self.upload_fn(data, mime_type, *args)
+        print(f"Uploaded {len(data) // 1024} KB image to {self.name} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        with self._lock:
+            self._stats["uploads"] += 1
+            self._entries[key] = (reference, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return reference
+
+    def call_with_reference(self, data, mime_type, with_reference, inline, *args):
+        """
+        Make a request with the uploaded file, falling back to sending the image inline
+
+        Parameters:
+        - data: Upload bytes
+        - mime_type: MIME type of data
+        - with_reference: Callable (reference) -> result, the request referencing the upload
+        - inline: Callable () -> result, the same request with the image inline
+        - args: Extra arguments for upload_fn
+
+        Returns:
+        - The result of with_reference, or of inline if there is no reference or the provider
+          rejected it (the stale reference is then forgotten and the request retried once inline)
+        """
+        reference = self.get(data, mime_type, *args)
+        if reference is None:
+            return inline()
+        try:
+            return with_reference(reference)
+        except Exception as e:
+            if not is_rejected_reference(e):
+                raise
+            print(f"{self.name} rejected the uploaded image ({e}); retrying inline")
+            self.invalidate(data)
+            return inline()
+
+    def invalidate(self, data):
+        """Forget the reference for data (e.g. the provider no longer has the file)"""
+        with self._lock:
+            self._entries.pop(upload_key(data), None)
+
+    def stats(self):
+        """Upload, hit and failure counters and the number of live references"""
+        now = time.time()
+        with self._lock:
+            live = sum(1 for _, expires_at in self._entries.values() if expires_at > now)
+            return {"references": live, **self._stats}
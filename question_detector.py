@@ -0,0 +1,173 @@
+# question_detector.py
+# Cheap local detector for "the interviewer just asked a new question".
+# Runs on every transcript segment using lexical cues and question patterns only
+# (no LLM), so it can trigger question extraction in the background.
+import json
+import os
+import re
+
+# Score a window must reach to count as a new question
+DEFAULT_THRESHOLD = 2.0
+# Number of segments scored together (Whisper chunks often split a sentence)
+DEFAULT_WINDOW_SEGMENTS = 2
+# Minimum number of segments between two triggers, so one question fires once
+DEFAULT_COOLDOWN_SEGMENTS = 3
+
+# (pattern, weight) pairs; each pattern counts at most once per window
+QUESTION_CUES = [
+    # Explicit question mark
+    (re.compile(r"\?"), 1.0),
+    # Clause starting with an interrogative word (spoken questions often open with "so", "and", "like")
+    (re.compile(r"(^|[.?!,]\s+|\b(and|so|like|but|then|okay)\s+)(how|what|why|which|where|when|who)\b", re.MULTILINE), 1.0),
+    # Second-person question phrasing anywhere in the window
+    (re.compile(r"\b(do|did|are|were|have|would|could|can|will) you\b|\bhow (many|much|long)\b"), 1.0),
+    # Clause starting with an auxiliary verb addressed to someone ("do you", "is it", ...)
+    (re.compile(r"(^|[.?!,]\s+)(can|could|would|will|do|does|did|is|are|have|has|was|were)\s+(you|we|it|this|that|there|the)\b", re.MULTILINE), 1.0),
+    # Typical interviewer prompts
+    (re.compile(r"\b(describe|explain|talk about|hear (about|your)|"
+                r"i'?d like you to|can you|could you|how would you|what would you|what if|what about|how about|"
+                r"how did you|how do you|what was|what is your|what are you|any questions)\b"), 1.5),
+    # Open-ended prompts that are questions even without question syntax
+    (re.compile(r"\b(tell me|walk (me )?through)\b"), 2.0),
+    # Coding / design task statements
+    (re.compile(r"\b(let'?s design|design (a|an|the)|implement|write (a|an) (function|component|program|method|class)|"
+                r"build (a|an)|your task|the (question|problem|task) is|given (a|an) (array|string|list|tree|graph|number)|"
+                r"users should be able to|we'?ll focus|last question|next question)\b"), 2.0),
+]
+
+# Patterns that make a window less likely to be a real question
+NEGATIVE_CUES = [
+    # Tag questions ("..., right?") are usually rhetorical
+    (re.compile(r"\bright\?\s*$"), -1.0),
+    # Closing pleasantries and call logistics
+    (re.compile(r"\b(thank you|bye|see you)\b"), -0.5),
+    (re.compile(r"\b(hear me|see my screen|share my screen|how are you)\b"), -3.0),
+    # "What I mean is ..." style statements
+    (re.compile(r"\bwhat (i|we) (mean|need|want|really)\b"), -1.0),
+]
+
+# Whisper hallucinations and backchannel that should never count
+FILLER_PATTERN = re.compile(r"^[\s.,!?]*((you|thank you|thanks|bye|bye-bye|okay|ok|yeah|yes|no|mm-hmm|uh|um|got it)[\s.,!?]*)*$", re.IGNORECASE)
+
+def score_text(text):
+    """
+    Score how much a piece of transcript looks like a new question or task
+
+    Parameters:
+    - text: Transcript text
+
+    Returns:
+    - Score (higher means more likely a question)
+    """
+    if not text or FILLER_PATTERN.match(text):
+        return 0.0
+    lowered = text.lower().strip()
+    score = 0.0
+    for pattern, weight in QUESTION_CUES:
+        if pattern.search(lowered):
+            score += weight
+    for pattern, weight in NEGATIVE_CUES:
+        if pattern.search(lowered):
+            score += weight
+    return score
+
+class QuestionDetector:
+    """
+    Stateful detector fed one transcript segment at a time.
+    observe() returns True when the latest segments look like a new question.
+    """
+    def __init__(self, threshold=DEFAULT_THRESHOLD, window_segments=DEFAULT_WINDOW_SEGMENTS,
+                 cooldown_segments=DEFAULT_COOLDOWN_SEGMENTS):
+        """Create a detector with the given threshold, window and cooldown (in segments)"""
+        self.threshold = threshold
+        self.window_segments = window_segments
+        self.cooldown_segments = cooldown_segments
+        self.reset()
+
+    def reset(self):
+        """Forget previous segments (call when the transcript is cleared)"""
+        self._window = []
+        self._segments_since_trigger = None
+
+    def observe(self, text):
+        """
+        Feed the next transcript segment
+
+        Parameters:
+        - text: Segment text
+
+        Returns:
+        - True if a likely new question was detected at this segment
+        """
+        text = (text or "").strip()
+        # Every segment is a few seconds of audio, so the cooldown counts noise segments too
+        if self._segments_since_trigger is not None:
+            self._segments_since_trigger += 1
+        if not text or FILLER_PATTERN.match(text):
+            # Noise never triggers and doesn't break up the question window
+            return False
+
+        self._window = (self._window + [text])[-self.window_segments:]
+        if self._segments_since_trigger is not None and self._segments_since_trigger <= self.cooldown_segments:
+            return False
+
+        # The newest segment must carry a cue itself, otherwise the window would keep
+        # re-triggering on an older question
+        if score_text(text) <= 0:
+            return False
+        if score_text("\n".join(self._window)) < self.threshold:
+            return False
+
+        self._segments_since_trigger = 0
+        return True
+
+# --- Evaluation against labelled transcripts ---
+
+# Hand-labelled [first, last] line spans (1-based) where the interviewer asks a question or gives a task.
+# The cue weights and threshold were tuned on these same files, so the precision/recall
+# reported here is in-sample and optimistic; label a held-out transcript to measure it fairly.
+LABELS_FILE = "question_detector_labels.json"
+# A detection counts for a span if it fires up to this many lines outside it
+MATCH_SLACK = 1
+
+def evaluate(transcript_path, labelled_spans, detector=None):
+    """
+    Measure precision and recall of the detector on a transcript file with one segment per line
+
+    Parameters:
+    - transcript_path: Path to the transcript (e.g. transcription.txt)
+    - labelled_spans: [first, last] line spans in which a question is asked
+    - detector: Detector to evaluate (defaults to a new QuestionDetector)
+
+    Returns:
+    - Dictionary with precision, recall, detections, false positives and missed spans
+    """
+    detector = detector or QuestionDetector()
+    with open(transcript_path, "r") as f:
+        detections = [line_number for line_number, line in enumerate(f, 1) if detector.observe(line)]
+
+    def matches(detection, span):
+        return span[0] - MATCH_SLACK <= detection <= span[1] + MATCH_SLACK
+
+    true_positives = [d for d in detections if any(matches(d, span) for span in labelled_spans)]
+    found_spans = [span for span in labelled_spans if any(matches(d, span) for d in detections)]
+
+    return {
+        "precision": len(true_positives) / len(detections) if detections else 0.0,
+        "recall": len(found_spans) / len(labelled_spans) if labelled_spans else 0.0,
+        "detections": detections,
+        "false_positives": [d for d in detections if d not in true_positives],
+        "missed": [span for span in labelled_spans if span not in found_spans]
+    }
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base_dir, LABELS_FILE), "r") as f:
+        labels = json.load(f)
+
+    for transcript_file, labelled_spans in labels.items():
+        result = evaluate(os.path.join(base_dir, transcript_file), labelled_spans)
+        print(f"{transcript_file}: precision={result['precision']:.2f} recall={result['recall']:.2f} "
+              f"({len(result['detections'])} detections, {len(labelled_spans)} labelled questions)")
+        print(f"  false positives at lines: {result['false_positives']}")
+        print(f"  missed question spans: {result['missed']}")
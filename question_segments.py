@@ -0,0 +1,98 @@
+# question_segments.py
+# Maps interview questions and follow-ups to the transcript segment ranges they cover.
+# Each mark records the segment ID at which the question (or follow-up) starts; a
+# question's range runs until the next question starts, a follow-up's until the
+# next mark of either kind. Lookups are binary searches over the sorted marks.
+import bisect
+import threading
+
+# Segments before the mark included in its range: the question is usually spoken
+# just before it is marked in the UI
+DEFAULT_LEAD_SEGMENTS = 3
+
+class QuestionSegmentIndex:
+    """
+    Index from question / follow-up IDs to transcript segment ranges, and back.
+    Ranges are inclusive (first_id, last_id); last_id is None while the range is open.
+    """
+    def __init__(self, lead_segments=DEFAULT_LEAD_SEGMENTS):
+        """Create an empty index"""
+        self.lead_segments = lead_segments
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget every mark"""
+        with self._lock:
+            self._starts = []   # start segment IDs, ascending
+            self._marks = []    # (question_id, followup_id or None), parallel to _starts
+            self._positions = {}  # (question_id, followup_id) -> index into _starts
+
+    def _add_mark(self, question_id, followup_id, last_segment_id):
+        """Record a mark starting just before the segment after last_segment_id"""
+        with self._lock:
+            start = last_segment_id + 1 - self.lead_segments
+            # Never reach back into the previous mark's range
+            if self._starts:
+                start = max(start, self._starts[-1] + 1)
+            start = max(start, 1)
+            self._positions[(question_id, followup_id)] = len(self._starts)
+            self._starts.append(start)
+            self._marks.append((question_id, followup_id))
+            return start
+
+    def mark_question(self, question_id, last_segment_id):
+        """
+        Record that a question starts now
+
+        Parameters:
+        - question_id: ID of the new question
+        - last_segment_id: ID of the last transcribed segment at the time of marking
+
+        Returns:
+        - The first segment ID of the question's range
+        """
+        return self._add_mark(question_id, None, last_segment_id)
+
+    def mark_followup(self, question_id, followup_id, last_segment_id):
+        """
+        Record that a follow-up of question_id starts now
+
+        Returns:
+        - The first segment ID of the follow-up's range
+        """
+        return self._add_mark(question_id, followup_id, last_segment_id)
+
+    def get_range(self, question_id, followup_id=None):
+        """
+        Transcript segment range of a question (including its follow-ups) or of one follow-up
+
+        Parameters:
+        - question_id: Question ID
+        - followup_id: Follow-up ID within the question (None for the whole question)
+
+        Returns:
+        - (first_id, last_id) with last_id None if the range is still open, or None if unknown
+        """
+        with self._lock:
+            index = self._positions.get((question_id, followup_id))
+            if index is None:
+                return None
+            first_id = self._starts[index]
+
+            # The range ends where the next question starts (or the next mark, for a follow-up)
+            for next_index in range(index + 1, len(self._marks)):
+                if followup_id is not None or self._marks[next_index][1] is None:
+                    return first_id, self._starts[next_index] - 1
+            return first_id, None
+
+    def locate(self, segment_id):
+        """
+        Find which question / follow-up a segment belongs to
+
+        Returns:
+        - (question_id, followup_id or None), or None if the segment precedes every mark
+        """
+        with self._lock:
+            index = bisect.bisect_right(self._starts, segment_id) - 1
+            return self._marks[index] if index >= 0 else None
@@ -141,7 +141,8 @@ class WhisperTranscriber:
     
     def save_transcription_thread(self, output_file="transcription.txt"):
         """Thread function to save transcriptions to a file"""
-        with open(output_file, 'w') as f:
+        # Append so a restart doesn't wipe the earlier part of the session
+        with open(output_file, 'a') as f:
             while not self.stop_recording.is_set() or not self.text_queue.empty():
                 try:
                     # Get text with a timeout
@@ -0,0 +1,145 @@
+# screen_watcher.py
+# Background screen watcher for pre-emptive question extraction.
+# Samples the screen at a low frame rate and compares heavily downsampled frames; when
+# the picture has changed and then stayed still for a few samples (the interviewer
+# finished scrolling or pasting), a callback captures and extracts the new content so
+# a later button press finds the question already extracted.
+import threading
+import time
+
+import numpy as np
+
+# Seconds between samples
+DEFAULT_INTERVAL_SECONDS = 1.0
+# Every STEP-th pixel in each direction is compared (a 3440x1440 frame becomes 430x180)
+SAMPLE_STEP = 8
+# A sample pixel counts as changed when its level moves by more than this (0-255)
+PIXEL_DELTA = 24
+# Fraction of changed sample pixels above which the screen is still moving (cursor blinks stay below)
+MOTION_FRACTION = 0.002
+# Fraction of changed sample pixels, compared with the last settled frame, that counts as new content
+CONTENT_FRACTION = 0.02
+# Consecutive still samples before the screen counts as settled
+DEFAULT_SETTLE_SAMPLES = 2
+
+def downsample_frame(screenshot, step=SAMPLE_STEP):
+    """
+    Cheap grayscale thumbnail of an mss frame
+
+    Parameters:
+    - screenshot: mss ScreenShot (BGRA)
+    - step: Sampling stride in pixels
+
+    Returns:
+    - 2-D uint8 array (the green channel is close enough to luminance for change detection)
+    """
+    width, height = screenshot.size
+    pixels = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+    return np.ascontiguousarray(pixels[::step, ::step, 1])
+
+def changed_fraction(first, second):
+    """Fraction of sample pixels that differ by more than PIXEL_DELTA (1.0 if the shapes differ)"""
+    if first is None or second is None or first.shape != second.shape:
+        return 1.0
+    delta = np.abs(first.astype(np.int16) - second.astype(np.int16))
+    return float(np.count_nonzero(delta > PIXEL_DELTA)) / delta.size
+
+class ScreenWatcher:
+    """
+    Watches downsampled frames and calls on_settled once per new, settled screen.
+    The callback runs on its own thread; while it runs, further settles are deferred
+    (the screen is re-checked against the last handled frame once it finishes).
+    """
+    def __init__(self, grab_fn, on_settled, interval=DEFAULT_INTERVAL_SECONDS,
+                 settle_samples=DEFAULT_SETTLE_SAMPLES):
+        """
+        Parameters:
+        - grab_fn: Callable () -> downsampled frame array (or None if capture failed)
+        - on_settled: Callable () invoked when new content has settled
+        - interval: Seconds between samples
+        - settle_samples: Still samples needed before the screen counts as settled
+        """
+        self.grab_fn = grab_fn
+        self.on_settled = on_settled
+        self.interval = interval
+        self.settle_samples = settle_samples
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._busy = threading.Event()   # set while on_settled runs
+        self._stats = {"samples": 0, "settles": 0, "last_settled_at": None}
+
+    def start(self):
+        """Start sampling (no-op if already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._watch_loop, args=(self._stop,))
+            self._thread.daemon = True
+            self._thread.start()
+        print(f"Screen watcher started (every {self.interval}s)")
+
+    def stop(self):
+        """Stop sampling; a running callback finishes on its own"""
+        with self._lock:
+            self._stop.set()
+            self._thread = None
+        print("Screen watcher stopped")
+
+    def status(self):
+        """Running flag, settings and counters"""
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            return {
+                "running": running,
+                "interval": self.interval,
+                "extracting": self._busy.is_set(),
+                **self._stats
+            }
+
+    def _watch_loop(self, stop):
+        """Sampling thread"""
+        previous = None
+        settled = None        # last frame handed to on_settled
+        still_samples = 0
+        while not stop.wait(self.interval):
+            try:
+                frame = self.grab_fn()
+            except Exception as e:
+                print(f"Error sampling screen: {e}")
+                frame = None
+            if frame is None:
+                continue
+            self._stats["samples"] += 1
+
+            # 1. Still or moving since the previous sample?
+            if changed_fraction(frame, previous) > MOTION_FRACTION:
+                still_samples = 0
+            else:
+                still_samples += 1
+            previous = frame
+
+            # 2. Settled on content that differs from what was last handled
+            if still_samples < self.settle_samples or self._busy.is_set():
+                continue
+            if changed_fraction(frame, settled) <= CONTENT_FRACTION:
+                continue
+            settled = frame
+            self._stats["settles"] += 1
+            self._stats["last_settled_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+            self._busy.set()
+            thread = threading.Thread(target=self._run_callback)
+            thread.daemon = True
+            thread.start()
+
+    def _run_callback(self):
+        """Run on_settled, always clearing the busy flag"""
+        try:
+            self.on_settled()
+        except Exception as e:
+            print(f"Error in screen watcher callback: {e}")
+        finally:
+            self._busy.clear()
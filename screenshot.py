@@ -1,9 +1,259 @@
 import mss
 import mss.tools
+from mss.exception import ScreenShotError
 import time
 import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 
+from image_encoding import CapturedImage, remember_captured_image, get_captured_image
+from screenshot_store import ScreenshotStore
+
+# Monitor captured by take_screenshot (monitors[0] is the combined virtual screen)
+DEFAULT_MONITOR_INDEX = 2
+# Idle seconds after which the capture thread re-reads monitor geometry
+MONITOR_REFRESH_SECONDS = 30
+
+class ScreenCaptureService:
+    """
+    Long-lived capture session: one mss handle owned by a dedicated thread.
+    Capture requests are queued and answered through futures, monitor geometry is
+    cached (and re-read when it may have changed), and output directories are
+    created once.
+    """
+    def __init__(self, monitor_refresh_seconds=MONITOR_REFRESH_SECONDS):
+        """Start the capture thread"""
+        self.monitor_refresh_seconds = monitor_refresh_seconds
+        self._requests = queue.Queue()
+        self._created_directories = set()
+        self._monitors = []
+        self._monitors_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._writes = queue.Queue()  # CapturedImages waiting to be saved
+
+        self._thread = threading.Thread(target=self._capture_loop)
+        self._thread.daemon = True
+        self._thread.start()
+        self._writer_thread = threading.Thread(target=self._write_loop)
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+        self._ready.wait(5.0)
+
+    # --- Public API ---
+
+    def capture(self, monitor_index=None, region=None):
+        """
+        Queue a capture request
+
+        Parameters:
+        - monitor_index: Monitor to capture (ignored when region is given)
+        - region: Optional {"left", "top", "width", "height"} area to capture
+
+        Returns:
+        - Future resolving to the mss ScreenShot (raw BGRA pixels in .raw, size in .size),
+          or None if the monitor doesn't exist
+        """
+        future = Future()
+        self._requests.put((monitor_index, region, future))
+        return future
+
+    def grab(self, monitor_index=None, region=None, timeout=10.0):
+        """Capture a frame without saving it and wait for it (see capture)"""
+        return self.capture(monitor_index, region).result(timeout)
+
+    def capture_image(self, monitor_index=None, region=None, output_directory='screenshots', timeout=10.0):
+        """
+        Capture a frame into memory; its PNG is written to disk in the background
+
+        Returns:
+        - CapturedImage whose path is where the PNG will be saved, or None if the monitor doesn't exist
+        """
+        frame = self.grab(monitor_index, region, timeout)
+        if frame is None:
+            return None
+        return self.store_image(frame.raw, frame.size, output_directory)
+
+    def capture_to_file(self, monitor_index=None, region=None, output_directory='screenshots', timeout=10.0):
+        """
+        Capture and wait until the PNG is on disk
+
+        Returns:
+        - Path of the saved PNG, or None if capture failed or the save failed or timed out
+        """
+        image = self.capture_image(monitor_index, region, output_directory, timeout)
+        if image is None:
+            return None
+        if not image.wait_saved(timeout):
+            reason = image.save_error or f"not written within {timeout}s"
+            print(f"Error: screenshot {image.path} was not saved ({reason})")
+            return None
+        return image.path
+
+    def store_image(self, bgra, size, output_directory='screenshots'):
+        """
+        Wrap raw BGRA pixels (a capture, or an image built from captures) as a CapturedImage
+        and save it in the background under its content-addressed name. An identical
+        frame that is already stored or in memory is reused instead.
+
+        Returns:
+        - The CapturedImage
+        """
+        store = get_screenshot_store(output_directory)
+        path = store.path_for(bgra, size)
+        existing = get_captured_image(path)
+        if existing is not None:
+            if existing.saved.is_set() and not store.contains(path):
+                # Evicted since it was saved: write it again
+                existing.reset_save()
+                self._writes.put((existing, output_directory))
+            store.touch(path)
+            return existing
+
+        image = CapturedImage(bgra, size, path)
+        remember_captured_image(image)
+        if store.contains(path):
+            print(f"Identical screenshot already stored: {path}")
+            store.touch(path)
+            image.mark_saved()
+        else:
+            self._writes.put((image, output_directory))
+        return image
+
+    def get_monitors(self):
+        """Cached monitor geometry (index 0 is the combined virtual screen)"""
+        with self._monitors_lock:
+            return list(self._monitors)
+
+    def stop(self):
+        """Stop the capture and writer threads after pending requests"""
+        self._requests.put(None)
+        self._writes.put(None)
+        self._thread.join(timeout=5.0)
+        self._writer_thread.join(timeout=5.0)
+
+    # --- Internal Helpers ---
+
+    def _open(self):
+        """Open a fresh mss handle and refresh the cached monitor geometry"""
+        sct = mss.mss()
+        monitors = [dict(monitor) for monitor in sct.monitors]
+        with self._monitors_lock:
+            changed = monitors != self._monitors
+            self._monitors = monitors
+        if changed:
+            print(f"Monitor layout: {len(monitors) - 1} monitors")
+            for i, monitor in enumerate(monitors[1:], 1):
+                print(f"  Monitor {i}: left={monitor['left']} top={monitor['top']} "
+                      f"{monitor['width']}x{monitor['height']}px")
+        return sct
+
+    def _reopen(self, sct):
+        """Close sct (if any) and open a new handle; returns None if no display is available"""
+        if sct is not None:
+            sct.close()
+        try:
+            return self._open()
+        except Exception as e:
+            print(f"Error opening screen capture session: {e}")
+            return None
+
+    def _ensure_directory(self, output_directory):
+        """Create output_directory the first time it is used"""
+        if output_directory not in self._created_directories:
+            os.makedirs(output_directory, exist_ok=True)
+            self._created_directories.add(output_directory)
+
+    def _grab(self, sct, monitor_index, region):
+        """Grab one frame with sct; returns the mss ScreenShot or None"""
+        if region is None:
+            monitors = self.get_monitors()
+            index = DEFAULT_MONITOR_INDEX if monitor_index is None else monitor_index
+            if monitor_index is None and index >= len(monitors):
+                # Default monitor not connected: fall back to the last physical one
+                index = len(monitors) - 1
+            if index < 1 or index >= len(monitors):
+                print(f"Error: Monitor number {index} is out of range. Available monitors: 1 to {len(monitors) - 1}")
+                return None
+            region = monitors[index]
+        return sct.grab(region)
+
+    def _capture_loop(self):
+        """Capture thread: owns the mss handle and serves queued requests"""
+        sct = self._reopen(None)
+        self._ready.set()
+        while True:
+            try:
+                request = self._requests.get(timeout=self.monitor_refresh_seconds)
+            except queue.Empty:
+                # Idle: re-read geometry off the hot path so plugged/unplugged monitors are noticed
+                sct = self._reopen(sct)
+                continue
+            if request is None:
+                if sct is not None:
+                    sct.close()
+                return
+
+            monitor_index, region, future = request
+            try:
+                if sct is None:
+                    sct = self._open()
+                try:
+                    frame = self._grab(sct, monitor_index, region)
+                except ScreenShotError:
+                    # Layout changed under us: reopen with fresh geometry and retry once
+                    sct.close()
+                    sct = self._open()
+                    frame = self._grab(sct, monitor_index, region)
+                future.set_result(frame)
+            except Exception as e:
+                print(f"Error capturing screenshot: {e}")
+                future.set_exception(e)
+
+    def _write_loop(self):
+        """Writer thread: saves captured images off the request path"""
+        while True:
+            request = self._writes.get()
+            if request is None:
+                return
+            image, output_directory = request
+            try:
+                store = get_screenshot_store(output_directory)
+                if store.contains(image.path):
+                    image.mark_saved()  # an identical frame was written meanwhile
+                    continue
+                self._ensure_directory(output_directory)
+                image.save()
+                store.add(image.path)
+            except Exception as e:
+                print(f"Error saving screenshot {image.path}: {e}")
+                image.mark_save_failed(e)
+
+# Shared capture service, started on first use
+_capture_service = None
+_capture_service_lock = threading.Lock()
+
+def get_capture_service():
+    """Return the shared ScreenCaptureService, starting it if needed"""
+    global _capture_service
+    with _capture_service_lock:
+        if _capture_service is None:
+            _capture_service = ScreenCaptureService()
+        return _capture_service
+
+# Screenshot stores by directory, created on first use
+_screenshot_stores = {}
+_screenshot_stores_lock = threading.Lock()
+
+def get_screenshot_store(output_directory='screenshots'):
+    """Return the ScreenshotStore for a directory, creating it if needed"""
+    with _screenshot_stores_lock:
+        if output_directory not in _screenshot_stores:
+            _screenshot_stores[output_directory] = ScreenshotStore(output_directory)
+        return _screenshot_stores[output_directory]
+
 def take_screenshot(output_directory='screenshots'):
     """
     Take a screenshot using MSS (faster than PyAutoGUI) and save it
@@ -12,44 +262,28 @@ def take_screenshot(output_directory='screenshots'):
     - output_directory: Directory to save screenshots (will be created if it doesn't exist)
     
     Returns:
-    - Path to the saved screenshot
+    - Path to the saved screenshot, or None if capture or saving failed
     """
-    # Create the output directory if it doesn't exist
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
-    
-    print("taking screenshot")
-    
-    # Print available monitors
-    with mss.mss() as sct:
-        print(f"Available monitors: {len(sct.monitors) - 1}")  # Subtract 1 because monitors[0] is the combined view
-        print("Monitor 0 (Virtual screen of all monitors combined):")
-        print(f"  Width: {sct.monitors[0]['width']}px, Height: {sct.monitors[0]['height']}px")
-        
-        for i, monitor in enumerate(sct.monitors[1:], 1):
-            print(f"Monitor {i}:")
-            print(f"  Left: {monitor['left']}, Top: {monitor['top']}")
-            print(f"  Width: {monitor['width']}px, Height: {monitor['height']}px")
-    
-    # Generate a filename with current timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"screenshot_{timestamp}.png"
-    filepath = os.path.join(output_directory, filename)
-    
-    # Take the screenshot of the entire screen
-    with mss.mss() as sct:
-        # Get the first monitor (entire screen)
-        monitor = sct.monitors[2]
-        
-        # Capture the screen
-        screenshot = sct.grab(monitor)
-        
-        # Save the screenshot
-        mss.tools.to_png(screenshot.rgb, screenshot.size, output=filepath)
-    
-    print(f"Screenshot saved to: {filepath}")
+    filepath = get_capture_service().capture_to_file(output_directory=output_directory)
+    if filepath:
+        print(f"Screenshot saved to: {filepath}")
     return filepath
 
+def take_screenshot_image(output_directory='screenshots'):
+    """
+    Take a screenshot into memory; the PNG is saved in the background
+
+    Parameters:
+    - output_directory: Directory the screenshot will be saved in
+
+    Returns:
+    - CapturedImage (its path is the screenshot's key), or None if capture failed
+    """
+    image = get_capture_service().capture_image(output_directory=output_directory)
+    if image is not None:
+        print(f"Screenshot captured (saving to {image.path})")
+    return image
+
 def take_screenshot_of_specific_monitor(monitor_number=1, output_directory='screenshots'):
     """
     Take a screenshot of a specific monitor
@@ -59,52 +293,26 @@ def take_screenshot_of_specific_monitor(monitor_number=1, output_directory='scre
     - output_directory: Directory to save screenshots
     
     Returns:
-    - Path to the saved screenshot
+    - Path to the saved screenshot, or None if capture or saving failed
     """
-    # Create the output directory if it doesn't exist
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
-    
-    # Generate a filename with current timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"monitor{monitor_number}_screenshot_{timestamp}.png"
-    filepath = os.path.join(output_directory, filename)
-    
-    # Take the screenshot of the specific monitor
-    with mss.mss() as sct:
-        # List available monitors
-        monitor_count = len(sct.monitors) - 1  # Subtract 1 because monitors[0] is the "all monitors combined" view
-        
-        if monitor_number < 1 or monitor_number > monitor_count:
-            print(f"Error: Monitor number {monitor_number} is out of range. Available monitors: 1 to {monitor_count}")
-            return None
-        
-        # Get the specified monitor
-        # Note: monitors[0] is the entire screen, so we use the actual index specified by the user
-        monitor = sct.monitors[monitor_number]
-        
-        # Capture the screen
-        screenshot = sct.grab(monitor)
-        
-        # Save the screenshot
-        mss.tools.to_png(screenshot.rgb, screenshot.size, output=filepath)
-    
-    print(f"Screenshot of monitor {monitor_number} saved to: {filepath}")
+    filepath = get_capture_service().capture_to_file(monitor_index=monitor_number, output_directory=output_directory)
+    if filepath:
+        print(f"Screenshot of monitor {monitor_number} saved to: {filepath}")
     return filepath
 
 def list_available_monitors():
     """
     Print information about all available monitors
     """
-    with mss.mss() as sct:
-        print(f"Total number of monitors: {len(sct.monitors) - 1}")  # Subtract 1 because monitors[0] is the combined view
-        print("Monitor 0 (Virtual screen of all monitors combined):")
-        print(f"  Width: {sct.monitors[0]['width']}px, Height: {sct.monitors[0]['height']}px")
-        
-        for i, monitor in enumerate(sct.monitors[1:], 1):
-            print(f"Monitor {i}:")
-            print(f"  Left: {monitor['left']}, Top: {monitor['top']}")
-            print(f"  Width: {monitor['width']}px, Height: {monitor['height']}px")
+    monitors = get_capture_service().get_monitors()
+    print(f"Total number of monitors: {len(monitors) - 1}")  # Subtract 1 because monitors[0] is the combined view
+    print("Monitor 0 (Virtual screen of all monitors combined):")
+    print(f"  Width: {monitors[0]['width']}px, Height: {monitors[0]['height']}px")
+
+    for i, monitor in enumerate(monitors[1:], 1):
+        print(f"Monitor {i}:")
+        print(f"  Left: {monitor['left']}, Top: {monitor['top']}")
+        print(f"  Width: {monitor['width']}px, Height: {monitor['height']}px")
 
 def take_screenshot_of_region(left=0, top=0, width=800, height=600, output_directory='screenshots'):
     """
@@ -118,27 +326,60 @@ def take_screenshot_of_region(left=0, top=0, width=800, height=600, output_direc
     Returns:
     - Path to the saved screenshot
     """
-    # Create the output directory if it doesn't exist
+    region = {"left": left, "top": top, "width": width, "height": height}
+    filepath = get_capture_service().capture_to_file(region=region, output_directory=output_directory)
+    if filepath:
+        print(f"Region screenshot saved to: {filepath}")
+    return filepath
+
+def _take_screenshot_per_call(output_directory):
+    """Previous capture path (new mss handle and directory check per call), kept for benchmarking"""
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
-    
-    # Generate a filename with current timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"region_screenshot_{timestamp}.png"
-    filepath = os.path.join(output_directory, filename)
-    
-    # Define the region to capture
-    region = {"left": left, "top": top, "width": width, "height": height}
-    
-    # Take the screenshot of the specific region
     with mss.mss() as sct:
-        screenshot = sct.grab(region)
+        monitors = sct.monitors
+    filepath = os.path.join(output_directory, f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+    with mss.mss() as sct:
+        screenshot = sct.grab(monitors[min(DEFAULT_MONITOR_INDEX, len(monitors) - 1)])
         mss.tools.to_png(screenshot.rgb, screenshot.size, output=filepath)
-    
-    print(f"Region screenshot saved to: {filepath}")
     return filepath
 
+def benchmark_capture(runs=20, output_directory=os.path.join('screenshots', 'benchmark')):
+    """
+    Compare per-call capture latency of the old per-call path, the capture service waiting
+    for the PNG on disk, and the in-memory capture (PNG written by the background writer).
+    Identical frames are stored once, so a static screen measures the dedupe path.
+
+    Parameters:
+    - runs: Number of captures per path
+    - output_directory: Where benchmark screenshots are written
+
+    Returns:
+    - Dictionary with mean and median milliseconds per path
+    """
+    service = get_capture_service()
+    service.capture_to_file(output_directory=output_directory)  # warm up the service thread
+
+    results = {}
+    for name, capture in (("per_call", lambda: _take_screenshot_per_call(output_directory)),
+                          ("service", lambda: service.capture_to_file(output_directory=output_directory)),
+                          ("in_memory", lambda: service.capture_image(output_directory=output_directory))):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            capture()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {"mean_ms": round(sum(timings) / len(timings), 1),
+                         "median_ms": round(timings[len(timings) // 2], 1)}
+        print(f"{name}: mean {results[name]['mean_ms']} ms, median {results[name]['median_ms']} ms over {runs} captures")
+    return results
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark_capture(int(sys.argv[2]) if len(sys.argv) > 2 else 20)
+        sys.exit(0)
+
     # List all available monitors
     list_available_monitors()
     
@@ -146,4 +387,4 @@ if __name__ == "__main__":
     take_screenshot_of_specific_monitor(monitor_number=1)
     
     # Uncomment to take screenshot of the second monitor
-    # take_screenshot_of_specific_monitor(monitor_number=2)
\ No newline at end of file
+    # take_screenshot_of_specific_monitor(monitor_number=2)
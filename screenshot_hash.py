@@ -0,0 +1,119 @@
+# screenshot_hash.py
+# Perceptual hashing of screenshots so re-captures of an already extracted problem
+# statement can reuse the earlier extraction instead of paying for another vision call.
+# Uses a difference hash (dHash): the frame is shrunk to a tiny grayscale grid and each
+# bit records whether a cell is brighter than its right-hand neighbour, so the hash
+# survives re-encoding, small scrolls and cursor/clock changes.
+import os
+import sys
+import threading
+
+# Pillow is optional: without it no hashes are computed and nothing is reused
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Hash grid size; the hash has HASH_SIZE * HASH_SIZE bits. 8x8 is too coarse for
+# full-screen captures: different problems in the same app layout land within a few bits.
+HASH_SIZE = 16
+# Largest Hamming distance (bits out of HASH_SIZE^2) still treated as the same screen
+HAMMING_THRESHOLD = int(os.environ.get("SCREENSHOT_HASH_THRESHOLD", 10))
+# Set SCREENSHOT_DEDUPE=0 to always extract
+SCREENSHOT_DEDUPE = os.environ.get("SCREENSHOT_DEDUPE", "1") != "0"
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash of a PIL image
+
+    Returns:
+    - The hash as an int of hash_size * hash_size bits
+    """
+    # A cheap integer reduce first keeps the LANCZOS resize fast on 4K frames
+    factor = max(1, min(image.size[0] // (hash_size * 8), image.size[1] // (hash_size * 8)))
+    if factor > 1:
+        image = image.reduce(factor)
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = gray.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column + 1] > pixels[offset + column])
+    return value
+
+def dhash_file(image_path, hash_size=HASH_SIZE):
+    """Difference hash of an image file (or in-memory CapturedImage), or None if Pillow is missing or the file can't be read"""
+    if Image is None:
+        return None
+    try:
+        if hasattr(image_path, "to_pil"):
+            return dhash(image_path.to_pil(), hash_size)
+        with Image.open(image_path) as image:
+            return dhash(image, hash_size)
+    except Exception as e:
+        print(f"Error hashing screenshot {image_path}: {e}")
+        return None
+
+def hamming_distance(first, second):
+    """Number of differing bits between two hashes"""
+    return bin(first ^ second).count("1")
+
+class PerceptualHashIndex:
+    """
+    Index of earlier screenshot hashes, grouped by extraction kind (a coding extraction
+    can't answer a design request for the same screen). Linear scan: an interview has
+    tens of screenshots, not thousands.
+    """
+    def __init__(self, threshold=HAMMING_THRESHOLD):
+        """
+        Parameters:
+        - threshold: Largest Hamming distance counted as a match
+        """
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries = []   # (hash, screenshot_path, kind), oldest first
+
+    def clear(self):
+        """Forget every hash (interview reset)"""
+        with self._lock:
+            self._entries = []
+
+    def add(self, image_hash, screenshot_path, kind):
+        """Record the hash of a screenshot whose extraction of the given kind succeeded"""
+        if image_hash is None:
+            return
+        with self._lock:
+            self._entries.append((image_hash, screenshot_path, kind))
+
+    def find(self, image_hash, kind):
+        """
+        Nearest earlier screenshot of the same kind within the threshold
+
+        Parameters:
+        - image_hash: Hash of the new screenshot (None never matches)
+        - kind: Extraction kind, e.g. "coding", "design" or "react"
+
+        Returns:
+        - (screenshot_path, distance) of the closest match, newest first on ties, or None
+        """
+        if image_hash is None:
+            return None
+        best = None
+        with self._lock:
+            for entry_hash, screenshot_path, entry_kind in reversed(self._entries):
+                if entry_kind != kind:
+                    continue
+                distance = hamming_distance(image_hash, entry_hash)
+                if distance <= self.threshold and (best is None or distance < best[1]):
+                    best = (screenshot_path, distance)
+        return best
+
+if __name__ == "__main__":
+    # python screenshot_hash.py screenshots/*.png  -> pairwise Hamming distance matrix
+    paths = sys.argv[1:]
+    hashes = [dhash_file(path) for path in paths]
+    for path, image_hash in zip(paths, hashes):
+        distances = " ".join(f"{hamming_distance(image_hash, other):4d}" for other in hashes)
+        print(f"{os.path.basename(path)[:32]:32s} {distances}")
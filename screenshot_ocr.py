@@ -0,0 +1,129 @@
+# screenshot_ocr.py
+# Optional local OCR pre-pass for coding-question screenshots.
+# Most problem statements are plain text on a plain background, which Tesseract reads
+# in well under a second. When its word confidence is high, the extractors either send
+# the recognised text instead of the image (OCR_MODE=text) or return it without any
+# model call (OCR_MODE=skip); low-confidence screens still go to the vision models.
+import os
+import time
+
+# pytesseract (and the tesseract binary) are optional: without them OCR is skipped
+try:
+    import pytesseract
+    from pytesseract import Output
+except ImportError:
+    pytesseract = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    from screenshot_roi import crop_to_text_region
+except ImportError:
+    crop_to_text_region = None
+
+# off: always use the vision models; text: send OCR text instead of the image; skip: return OCR text
+OCR_MODE = os.environ.get("OCR_MODE", "off")
+# Mean word confidence (0-100, weighted by word length) needed to trust the OCR text
+OCR_MIN_CONFIDENCE = float(os.environ.get("OCR_MIN_CONFIDENCE", 85))
+# Fewer recognised words than this means the screen is not a text problem statement
+OCR_MIN_WORDS = 15
+# Frames with a shorter long edge are upscaled 2x (Tesseract reads small UI fonts poorly)
+OCR_UPSCALE_BELOW = 2000
+# Seconds before a Tesseract run is abandoned
+OCR_TIMEOUT_SECONDS = 10
+
+OCR_EXTRACTION_PROMPT = (
+    "The text below was read by OCR from a screenshot of a coding question. It may contain "
+    "OCR errors and unrelated interface text. Extract the coding question from it. Return only "
+    "the question text without any additional commentary or explanation.\n\n"
+)
+
+def ocr_available():
+    """Whether OCR is enabled and pytesseract/Pillow are installed"""
+    return OCR_MODE in ("text", "skip") and pytesseract is not None and Image is not None
+
+def _prepare_for_ocr(image):
+    """Crop to the text region, convert to grayscale, make text dark on light and upscale small frames"""
+    if crop_to_text_region is not None:
+        image, _ = crop_to_text_region(image)
+    gray = image.convert("L")
+    if sum(gray.resize((64, 64)).getdata()) / 4096 < 128:
+        gray = ImageOps.invert(gray)  # dark theme
+    if max(gray.size) < OCR_UPSCALE_BELOW:
+        gray = gray.resize((gray.size[0] * 2, gray.size[1] * 2), Image.LANCZOS)
+    return gray
+
+def ocr_image(image):
+    """
+    Run Tesseract on a screenshot
+
+    Parameters:
+    - image: CapturedImage, or path to the screenshot
+
+    Returns:
+    - Dictionary with text, confidence (0-100) and words, or None if OCR failed
+    """
+    try:
+        start = time.perf_counter()
+        if hasattr(image, "to_pil"):
+            prepared = _prepare_for_ocr(image.to_pil())
+        else:
+            with Image.open(image) as opened:
+                prepared = _prepare_for_ocr(opened)
+        data = pytesseract.image_to_data(prepared, output_type=Output.DICT, timeout=OCR_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"Error running OCR: {e}")
+        return None
+
+    # Rebuild lines from the word boxes (Tesseract numbers blocks, paragraphs and lines)
+    lines = []
+    current_key = None
+    weighted_confidence = 0.0
+    characters = 0
+    words = 0
+    for word, confidence, block, paragraph, line in zip(
+            data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]):
+        word = word.strip()
+        confidence = float(confidence)
+        if not word or confidence < 0:
+            continue
+        key = (block, paragraph, line)
+        if key != current_key:
+            if current_key is not None and key[:2] != current_key[:2]:
+                lines.append("")  # paragraph break
+            lines.append(word)
+            current_key = key
+        else:
+            lines[-1] += " " + word
+        weighted_confidence += confidence * len(word)
+        characters += len(word)
+        words += 1
+
+    confidence = weighted_confidence / characters if characters else 0.0
+    print(f"OCR read {words} words (confidence {confidence:.1f}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return {"text": "\n".join(lines).strip(), "confidence": confidence, "words": words}
+
+def confident_ocr_text(image):
+    """
+    OCR fast path used by the coding-question extractors
+
+    Parameters:
+    - image: CapturedImage, or path to the screenshot
+
+    Returns:
+    - The OCR text if OCR is enabled and confident enough, otherwise None (use the vision model)
+    """
+    if not ocr_available():
+        return None
+    result = ocr_image(image)
+    if not result or result["words"] < OCR_MIN_WORDS or result["confidence"] < OCR_MIN_CONFIDENCE:
+        print("OCR not confident enough; using the vision model")
+        return None
+    return result["text"]
+
+def ocr_extraction_prompt(text):
+    """Text-only extraction prompt for OCR_MODE=text"""
+    return OCR_EXTRACTION_PROMPT + text
@@ -0,0 +1,141 @@
+# screenshot_roi.py
+# Fast region-of-interest detection for screenshots.
+# Finds the dominant text region of a frame from row/column profiles of text-like
+# pixels (sharp horizontal contrast against the estimated background), so uploads
+# can skip IDE chrome, video tiles and empty desktop. Conservative: when no single
+# region clearly dominates, the frame is left uncropped.
+import numpy as np
+
+# Frames are analysed at roughly this long edge (pixels) for speed
+ANALYSIS_LONG_EDGE = 960
+# Minimum brightness step (0-255) between neighbouring pixels that counts as a glyph edge
+EDGE_THRESHOLD = 48
+# Minimum difference from the background level for a pixel to count as content
+BACKGROUND_THRESHOLD = 24
+# Row/column bands are split at stretches emptier than this fraction of text pixels
+BAND_EMPTY_FRACTION = 0.002
+# Gaps (as a fraction of the axis) narrower than this don't split a band (line spacing, gutters)
+BAND_GAP_FRACTION = 0.03
+# A band must hold this share of all text pixels on its axis to be "dominant"
+DOMINANT_SHARE = 0.6
+# Margin added around the detected region (fraction of the frame size)
+CROP_MARGIN_FRACTION = 0.015
+# Crops that keep more than this fraction of the frame area are not worth it
+MAX_CROP_AREA_FRACTION = 0.85
+# Regions smaller than this fraction of the frame are treated as misdetections
+MIN_CROP_AREA_FRACTION = 0.05
+
+def _to_gray(rgb, step):
+    """Downsample by step and convert an RGB(A) array to float grayscale"""
+    small = rgb[::step, ::step, :3].astype(np.float32)
+    return small[..., 0] * 0.299 + small[..., 1] * 0.587 + small[..., 2] * 0.114
+
+def _estimate_background(gray):
+    """Dominant grey level of the frame (histogram mode)"""
+    histogram, edges = np.histogram(gray, bins=32, range=(0, 256))
+    mode = int(np.argmax(histogram))
+    return (edges[mode] + edges[mode + 1]) / 2
+
+def _dominant_band(profile):
+    """
+    Find the band (start, end) holding most of the profile's mass
+
+    Parameters:
+    - profile: 1-D text-pixel density along an axis
+
+    Returns:
+    - (start, end) indices, end exclusive, or None if no band dominates
+    """
+    total = profile.sum()
+    if total <= 0:
+        return None
+    max_gap = max(1, int(len(profile) * BAND_GAP_FRACTION))
+    occupied = profile > BAND_EMPTY_FRACTION
+
+    bands = []
+    start = None
+    gap = 0
+    for index, is_occupied in enumerate(occupied):
+        if is_occupied:
+            if start is None:
+                start = index
+            gap = 0
+            end = index + 1
+        elif start is not None:
+            gap += 1
+            if gap > max_gap:
+                bands.append((start, end))
+                start = None
+    if start is not None:
+        bands.append((start, end))
+
+    best = max(bands, key=lambda band: profile[band[0]:band[1]].sum())
+    if profile[best[0]:best[1]].sum() < DOMINANT_SHARE * total:
+        return None
+    return best
+
+def _occupied_span(profile):
+    """(start, end) from the first to the last index with any text, or None if there is none"""
+    occupied = np.flatnonzero(profile > BAND_EMPTY_FRACTION)
+    if len(occupied) == 0:
+        return None
+    return int(occupied[0]), int(occupied[-1]) + 1
+
+def find_text_region(rgb):
+    """
+    Locate the dominant text region of a screenshot
+
+    Parameters:
+    - rgb: Image as an H x W x 3 (or 4) uint8 array
+
+    Returns:
+    - (left, top, right, bottom) in full-resolution pixels, or None if the frame
+      should not be cropped
+    """
+    height, width = rgb.shape[:2]
+    step = max(1, int(round(max(height, width) / ANALYSIS_LONG_EDGE)))
+    gray = _to_gray(rgb, step)
+
+    # 1. Text-like pixels: sharp horizontal contrast, on pixels that differ from the background
+    background = _estimate_background(gray)
+    edges = np.abs(np.diff(gray, axis=1)) > EDGE_THRESHOLD
+    content = np.abs(gray[:, 1:] - background) > BACKGROUND_THRESHOLD
+    text = (edges & content).astype(np.float32)
+
+    # 2. Dominant column band (side-by-side panels are split by gutters), then only
+    #    trim empty rows inside it: a question often has large text-free stretches
+    #    (diagrams, examples) that must not split it vertically
+    columns = _dominant_band(text.mean(axis=0))
+    if columns is None:
+        columns = (0, text.shape[1])
+    rows = _occupied_span(text[:, columns[0]:columns[1]].mean(axis=1))
+    if rows is None:
+        return None
+
+    # 3. Back to full resolution with a margin
+    margin_x = int(width * CROP_MARGIN_FRACTION)
+    margin_y = int(height * CROP_MARGIN_FRACTION)
+    left = max(0, columns[0] * step - margin_x)
+    right = min(width, (columns[1] + 1) * step + margin_x)
+    top = max(0, rows[0] * step - margin_y)
+    bottom = min(height, rows[1] * step + margin_y)
+
+    area_fraction = (right - left) * (bottom - top) / float(width * height)
+    if area_fraction > MAX_CROP_AREA_FRACTION or area_fraction < MIN_CROP_AREA_FRACTION:
+        return None
+    return left, top, right, bottom
+
+def crop_to_text_region(image):
+    """
+    Crop a PIL image to its dominant text region (the image itself if none is found)
+
+    Parameters:
+    - image: PIL image
+
+    Returns:
+    - (image, box): the cropped image and the (left, top, right, bottom) box, or (image, None)
+    """
+    box = find_text_region(np.asarray(image.convert("RGB")))
+    if box is None:
+        return image, None
+    return image.crop(box), box
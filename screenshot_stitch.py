@@ -0,0 +1,247 @@
+# screenshot_stitch.py
+# Burst capture and scroll stitching.
+# A burst records frames while a long problem statement is scrolled; consecutive frames
+# are aligned by matching row signatures (the vertical scroll offset is the shift that
+# makes the overlapping rows agree) and stitched into one tall image, so the whole
+# statement goes to a single extraction call.
+import threading
+import time
+
+import numpy as np
+
+from screen_watcher import downsample_frame, changed_fraction, MOTION_FRACTION
+
+# Seconds between burst frames
+DEFAULT_BURST_INTERVAL_SECONDS = 0.3
+# Frames kept per burst (each full frame is ~20 MB of raw pixels)
+BURST_MAX_FRAMES = 20
+# Width of the column bins a row signature averages over (pixels)
+SIGNATURE_BIN_WIDTH = 32
+# Mean per-bin difference (0-255) below which two rows count as identical
+ROW_MATCH_TOLERANCE = 2.0
+# The overlap between consecutive frames must cover at least this fraction of the scrolling area
+MIN_OVERLAP_FRACTION = 0.1
+# An overlap must contain at least this many rows with visible content to be trusted
+MIN_TEXTURED_ROWS = 8
+# Mean row difference (0-255) above which the best shift is not accepted as a real overlap
+MAX_OVERLAP_COST = 4.0
+
+def frame_to_array(screenshot):
+    """H x W x 4 BGRA array view of an mss frame"""
+    width, height = screenshot.size
+    return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+
+def row_signatures(frame):
+    """
+    Per-row feature vectors: grayscale means over fixed-width column bins
+
+    Parameters:
+    - frame: H x W x 3 (or 4) array
+
+    Returns:
+    - H x (W // SIGNATURE_BIN_WIDTH) float32 array
+    """
+    gray = frame[..., :3].astype(np.float32).mean(axis=2)
+    bins = gray.shape[1] // SIGNATURE_BIN_WIDTH
+    gray = gray[:, :bins * SIGNATURE_BIN_WIDTH]
+    return gray.reshape(gray.shape[0], bins, SIGNATURE_BIN_WIDTH).mean(axis=2)
+
+def _static_edges(first, second):
+    """
+    Rows at the top and bottom that are identical in both frames (fixed headers / footers)
+
+    Returns:
+    - (top_rows, bottom_rows), or None if the frames are identical
+    """
+    same = np.abs(first - second).mean(axis=1) < ROW_MATCH_TOLERANCE
+    if same.all():
+        return None
+    top = int(np.argmin(same))
+    bottom = int(np.argmin(same[::-1]))
+    return top, bottom
+
+def moving_columns(signatures):
+    """
+    Column span (in signature bins) that changed anywhere in the burst: the scrolled panel,
+    without static side panels
+
+    Returns:
+    - (first_bin, end_bin), or None if nothing moved
+    """
+    moving = np.zeros(signatures[0].shape[1], dtype=bool)
+    for first, second in zip(signatures, signatures[1:]):
+        moving |= np.abs(first - second).max(axis=0) >= ROW_MATCH_TOLERANCE
+    bins = np.flatnonzero(moving)
+    if len(bins) == 0:
+        return None
+    return int(bins[0]), int(bins[-1]) + 1
+
+def find_scroll_offset(first, second):
+    """
+    Vertical scroll between two row-signature arrays of the same size
+
+    Parameters:
+    - first: Signatures of the earlier frame
+    - second: Signatures of the later frame (scrolled down)
+
+    Returns:
+    - (offset, top, bottom): second's scrolling area starts offset rows further down than
+      first's; top/bottom are the static rows excluded from matching. offset is None if no
+      trustworthy overlap was found, 0 if the frames are identical.
+    """
+    edges = _static_edges(first, second)
+    if edges is None:
+        return 0, 0, 0
+    top, bottom = edges
+    first_body = first[top:len(first) - bottom]
+    second_body = second[top:len(second) - bottom]
+    height = len(first_body)
+    min_overlap = max(MIN_TEXTURED_ROWS, int(height * MIN_OVERLAP_FRACTION))
+
+    # Rows that are not flat background carry the alignment signal
+    textured = second_body.std(axis=1) > ROW_MATCH_TOLERANCE
+
+    best_offset, best_cost = None, None
+    for offset in range(1, height - min_overlap + 1):
+        overlap = height - offset
+        rows = textured[:overlap]
+        if rows.sum() < MIN_TEXTURED_ROWS:
+            continue
+        cost = np.abs(first_body[offset:][rows] - second_body[:overlap][rows]).mean()
+        if best_cost is None or cost < best_cost:
+            best_offset, best_cost = offset, cost
+    if best_cost is None or best_cost > MAX_OVERLAP_COST:
+        return None, top, bottom
+    return best_offset, top, bottom
+
+def stitch_frames(frames):
+    """
+    Stitch frames captured while scrolling down into one tall image
+
+    Parameters:
+    - frames: List of H x W x 4 arrays of the same size, in capture order
+
+    Returns:
+    - (image array, offsets); offsets holds each step's scroll offset (None where frames
+      could not be aligned and were appended whole)
+    """
+    if not frames:
+        return None, []
+
+    # 1. Crop every frame to the columns that scrolled (static side panels would break the match)
+    signatures = [row_signatures(frame) for frame in frames]
+    columns = moving_columns(signatures) if len(frames) > 1 else None
+    if columns is not None:
+        left, right = columns[0] * SIGNATURE_BIN_WIDTH, columns[1] * SIGNATURE_BIN_WIDTH
+        if columns[1] == signatures[0].shape[1]:
+            # The last full bin moved: keep the leftover columns past it (a panel reaching the right edge)
+            right = frames[0].shape[1]
+        frames = [frame[:, left:right] for frame in frames]
+        signatures = [signature[:, columns[0]:columns[1]] for signature in signatures]
+
+    # 2. Append the newly revealed rows of each frame to the scrolling body
+    height = frames[0].shape[0]
+    parts = []
+    offsets = []
+    header = footer = 0
+    for index in range(1, len(frames)):
+        offset, top, bottom = find_scroll_offset(signatures[index - 1], signatures[index])
+        offsets.append(offset)
+        if offset == 0:
+            continue  # duplicate frame
+        if not parts:
+            header, footer = top, bottom
+            parts.append(frames[0][header:height - footer])
+        body = frames[index][header:height - footer]
+        parts.append(body if offset is None else body[len(body) - offset:])
+
+    if not parts:
+        return np.ascontiguousarray(frames[0]), offsets
+    # 3. Fixed header from the first frame, fixed footer from the last
+    stitched = [frames[0][:header]] + parts + [frames[-1][height - footer:]]
+    return np.ascontiguousarray(np.concatenate(stitched, axis=0)), offsets
+
+class BurstRecorder:
+    """
+    Records frames at a fixed interval between start() and stop(), skipping frames
+    that did not change (the page was not scrolled).
+    """
+    def __init__(self, grab_fn, interval=DEFAULT_BURST_INTERVAL_SECONDS, max_frames=BURST_MAX_FRAMES):
+        """
+        Parameters:
+        - grab_fn: Callable () -> mss frame (or None if capture failed)
+        - interval: Seconds between frames
+        - max_frames: Recording stops adding frames after this many
+        """
+        self.grab_fn = grab_fn
+        self.interval = interval
+        self.max_frames = max_frames
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = None
+        self._frames = []
+
+    def is_recording(self):
+        """Whether a burst is in progress"""
+        with self._lock:
+            return self._thread is not None
+
+    def start(self):
+        """Begin a new burst (an unfinished one is discarded)"""
+        self.stop()
+        with self._lock:
+            self._frames = []
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._record_loop, args=(self._stop, self._frames))
+            self._thread.daemon = True
+            self._thread.start()
+        print(f"Burst capture started (every {self.interval}s, up to {self.max_frames} frames)")
+
+    def stop(self):
+        """
+        End the burst
+
+        Returns:
+        - List of recorded frames (H x W x 4 arrays), oldest first
+        """
+        with self._lock:
+            thread, stop, frames = self._thread, self._stop, self._frames
+            self._thread = None
+            self._frames = []
+        if thread is None:
+            return []
+        stop.set()
+        thread.join(timeout=5.0)
+        print(f"Burst capture stopped with {len(frames)} frames")
+        return frames
+
+    def _record_loop(self, stop, frames):
+        """Recording thread"""
+        previous = None
+        while not stop.is_set() and len(frames) < self.max_frames:
+            started = time.perf_counter()
+            try:
+                screenshot = self.grab_fn()
+            except Exception as e:
+                print(f"Error capturing burst frame: {e}")
+                screenshot = None
+            if screenshot is not None:
+                thumbnail = downsample_frame(screenshot)
+                if changed_fraction(thumbnail, previous) > MOTION_FRACTION:
+                    frames.append(frame_to_array(screenshot))
+                    previous = thumbnail
+            stop.wait(max(0.0, self.interval - (time.perf_counter() - started)))
+
+if __name__ == "__main__":
+    # python screenshot_stitch.py frame1.png frame2.png ... stitched.png
+    import sys
+    from PIL import Image
+    if len(sys.argv) < 4:
+        print("Usage: python screenshot_stitch.py <frame.png> <frame.png> [...] <output.png>")
+        sys.exit(1)
+    frames = [np.asarray(Image.open(path).convert("RGBA"))[..., [2, 1, 0, 3]] for path in sys.argv[1:-1]]
+    start = time.perf_counter()
+    stitched, offsets = stitch_frames(frames)
+    print(f"Offsets {offsets}, {stitched.shape[1]}x{stitched.shape[0]} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    Image.fromarray(np.ascontiguousarray(stitched[..., 2::-1])).save(sys.argv[-1])
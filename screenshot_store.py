@@ -0,0 +1,197 @@
+# screenshot_store.py
+# Content-addressed screenshot storage.
+# Captures are named after a digest of their pixels, so identical frames share one file
+# (and never collide the way second-resolution timestamps did), names double as strong
+# ETags, and files can be cached by the browser forever. The directory is kept within
+# size and age limits by evicting the least recently used screenshots, and small
+# thumbnails are generated once for listing views.
+import hashlib
+import os
+import threading
+import time
+
+# Pillow is optional: without it no thumbnails are generated (the full image is listed)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Total size of screenshots kept on disk (MB) and their maximum age (days); 0 disables a limit
+SCREENSHOT_STORE_MAX_MB = float(os.environ.get("SCREENSHOT_STORE_MAX_MB", 500))
+SCREENSHOT_STORE_MAX_AGE_DAYS = float(os.environ.get("SCREENSHOT_STORE_MAX_AGE_DAYS", 7))
+# Long edge of listing thumbnails (pixels)
+THUMBNAIL_LONG_EDGE = 320
+# Subdirectory holding thumbnails
+THUMBNAIL_DIRECTORY = "thumbnails"
+# Hex digits of the pixel digest used in file names
+DIGEST_LENGTH = 32
+
+def pixel_digest(pixels, size):
+    """Hex digest of raw pixels and their dimensions"""
+    digest = hashlib.blake2b(digest_size=DIGEST_LENGTH // 2)
+    digest.update(f"{size[0]}x{size[1]}:".encode("ascii"))
+    digest.update(pixels)
+    return digest.hexdigest()
+
+def is_content_addressed(filename):
+    """Whether a file name is a pixel digest (and its content therefore immutable)"""
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    return len(stem) == DIGEST_LENGTH and all(c in "0123456789abcdef" for c in stem)
+
+class ScreenshotStore:
+    """
+    Tracks the screenshots in one directory: content-addressed names, last use, size and
+    age limits (LRU eviction) and thumbnails.
+    """
+    def __init__(self, directory, max_bytes=SCREENSHOT_STORE_MAX_MB * 1024 * 1024,
+                 max_age_seconds=SCREENSHOT_STORE_MAX_AGE_DAYS * 86400, pinned_fn=None):
+        """
+        Parameters:
+        - directory: Screenshot directory
+        - max_bytes: Size limit for screenshots in the directory (0 = unlimited)
+        - max_age_seconds: Screenshots not used for longer are removed (0 = unlimited)
+        - pinned_fn: Optional callable () -> set of paths that must not be evicted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.pinned_fn = pinned_fn
+
+        self._lock = threading.Lock()
+        self._entries = {}   # path -> {"size": bytes, "last_used": epoch seconds}
+        self._scan()
+
+    def _scan(self):
+        """
+        Index the content-addressed screenshots already in the directory (last use =
+        modification time). Other files (samples, older timestamp-named captures) are
+        not the store's and are never indexed or evicted.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".png") and is_content_addressed(entry.name):
+                    stat = entry.stat()
+                    self._entries[os.path.join(self.directory, entry.name)] = {
+                        "size": stat.st_size, "last_used": stat.st_mtime}
+
+    # --- Naming ---
+
+    def path_for(self, pixels, size):
+        """Content-addressed path for a frame"""
+        return os.path.join(self.directory, pixel_digest(pixels, size) + ".png")
+
+    def contains(self, path):
+        """Whether path is stored on disk"""
+        with self._lock:
+            return path in self._entries
+
+    # --- Bookkeeping ---
+
+    def add(self, path):
+        """Record a newly written content-addressed screenshot and enforce the limits"""
+        if not is_content_addressed(path):
+            return
+        with self._lock:
+            self._entries[path] = {"size": os.path.getsize(path), "last_used": time.time()}
+        self.enforce_limits()
+
+    def touch(self, path):
+        """Mark path as used (captured again, served or extracted)"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                entry["last_used"] = time.time()
+
+    def enforce_limits(self):
+        """
+        Remove screenshots past the age limit, then the least recently used ones until
+        the store's screenshots are within the size limit. Pinned screenshots and files
+        the store did not write (not content-addressed) are kept.
+
+        Returns:
+        - List of removed paths
+        """
+        pinned = set(self.pinned_fn()) if self.pinned_fn else set()
+        now = time.time()
+        removed = []
+        with self._lock:
+            total = sum(entry["size"] for entry in self._entries.values())
+            for path, entry in sorted(self._entries.items(), key=lambda item: item[1]["last_used"]):
+                expired = self.max_age_seconds and now - entry["last_used"] > self.max_age_seconds
+                oversized = self.max_bytes and total > self.max_bytes
+                if not (expired or oversized):
+                    break
+                if path in pinned or not is_content_addressed(path):
+                    continue
+                total -= entry["size"]
+                removed.append(path)
+            for path in removed:
+                del self._entries[path]
+
+        for path in removed:
+            for file_path in [path] + self._thumbnail_paths(path):
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+        if removed:
+            print(f"Screenshot store: evicted {len(removed)} screenshots from {self.directory}")
+        return removed
+
+    def stats(self):
+        """Number of screenshots and bytes on disk"""
+        with self._lock:
+            return {"screenshots": len(self._entries),
+                    "bytes": sum(entry["size"] for entry in self._entries.values())}
+
+    # --- Thumbnails ---
+
+    def _thumbnail_path(self, path, long_edge):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.directory, THUMBNAIL_DIRECTORY, f"{stem}_{long_edge}.jpg")
+
+    def _thumbnail_paths(self, path):
+        """Existing thumbnails of path"""
+        directory = os.path.join(self.directory, THUMBNAIL_DIRECTORY)
+        stem = os.path.splitext(os.path.basename(path))[0] + "_"
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, name) for name in os.listdir(directory) if name.startswith(stem)]
+
+    def thumbnail(self, path, image=None, long_edge=THUMBNAIL_LONG_EDGE):
+        """
+        Thumbnail of a screenshot, generated on first request
+
+        Parameters:
+        - path: Screenshot path
+        - image: Optional PIL image of the screenshot (avoids reading the file)
+        - long_edge: Thumbnail long edge in pixels
+
+        Returns:
+        - Path of the JPEG thumbnail, or None if Pillow is missing or the screenshot is unknown
+        """
+        if Image is None:
+            return None
+        thumbnail_path = self._thumbnail_path(path, long_edge)
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+        try:
+            if image is None:
+                if not os.path.exists(path):
+                    return None
+                with Image.open(path) as opened:
+                    thumbnail = opened.convert("RGB")
+                    thumbnail.thumbnail((long_edge, long_edge))
+            else:
+                thumbnail = image.convert("RGB")
+                thumbnail.thumbnail((long_edge, long_edge))
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            temporary_path = thumbnail_path + ".tmp"
+            thumbnail.save(temporary_path, format="JPEG", quality=80)
+            os.replace(temporary_path, thumbnail_path)
+            return thumbnail_path
+        except Exception as e:
+            print(f"Error creating thumbnail for {path}: {e}")
+            return None
@@ -3,6 +3,8 @@ import threading
 from flask import Flask
 from datetime import datetime
 
+from screenshot_hash import PerceptualHashIndex
+
 # Initialize Flask app
 app = Flask(__name__,
             static_folder='../static',  # Relative to app root
@@ -20,10 +22,17 @@ interview_data = {
     "extracted_questions": {},  # Map screenshot paths to extracted questions
     "solutions": {},  # Map screenshot paths to structured solutions (coding, standard followup)
     "react_solutions": {}, # Map screenshot paths to raw React initial solutions
+    "solution_questions": {}, # Map solution keys to the question text the solution was generated from
     "followup_solutions": {} # Map screenshot paths to LISTS of raw followup solutions (React Claude/Gemini)
 }
 interview_data_lock = threading.Lock()
 
+# Key of the most recently stored (non-follow-up) solution, guarded by interview_data_lock
+latest_solution = {"key": None}
+
+# Perceptual hashes of screenshots whose question was extracted, for reuse on re-captures
+screenshot_hash_index = PerceptualHashIndex()
+
 # --- Helper Functions (Potentially shared or moved later) ---
 
 def add_screenshot_to_interview(screenshot_path, question_type, notes):
@@ -39,26 +48,40 @@ def add_screenshot_to_interview(screenshot_path, question_type, notes):
         interview_data["screenshots"].append(screenshot_info)
         return screenshot_info
 
+def get_latest_solution_key():
+    """Returns the key of the most recently stored solution (None if there is none)."""
+    with interview_data_lock:
+        return latest_solution["key"]
+
 def store_extracted_question(screenshot_path, question):
     """Stores an extracted question associated with a screenshot."""
     if question:
         with interview_data_lock:
             interview_data["extracted_questions"][screenshot_path] = question
 
-def store_solution(screenshot_path, solution):
-    """Stores a generated solution associated with a screenshot."""
+def store_solution(screenshot_path, solution, question=None):
+    """
+    Stores a generated solution associated with a screenshot, pinning the question it was
+    generated from (the extracted question under the same key may be replaced later).
+    """
     if solution:
         with interview_data_lock:
             interview_data["solutions"][screenshot_path] = solution
+            if question:
+                interview_data["solution_questions"][screenshot_path] = question
+            latest_solution["key"] = screenshot_path
 
-def store_react_solution(screenshot_path, solution):
-    """Stores a generated React solution, including raw code."""
+def store_react_solution(screenshot_path, solution, question=None):
+    """Stores a generated React solution, including raw code, and the question it answers."""
     if solution:
         with interview_data_lock:
             # Store the formatted solution dict in 'solutions'
             interview_data["solutions"][screenshot_path] = solution
+            if question:
+                interview_data["solution_questions"][screenshot_path] = question
             # Store the raw code text directly in 'react_solutions'
             interview_data["react_solutions"][screenshot_path] = solution.get("code", "")
+            latest_solution["key"] = screenshot_path
 
 def store_followup_solution(screenshot_path, solution, provider="claude"):
     """Stores a follow-up solution with a unique key."""
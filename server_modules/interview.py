@@ -1,15 +1,76 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
+import functools
 
 # Import shared app and data/locks
-from .config import app, interview_data, interview_data_lock
+from .config import app, interview_data, interview_data_lock, latest_solution, screenshot_hash_index
 
 # Import transcription data/lock for reset
-from web_adapter import transcriptions, transcription_lock
+from web_adapter import clear_transcriptions, get_last_segment_id, get_transcriptions_in_range
+import web_adapter
+
+# Question / follow-up -> transcript segment range index
+from question_segments import QuestionSegmentIndex
 
 # Create a Blueprint for interview management routes
 interview_bp = Blueprint('interview', __name__, url_prefix='/api')
 
+# Transcript ranges of marked questions and follow-ups
+question_segment_index = QuestionSegmentIndex()
+
+def get_question_transcript_segments(question_id=None, followup_id=None):
+    """
+    Get the transcript segments of a question (with its follow-ups) or of one follow-up
+
+    Parameters:
+    - question_id: Question ID (defaults to the current question)
+    - followup_id: Follow-up ID within the question (None for the whole question)
+
+    Returns:
+    - (segments, segment_range), or ([], None) if the question was never marked
+    """
+    if question_id is None:
+        with interview_data_lock:
+            question_id = interview_data["current_question"]
+    if question_id is None:
+        return [], None
+
+    segment_range = question_segment_index.get_range(question_id, followup_id)
+    if segment_range is None:
+        return [], None
+    return get_transcriptions_in_range(*segment_range), segment_range
+
+@functools.lru_cache(maxsize=64)
+def _joined_closed_range(reset_count, first_id, last_id):
+    """Joined text of a closed segment range; closed ranges never change until the transcript is reset"""
+    return "\n".join(segment.get("text", "") for segment in get_transcriptions_in_range(first_id, last_id))
+
+def get_transcript_text(first_id, last_id=None):
+    """
+    Transcript text of a segment range, reusing the pre-joined text of closed ranges
+
+    Parameters:
+    - first_id: First segment ID
+    - last_id: Last segment ID (None for everything up to now)
+
+    Returns:
+    - Segment texts joined with newlines
+    """
+    if last_id is not None and last_id < get_last_segment_id():
+        # The reset count is part of the key so a cleared transcript never serves stale text
+        return _joined_closed_range(web_adapter.transcription_reset_count, first_id, last_id)
+    return "\n".join(segment.get("text", "") for segment in get_transcriptions_in_range(first_id, last_id))
+
+def get_question_transcript(question_id=None, followup_id=None):
+    """Transcript text of a question or follow-up (empty string if unknown); see get_question_transcript_segments"""
+    if question_id is None:
+        with interview_data_lock:
+            question_id = interview_data["current_question"]
+    segment_range = question_segment_index.get_range(question_id, followup_id) if question_id is not None else None
+    if segment_range is None:
+        return ""
+    return get_transcript_text(*segment_range)
+
 # --- Interview State Management Routes ---
 
 @interview_bp.route('/question/mark', methods=['POST'])
@@ -27,6 +88,8 @@ def mark_question():
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "followups": []
         }
+        # Link the question to the transcript from this point on
+        question_info["segment_start"] = question_segment_index.mark_question(question_id, get_last_segment_id())
         interview_data["questions"].append(question_info)
         interview_data["current_question"] = question_id
 
@@ -57,6 +120,8 @@ def mark_followup():
                     "notes": notes,
                     "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
+                followup_info["segment_start"] = question_segment_index.mark_followup(
+                    question["id"], followup_id, get_last_segment_id())
                 question["followups"].append(followup_info)
                 current_question_found = True
                 return jsonify({
@@ -79,6 +144,35 @@ def mark_followup():
     }), 500
 
 
+@interview_bp.route('/question/<int:question_id>/transcript', methods=['GET'])
+@interview_bp.route('/question/<int:question_id>/followup/<int:followup_id>/transcript', methods=['GET'])
+def get_question_transcript_route(question_id, followup_id=None):
+    """Transcript segments of one question (including its follow-ups) or of one follow-up"""
+    segments, segment_range = get_question_transcript_segments(question_id, followup_id)
+    if segment_range is None:
+        return jsonify({
+            "status": "error",
+            "message": f"No transcript range recorded for question {question_id}" +
+                       (f" follow-up {followup_id}" if followup_id is not None else "")
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "question_id": question_id,
+        "followup_id": followup_id,
+        "first_segment_id": segment_range[0],
+        "last_segment_id": segment_range[1],
+        "segments": segments
+    })
+
+@interview_bp.route('/question/segment/<int:segment_id>', methods=['GET'])
+def locate_segment_route(segment_id):
+    """Which question / follow-up a transcript segment belongs to"""
+    location = question_segment_index.locate(segment_id)
+    if location is None:
+        return jsonify({"status": "error", "message": "Segment precedes every marked question"}), 404
+    return jsonify({"status": "success", "question_id": location[0], "followup_id": location[1]})
+
 @interview_bp.route('/interview/data', methods=['GET'])
 def get_interview_data():
     with interview_data_lock:
@@ -99,12 +193,15 @@ def reset_all_data():
         interview_data["extracted_questions"] = {}
         interview_data["solutions"] = {}
         interview_data["react_solutions"] = {}
+        interview_data["solution_questions"] = {}
+        latest_solution["key"] = None
+        question_segment_index.clear()
+        screenshot_hash_index.clear()
         print("Interview data reset.")
 
     # Clear transcriptions separately
-    with transcription_lock:
-        transcriptions.clear()
-        print("Transcriptions cleared.")
+    clear_transcriptions()
+    print("Transcriptions cleared.")
 
     return jsonify({
         "status": "success",
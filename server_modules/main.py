@@ -1,3 +1,4 @@
+import atexit
 import os
 import threading
 import time
@@ -13,7 +14,7 @@ from .solution import solution_bp
 from .interview import interview_bp
 
 # Import transcription components needed for default recording start
-from web_adapter import WebTranscriber, transcriptions, transcription_lock
+from web_adapter import WebTranscriber, init_transcript_journal, close_transcript_journal
 
 # Register Blueprints
 app.register_blueprint(transcription_bp)
@@ -47,10 +48,8 @@ def start_default_recording():
     print("Waiting 2 seconds before starting default recording...")
     time.sleep(2)
 
-    # Clear previous transcriptions
-    with transcription_lock:
-        transcriptions.clear()
-        print("Cleared previous transcriptions.")
+    # Previous transcriptions were already recovered from the journal in run_app(),
+    # so a restart mid-interview keeps the transcript instead of clearing it.
 
     # Start the transcriber
     try:
@@ -83,6 +82,10 @@ def run_app():
     os.makedirs(os.path.join(project_root, 'screenshots'), exist_ok=True)
     print("Checked/created required directories.")
 
+    # Rebuild the in-memory transcript from the journal before serving requests
+    init_transcript_journal(os.path.join(project_root, 'transcripts', 'transcript_journal.jsonl'))
+    atexit.register(close_transcript_journal)
+
     # Start default recording in a separate thread
     print("Starting default recording thread...")
     recording_thread = threading.Thread(target=start_default_recording)
@@ -1,12 +1,21 @@
 import os
-from flask import Blueprint, jsonify, request, send_from_directory
+import threading
+import io
+from flask import Blueprint, jsonify, request, send_from_directory, send_file
 from datetime import datetime
 
 # Import shared app and data/locks/helpers
-from .config import app, interview_data, interview_data_lock, add_screenshot_to_interview, store_extracted_question
+from .config import app, interview_data, interview_data_lock, add_screenshot_to_interview, store_extracted_question, screenshot_hash_index
 
 # Import screenshot taking function
-from screenshot import take_screenshot
+from screenshot import take_screenshot_image, get_capture_service, get_screenshot_store
+from screenshot_store import is_content_addressed
+from image_encoding import get_captured_image
+from screenshot_hash import dhash_file, hamming_distance, SCREENSHOT_DEDUPE
+from screen_watcher import ScreenWatcher, downsample_frame
+from screenshot_stitch import BurstRecorder, stitch_frames
+from background_jobs import JobRegistry
+from provider_race import ProviderRace
 
 # Import question extraction functions
 from claude_api import extract_coding_question
@@ -18,30 +27,267 @@ from openai_api import extract_coding_question_with_openai, extract_react_questi
 # Create a Blueprint for screenshot and extraction routes
 screenshot_bp = Blueprint('screenshot', __name__)
 
+# --- Re-capture Dedupe ---
+
+def find_reusable_question(screenshot, kind):
+    """
+    Look for an earlier screenshot of the same screen whose question was already extracted
+
+    Parameters:
+    - screenshot: CapturedImage of the new screenshot
+    - kind: Extraction kind ("coding", "design" or "react")
+
+    Returns:
+    - (image_hash, question, earlier_path); question and earlier_path are None without a match
+    """
+    if not SCREENSHOT_DEDUPE:
+        return None, None, None
+    screenshot_path = screenshot.path
+    image_hash = dhash_file(screenshot)
+
+    # A pre-emptive extraction of this same screen may still be running: join it
+    with watcher_state_lock:
+        pending = watcher_state["pending"]
+    if (pending and pending["kind"] == kind and image_hash is not None and
+            hamming_distance(image_hash, pending["hash"]) <= screenshot_hash_index.threshold):
+        print(f"Waiting for the pre-emptive {kind} extraction of this screen")
+        pending["done"].wait(PREEMPTIVE_WAIT_SECONDS)
+
+    match = screenshot_hash_index.find(image_hash, kind)
+    if match:
+        earlier_path, distance = match
+        with interview_data_lock:
+            question = interview_data["extracted_questions"].get(earlier_path)
+        if question:
+            print(f"Screenshot matches {earlier_path} (distance {distance}); reusing its extracted {kind} question")
+            # Stored under the new path too, so solution routes keyed by it find the question
+            store_extracted_question(screenshot_path, question)
+            return image_hash, question, earlier_path
+    return image_hash, None, None
+
+# --- Pre-emptive Extraction (Screen Watcher) ---
+
+# Watch the screen and extract settled content before the button is pressed
+# (opt-in: SCREEN_WATCHER=1 or POST /api/watcher)
+SCREEN_WATCHER = os.environ.get("SCREEN_WATCHER", "0") == "1"
+# Gemini extractor used for each kind by the watcher and burst capture
+GEMINI_EXTRACTORS = {
+    "coding": extract_coding_question_with_gemini,
+    "design": extract_design_question_with_gemini,
+    "react": extract_react_question_with_gemini,
+}
+# How long a button press waits for a matching pre-emptive extraction that is still running
+PREEMPTIVE_WAIT_SECONDS = 30
+
+# kind: what the watcher extracts; pending: {"hash", "kind", "done"} of the running extraction
+watcher_state = {"kind": os.environ.get("SCREEN_WATCHER_KIND", "coding"), "pending": None}
+watcher_state_lock = threading.Lock()
+
+def _watcher_grab():
+    """Downsampled frame of the default monitor for change detection"""
+    frame = get_capture_service().grab()
+    return downsample_frame(frame) if frame is not None else None
+
+def _preemptive_extract():
+    """Screen settled on new content: capture it and extract its question in advance"""
+    with watcher_state_lock:
+        kind = watcher_state["kind"]
+
+    # 1. Full-resolution capture of the settled screen (saved in the background)
+    screenshot = get_capture_service().capture_image()
+    image_hash = dhash_file(screenshot) if screenshot else None
+    if image_hash is None:
+        return  # without a hash a button press could never match it
+    if screenshot_hash_index.find(image_hash, kind):
+        print(f"Settled screen already extracted ({kind}); skipping")
+        return
+
+    # 2. Extract, advertising the extraction so a button press can join it
+    pending = {"hash": image_hash, "kind": kind, "done": threading.Event()}
+    with watcher_state_lock:
+        watcher_state["pending"] = pending
+    try:
+        question = GEMINI_EXTRACTORS[kind](screenshot)
+        if question:
+            print(f"Pre-emptively extracted {kind} question from {screenshot.path}")
+            store_extracted_question(screenshot.path, question)
+            screenshot_hash_index.add(image_hash, screenshot.path, kind)
+    finally:
+        pending["done"].set()
+        with watcher_state_lock:
+            if watcher_state["pending"] is pending:
+                watcher_state["pending"] = None
+
+screen_watcher = ScreenWatcher(_watcher_grab, _preemptive_extract)
+if SCREEN_WATCHER:
+    screen_watcher.start()
+
+# --- Background Extraction ---
+
+# Extractions running at once (each is one LLM call)
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", 4))
+# Longest a route blocks when the client asks to wait for the extraction ({"wait": true})
+EXTRACTION_WAIT_SECONDS = 120
+
+extraction_jobs = JobRegistry(max_workers=EXTRACTION_WORKERS, name="extract")
+
+def _extract_question(screenshot, kind, extract_fn, provider_label):
+    """
+    Extraction job: reuse an earlier extraction of the same screen or run extract_fn
+
+    Returns:
+    - Dictionary with extracted_question and reused_from
+    """
+    image_hash, extracted_question, reused_from = find_reusable_question(screenshot, kind)
+    if extracted_question is None:
+        extracted_question = extract_fn(screenshot)
+        if extracted_question:
+            print(f"Extracted {kind} question with {provider_label}: {extracted_question}")
+            store_extracted_question(screenshot.path, extracted_question)
+            screenshot_hash_index.add(image_hash, screenshot.path, kind)
+    return {"extracted_question": extracted_question, "reused_from": reused_from}
+
+def start_extraction(screenshot, kind, extract_fn, provider_label, wait=False):
+    """
+    Queue the extraction of a captured screenshot
+
+    Parameters:
+    - screenshot: CapturedImage
+    - kind: Extraction kind ("coding", "design" or "react")
+    - extract_fn: Extractor called with the screenshot
+    - provider_label: Provider name for log messages
+    - wait: Block until the extraction finishes (the pre-job response shape)
+
+    Returns:
+    - Dictionary with extracted_question, reused_from (None until the job finishes) and job_id.
+      The result is also stored in interview_data["extracted_questions"] under screenshot.path.
+    """
+    job_id = extraction_jobs.submit(f"{kind}:{provider_label}", _extract_question,
+                                    screenshot, kind, extract_fn, provider_label)
+    result = {"extracted_question": None, "reused_from": None, "job_id": job_id}
+    if wait:
+        job = extraction_jobs.wait(job_id, EXTRACTION_WAIT_SECONDS)
+        if job and job["state"] == "done":
+            result.update(job["result"])
+    return result
+
+@screenshot_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_extraction_job(job_id):
+    """State of a background extraction: queued, running, done (with result) or error"""
+    job = extraction_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job})
+
+# --- Provider Race ---
+
+# Race the capture across several providers instead of the route's own one
+# (opt-in: RACE_MODE=1 or POST /api/race)
+RACE_MODE = os.environ.get("RACE_MODE", "0") == "1"
+# Extractors per kind and provider that can take part in a race
+RACE_EXTRACTORS = {
+    "coding": {
+        "claude": extract_coding_question,
+        "gemini": extract_coding_question_with_gemini,
+        "openai": extract_coding_question_with_openai,
+    },
+    "react": {
+        "gemini": extract_react_question_with_gemini,
+        "openai": extract_react_question_with_openai,
+    },
+}
+
+# enabled: race instead of using the route's provider; providers: race set (in order)
+race_state = {
+    "enabled": RACE_MODE,
+    "providers": [name.strip() for name in os.environ.get("RACE_PROVIDERS", "claude,gemini,openai").split(",") if name.strip()]
+}
+race_state_lock = threading.Lock()
+provider_race = ProviderRace()
+
+def _race_extractor(kind):
+    """
+    Extractor that races the enabled providers for kind
+
+    Returns:
+    - Callable (screenshot) -> question, or None when race mode is off or fewer than two
+      providers can race for kind
+    """
+    with race_state_lock:
+        if not race_state["enabled"]:
+            return None
+        providers = list(race_state["providers"])
+    extractors = RACE_EXTRACTORS.get(kind, {})
+    candidates = [(name, extractors[name]) for name in providers if name in extractors]
+    if len(candidates) < 2:
+        return None
+
+    def race(screenshot):
+        winner, question, _ = provider_race.run(candidates, screenshot)
+        return question
+    return race
+
+@screenshot_bp.route('/api/race', methods=['GET', 'POST'])
+def provider_race_route():
+    """Get or set ({"enabled": bool, "providers": ["claude", "gemini", "openai"]}) race mode, with per-provider stats"""
+    if request.method == 'POST':
+        data = request.json or {}
+        with race_state_lock:
+            race_state["enabled"] = bool(data.get('enabled', False))
+            if data.get('providers'):
+                race_state["providers"] = [name for name in data['providers'] if name in RACE_EXTRACTORS["coding"]]
+        if data.get('reset_stats'):
+            provider_race.reset_stats()
+    with race_state_lock:
+        state = dict(race_state)
+    return jsonify({"status": "success", **state, "stats": provider_race.stats()})
+
 # --- Screenshot Capture and Extraction Routes ---
+# Each route answers as soon as the screenshot is captured; the extraction runs as a
+# background job (poll /api/jobs/<job_id> or /api/extracted_question/<filename>).
+
+def _capture_and_extract(default_type, kind, extract_fn, provider_label, coding_only=False):
+    """
+    Shared body of the capture routes
+
+    Parameters:
+    - default_type: question_type used when the request has none
+    - kind: Extraction kind
+    - extract_fn: Extractor called with the screenshot
+    - provider_label: Provider name for log messages
+    - coding_only: Only extract when question_type is 'coding'
+
+    Returns:
+    - JSON response with the screenshot record and the extraction job
+    """
+    screenshot = take_screenshot_image()
+    if screenshot is None:
+        # Monitor missing or the capture failed
+        return jsonify({"status": "error", "message": "Screen capture failed: no screenshot was taken"}), 500
+    data = request.json or {}
+    question_type = data.get('question_type', default_type)
+    notes = data.get('notes', '')
+
+    screenshot_info = add_screenshot_to_interview(screenshot.path, question_type, notes)
+
+    extraction = {"extracted_question": None, "reused_from": None, "job_id": None}
+    if not coding_only or question_type == 'coding':
+        # Race mode replaces the route's provider with the race set
+        race = _race_extractor(kind)
+        if race is not None:
+            extract_fn, provider_label = race, "race"
+        extraction = start_extraction(screenshot, kind, extract_fn, provider_label, data.get('wait', False))
+
+    return jsonify({
+        "status": "success",
+        "screenshot": screenshot_info,
+        **extraction
+    })
 
 @screenshot_bp.route('/api/screenshot', methods=['POST']) # Claude Coding Question
 def capture_screenshot_claude():
     try:
-        screenshot_path = take_screenshot()
-        data = request.json or {}
-        question_type = data.get('question_type', 'coding') # Default to coding
-        notes = data.get('notes', '')
-
-        screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
-
-        extracted_question = None
-        if question_type == 'coding':
-            extracted_question = extract_coding_question(screenshot_path)
-            if extracted_question:
-                print(f"Extracted question with Claude: {extracted_question}")
-                store_extracted_question(screenshot_path, extracted_question)
-
-        return jsonify({
-            "status": "success",
-            "screenshot": screenshot_info,
-            "extracted_question": extracted_question
-        })
+        return _capture_and_extract('coding', 'coding', extract_coding_question, "Claude", coding_only=True)
     except Exception as e:
         print(f"Error in /api/screenshot (Claude): {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -49,27 +295,7 @@ def capture_screenshot_claude():
 @screenshot_bp.route('/api/extract-with-gemini', methods=['POST']) # Gemini Coding Question
 def extract_with_gemini():
     try:
-        print("call it")
-        screenshot_path = take_screenshot()
-        print(screenshot_path)
-        data = request.json or {}
-        question_type = data.get('question_type', 'coding') # Default to coding
-        notes = data.get('notes', '')
-
-        screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
-
-        extracted_question = None
-        if question_type == 'coding':
-            extracted_question = extract_coding_question_with_gemini(screenshot_path)
-            if extracted_question:
-                print(f"Extracted question with Gemini: {extracted_question}")
-                store_extracted_question(screenshot_path, extracted_question)
-
-        return jsonify({
-            "status": "success",
-            "screenshot": screenshot_info,
-            "extracted_question": extracted_question
-        })
+        return _capture_and_extract('coding', 'coding', extract_coding_question_with_gemini, "Gemini", coding_only=True)
     except Exception as e:
         print(f"Error in /api/extract-with-gemini: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -77,23 +303,7 @@ def extract_with_gemini():
 @screenshot_bp.route('/api/get-design-question', methods=['POST']) # Gemini Design Question
 def get_design_question():
     try:
-        screenshot_path = take_screenshot()
-        data = request.json or {}
-        question_type = data.get('question_type', 'design') # Should be design
-        notes = data.get('notes', '')
-
-        screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
-
-        extracted_question = extract_design_question_with_gemini(screenshot_path)
-        if extracted_question:
-            print(f"Extracted design question: {extracted_question}")
-            store_extracted_question(screenshot_path, extracted_question)
-
-        return jsonify({
-            "status": "success",
-            "screenshot": screenshot_info,
-            "extracted_question": extracted_question
-        })
+        return _capture_and_extract('design', 'design', extract_design_question_with_gemini, "Gemini")
     except Exception as e:
         print(f"Error in /api/get-design-question: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -101,23 +311,7 @@ def get_design_question():
 @screenshot_bp.route('/api/extract-react-question', methods=['POST']) # Gemini React Question
 def extract_react_question_gemini():
     try:
-        screenshot_path = take_screenshot()
-        data = request.json or {}
-        question_type = data.get('question_type', 'react') # Should be react
-        notes = data.get('notes', '')
-
-        screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
-
-        extracted_question = extract_react_question_with_gemini(screenshot_path)
-        if extracted_question:
-            print(f"Extracted React question with Gemini: {extracted_question}")
-            store_extracted_question(screenshot_path, extracted_question)
-
-        return jsonify({
-            "status": "success",
-            "screenshot": screenshot_info,
-            "extracted_question": extracted_question
-        })
+        return _capture_and_extract('react', 'react', extract_react_question_with_gemini, "Gemini")
     except Exception as e:
         print(f"Error in /api/extract-react-question (Gemini): {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -125,25 +319,7 @@ def extract_react_question_gemini():
 @screenshot_bp.route('/api/extract-with-openai', methods=['POST']) # OpenAI Coding Question
 def extract_with_openai():
     try:
-        screenshot_path = take_screenshot()
-        data = request.json or {}
-        question_type = data.get('question_type', 'coding') # Default to coding
-        notes = data.get('notes', '')
-
-        screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
-
-        extracted_question = None
-        if question_type == 'coding':
-            extracted_question = extract_coding_question_with_openai(screenshot_path)
-            if extracted_question:
-                print(f"Extracted question with OpenAI: {extracted_question}")
-                store_extracted_question(screenshot_path, extracted_question)
-
-        return jsonify({
-            "status": "success",
-            "screenshot": screenshot_info,
-            "extracted_question": extracted_question
-        })
+        return _capture_and_extract('coding', 'coding', extract_coding_question_with_openai, "OpenAI", coding_only=True)
     except Exception as e:
         print(f"Error in /api/extract-with-openai: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -151,25 +327,81 @@ def extract_with_openai():
 @screenshot_bp.route('/api/extract-react-question-openai', methods=['POST']) # OpenAI React Question
 def extract_react_question_openai_route():
     try:
-        screenshot_path = take_screenshot()
+        return _capture_and_extract('react', 'react', extract_react_question_with_openai, "OpenAI")
+    except Exception as e:
+        print(f"Error in /api/extract-react-question-openai: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@screenshot_bp.route('/api/watcher', methods=['GET', 'POST'])
+def screen_watcher_route():
+    """Get or set ({"enabled": bool, "kind": "coding"|"design"|"react", "interval": seconds}) the screen watcher"""
+    if request.method == 'POST':
+        data = request.json or {}
+        if data.get('kind') in GEMINI_EXTRACTORS:
+            with watcher_state_lock:
+                watcher_state["kind"] = data['kind']
+        if data.get('interval'):
+            try:
+                screen_watcher.interval = max(0.2, float(data['interval']))
+            except (TypeError, ValueError):
+                return jsonify({"status": "error", "message": f"Invalid interval: {data['interval']!r}"}), 400
+        # Only an explicit "enabled" starts or stops it; changing kind or interval alone keeps it running
+        if 'enabled' in data:
+            if data['enabled']:
+                screen_watcher.start()
+            else:
+                screen_watcher.stop()
+    with watcher_state_lock:
+        kind = watcher_state["kind"]
+    return jsonify({"status": "success", "kind": kind, **screen_watcher.status()})
+
+# --- Burst Capture (long statements captured while scrolling) ---
+
+burst_recorder = BurstRecorder(lambda: get_capture_service().grab())
+
+@screenshot_bp.route('/api/burst/start', methods=['POST'])
+def start_burst_capture():
+    """Start recording frames; scroll through the problem, then POST /api/burst/stop"""
+    burst_recorder.start()
+    return jsonify({"status": "success", "recording": True})
+
+@screenshot_bp.route('/api/burst/stop', methods=['POST']) # Gemini, one extraction for the whole burst
+def stop_burst_capture():
+    try:
         data = request.json or {}
-        question_type = data.get('question_type', 'react') # Should be react
+        question_type = data.get('question_type', 'coding')
         notes = data.get('notes', '')
+        if question_type not in GEMINI_EXTRACTORS:
+            return jsonify({"status": "error", "message": f"Unknown question_type: {question_type}"}), 400
+
+        # 1. Stitch the recorded frames into one tall image
+        frames = burst_recorder.stop()
+        if not frames:
+            return jsonify({"status": "error", "message": "No burst frames were recorded"}), 400
+        stitched, offsets = stitch_frames(frames)
+        if stitched is None:
+            return jsonify({"status": "error", "message": "Burst frames could not be stitched"}), 500
+        print(f"Stitched {len(frames)} burst frames into {stitched.shape[1]}x{stitched.shape[0]} (offsets {offsets})")
+        screenshot = get_capture_service().store_image(stitched.tobytes(), (stitched.shape[1], stitched.shape[0]))
+        if screenshot is None:
+            return jsonify({"status": "error", "message": "Screen capture failed: the stitched screenshot could not be stored"}), 500
+        screenshot_path = screenshot.path
 
         screenshot_info = add_screenshot_to_interview(screenshot_path, question_type, notes)
 
-        extracted_question = extract_react_question_with_openai(screenshot_path)
-        if extracted_question:
-            print(f"Extracted React question with OpenAI: {extracted_question}")
-            store_extracted_question(screenshot_path, extracted_question)
+        # 2. A single extraction call for the whole statement (in the background)
+        extraction = start_extraction(screenshot, question_type, GEMINI_EXTRACTORS[question_type],
+                                      "Gemini (burst)", data.get('wait', False))
 
         return jsonify({
             "status": "success",
             "screenshot": screenshot_info,
-            "extracted_question": extracted_question
+            **extraction,
+            "frames": len(frames),
+            "offsets": offsets
         })
     except Exception as e:
-        print(f"Error in /api/extract-react-question-openai: {str(e)}")
+        print(f"Error in /api/burst/stop: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # --- Routes to Get Extracted Questions ---
@@ -193,7 +425,57 @@ def get_extracted_question(screenshot_filename):
 
 # --- Route to Serve Screenshots ---
 
+# Content-addressed files never change, so browsers may cache them for a year
+IMMUTABLE_CACHE_SECONDS = 365 * 24 * 3600
+
+def _interview_screenshot_paths():
+    """Screenshots of the current interview (never evicted from the store)"""
+    with interview_data_lock:
+        return {screenshot["path"] for screenshot in interview_data["screenshots"]}
+
+get_screenshot_store('screenshots').pinned_fn = _interview_screenshot_paths
+
+def _send_cached(directory, filename, etag=None):
+    """Send a file with a strong ETag and long cache headers when its name is a content digest"""
+    if etag is None:
+        return send_from_directory(directory, filename)
+    response = send_from_directory(directory, filename, etag=etag, max_age=IMMUTABLE_CACHE_SECONDS)
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_CACHE_SECONDS}, immutable'
+    return response
+
+def _screenshot_path(filename):
+    """Path of filename inside 'screenshots', or None if it resolves outside the directory"""
+    root = os.path.realpath('screenshots')
+    resolved = os.path.realpath(os.path.join(root, filename))
+    if os.path.commonpath([root, resolved]) != root:
+        return None
+    return os.path.join('screenshots', os.path.relpath(resolved, root))
+
+@screenshot_bp.route('/screenshots/thumbnails/<path:filename>')
+def serve_screenshot_thumbnail(filename):
+    # Listing views get a small JPEG, generated once per screenshot
+    screenshot_path = _screenshot_path(filename)
+    if screenshot_path is None:
+        return jsonify({"status": "error", "message": "Invalid screenshot path"}), 404
+    captured = get_captured_image(screenshot_path)
+    store = get_screenshot_store('screenshots')
+    thumbnail_path = store.thumbnail(screenshot_path, captured.to_pil() if captured is not None else None)
+    if thumbnail_path is None:
+        return serve_screenshot_file(filename)
+    etag = os.path.splitext(os.path.basename(thumbnail_path))[0] if is_content_addressed(filename) else None
+    return _send_cached(os.path.join('..', os.path.dirname(thumbnail_path)), os.path.basename(thumbnail_path), etag)
+
 @screenshot_bp.route('/screenshots/<path:filename>')
 def serve_screenshot_file(filename):
+    screenshot_path = os.path.join('screenshots', filename)
+    get_screenshot_store('screenshots').touch(screenshot_path)
+    etag = os.path.splitext(os.path.basename(filename))[0] if is_content_addressed(filename) else None
+    # A fresh capture may still be on its way to disk: serve it from memory
+    captured = get_captured_image(screenshot_path)
+    if captured is not None and not captured.saved.is_set():
+        response = send_file(io.BytesIO(captured.png_bytes()), mimetype='image/png', etag=etag or False)
+        if etag:
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_CACHE_SECONDS}, immutable'
+        return response
     # Serve directly from the 'screenshots' directory relative to the project root
-    return send_from_directory('../screenshots', filename)
+    return _send_cached('../screenshots', filename, etag)
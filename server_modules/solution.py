@@ -1,6 +1,8 @@
 import os
 import threading
-from flask import Blueprint, jsonify, request, make_response # Add make_response
+import json
+import math
+from flask import Blueprint, jsonify, request, make_response, Response, stream_with_context # Add make_response
 from datetime import datetime
 
 # Import shared app and data/locks/helpers
@@ -19,29 +21,152 @@ from gemini_api.get_followup_solution_with_gemini import get_followup_solution_w
 from gemini_api.get_react_solution_with_gemini import get_react_solution_with_gemini, get_react_solution2_with_gemini
 from openai_api import get_solution_for_question_with_openai
 
+# Retrieval helper for building follow-up transcripts server-side
+from .transcription import get_relevant_transcript
+# Range lookups for follow-up context references
+from .interview import get_question_transcript, get_transcript_text
+from web_adapter import get_recent_transcriptions, get_last_segment_id, add_transcription_listener
+from .config import get_latest_solution_key
+
+# Background pre-generation of follow-up answers
+from speculative_followup import SpeculativeFollowups
+# Token streams with time-to-first-token tracking
+from generation_stream import StreamRegistry
+
 # Create a Blueprint for solution routes
 solution_bp = Blueprint('solution', __name__, url_prefix='/api')
 
+# Seconds of recent transcript used as follow-up context (matches the UI's request)
+FOLLOWUP_TRANSCRIPT_SECONDS = 120
+# Pre-generate follow-ups when the transcript looks like one (opt-in: SPECULATIVE_FOLLOWUPS=1
+# or POST /api/solution/speculative)
+SPECULATIVE_FOLLOWUPS = os.environ.get("SPECULATIVE_FOLLOWUPS", "0") == "1"
+
+# --- Follow-up Context Assembly ---
+
+def _reference_number(value, name, cast=int):
+    """
+    Convert a client-supplied reference to a number
+
+    Raises:
+    - ValueError with a message for the client if value is not a valid number
+    """
+    try:
+        if isinstance(value, bool):
+            raise TypeError(name)
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return number
+
+def resolve_followup_context(data):
+    """
+    Assemble follow-up context from references instead of uploaded text.
+    Uploaded values still take precedence, so older clients keep working.
+
+    Parameters:
+    - data: Request JSON. References:
+      - storage_key / screenshot_path / solution_key: key of the question and its solution
+      - question_id (+ question_followup_id): use that question's transcript range
+      - transcript_range: [first_segment_id, last_segment_id or null]
+      - transcript_after: segment cursor; use every segment after it
+      - transcript_seconds: use the last N seconds of transcript
+
+    Returns:
+    - (problem, code, transcript, key); missing parts are empty strings
+
+    Raises:
+    - ValueError if a transcript reference is malformed (routes answer 400)
+    """
+    key = data.get('storage_key') or data.get('screenshot_path') or data.get('solution_key') or ''
+
+    # 1. Problem and current code from what the server already stored under the key.
+    # The question pinned with the solution comes first: the extracted question under the
+    # same key (e.g. "transcript_latest") may have been replaced since the solution was generated.
+    problem = data.get('problem') or data.get('react_question') or ''
+    code = data.get('code') or data.get('current_solution') or ''
+    if key and (not problem or not code):
+        with interview_data_lock:
+            if not problem:
+                problem = (interview_data["solution_questions"].get(key) or
+                           interview_data["extracted_questions"].get(key, ''))
+            if not code:
+                # Same priority as the UI: raw React code first, then the structured solution's code
+                stored_solution = interview_data["solutions"].get(key)
+                code = interview_data["react_solutions"].get(key) or (
+                    stored_solution.get("code", '') if isinstance(stored_solution, dict) else '')
+
+    # 2. Transcript from the referenced range, falling back to retrieval on the problem
+    transcript = data.get('transcript', '')
+    if not transcript:
+        if data.get('transcript_range'):
+            transcript_range = data['transcript_range']
+            if not isinstance(transcript_range, (list, tuple)) or len(transcript_range) > 2:
+                raise ValueError(f"Invalid transcript_range: {transcript_range!r}")
+            first_id, last_id = (list(transcript_range) + [None])[:2]
+            transcript = get_transcript_text(_reference_number(first_id, "transcript_range"),
+                                             _reference_number(last_id, "transcript_range") if last_id is not None else None)
+        elif data.get('transcript_after') is not None:
+            transcript = get_transcript_text(_reference_number(data['transcript_after'], "transcript_after") + 1)
+        elif data.get('transcript_seconds'):
+            seconds = _reference_number(data['transcript_seconds'], "transcript_seconds", float)
+            if seconds <= 0:
+                raise ValueError(f"Invalid transcript_seconds: {seconds!r}")
+            transcript = "\n".join(item.get("text", "") for item in get_recent_transcriptions(seconds))
+        elif data.get('question_id') is not None:
+            followup_ref = data.get('question_followup_id')
+            transcript = get_question_transcript(_reference_number(data['question_id'], "question_id"),
+                                                 _reference_number(followup_ref, "question_followup_id") if followup_ref is not None else None)
+    if not transcript:
+        # Without a usable reference, use the relevant segments plus the recent window
+        transcript = get_relevant_transcript(problem)
+
+    return problem, code, transcript, key
+
+# --- Speculative Follow-ups ---
+
+def _speculative_context(key):
+    """Follow-up context for key, assembled exactly as for a button press"""
+    problem, code, transcript, _ = resolve_followup_context(
+        {"storage_key": key, "transcript_seconds": FOLLOWUP_TRANSCRIPT_SECONDS})
+    return problem, code, transcript
+
+def _speculative_generate(key, problem, code, transcript):
+    """Generate the follow-up the matching route would: Gemini React for React solutions, Claude otherwise"""
+    with interview_data_lock:
+        is_react = bool(interview_data["react_solutions"].get(key))
+    if is_react:
+        return "gemini-react", get_react_followup_solution_with_gemini(transcript, problem, code)
+    return "claude", get_followup_solution(problem, code, transcript)
+
+speculative_followups = SpeculativeFollowups(_speculative_context, _speculative_generate,
+                                             enabled=SPECULATIVE_FOLLOWUPS)
+# Only segments spoken from now on can be follow-ups to the current solution
+add_transcription_listener(lambda segment: speculative_followups.observe(segment, get_latest_solution_key()),
+                           speculative_followups.reset, replay=False)
+
 # --- Background Solution Processing Functions ---
 
-def process_solution_with_claude(question, screenshot_path):
+def process_solution_with_claude(question, screenshot_path, on_token=None):
     try:
-        solution = get_solution_for_question(question)
+        solution = get_solution_for_question(question, on_token=on_token)
         if solution:
             print(f"Solution generated for question (Claude)")
-            store_solution(screenshot_path, solution)
+            store_solution(screenshot_path, solution, question)
         else:
             print("Failed to generate solution for question (Claude)")
     except Exception as e:
         print(f"Error processing solution with Claude: {str(e)}")
 
-def process_followup_solution_with_claude(current_problem, current_code, transcript, screenshot_path):
+def process_followup_solution_with_claude(current_problem, current_code, transcript, screenshot_path, on_token=None):
     try:
         print(f"Processing Claude follow-up request...")
         print(f"--- Problem sent to Claude (Standard Follow-up) ---")
         print(current_problem)
         print(f"--- End Problem ---")
-        solution = get_followup_solution(current_problem, current_code, transcript)
+        solution = get_followup_solution(current_problem, current_code, transcript, on_token=on_token)
         if solution:
             print(f"Claude follow-up solution generated successfully")
             store_followup_solution(screenshot_path, solution, provider="claude")
@@ -50,66 +175,66 @@ def process_followup_solution_with_claude(current_problem, current_code, transcr
     except Exception as e:
         print(f"Error processing follow-up solution (Claude): {str(e)}")
 
-def process_solution_with_openai(question, screenshot_path):
+def process_solution_with_openai(question, screenshot_path, on_token=None):
     try:
-        solution = get_solution_for_question_with_openai(question)
+        solution = get_solution_for_question_with_openai(question, on_token=on_token)
         if solution:
             print(f"Solution generated for question (OpenAI)")
-            store_solution(screenshot_path, solution)
+            store_solution(screenshot_path, solution, question)
         else:
             print("Failed to generate solution for question (OpenAI)")
     except Exception as e:
         print(f"Error processing solution with OpenAI: {str(e)}")
 
-def process_solution_with_gemini(question, screenshot_path):
+def process_solution_with_gemini(question, screenshot_path, on_token=None):
     try:
-        solution = get_solution_for_question_with_gemini(question)
+        solution = get_solution_for_question_with_gemini(question, on_token=on_token)
         if solution:
             print(f"Solution generated for question (Gemini)")
-            store_solution(screenshot_path, solution)
+            store_solution(screenshot_path, solution, question)
         else:
             print("Failed to generate solution for question (Gemini)")
     except Exception as e:
         print(f"Error processing solution with Gemini: {str(e)}")
 
 # Update function signature and usage to use storage_key
-def process_react_solution_with_gemini(question, storage_key):
+def process_react_solution_with_gemini(question, storage_key, on_token=None):
     try:
-        solution = get_react_solution_with_gemini(question)
+        solution = get_react_solution_with_gemini(question, on_token=on_token)
         if solution:
             print(f"React solution generated for question (Gemini) with key: {storage_key}")
-            store_react_solution(storage_key, solution) # Use storage_key
+            store_react_solution(storage_key, solution, question) # Use storage_key
         else:
             print(f"Failed to generate React solution for question (Gemini) with key: {storage_key}")
     except Exception as e:
         print(f"Error processing React solution with Gemini (key: {storage_key}): {str(e)}")
 
-def process_react_solution_with_claude(question, screenshot_path):
+def process_react_solution_with_claude(question, screenshot_path, on_token=None):
     try:
-        solution = get_react_solution(question)
+        solution = get_react_solution(question, on_token=on_token)
         if solution:
             print(f"React solution generated for question (Claude)")
-            store_react_solution(screenshot_path, solution) # Use specific react storage
+            store_react_solution(screenshot_path, solution, question) # Use specific react storage
         else:
             print("Failed to generate React solution for question (Claude)")
     except Exception as e:
         print(f"Error processing React solution with Claude: {str(e)}")
 
-def process_react_solution2_with_gemini(question, screenshot_path):
+def process_react_solution2_with_gemini(question, screenshot_path, on_token=None):
     try:
-        solution = get_react_solution2_with_gemini(question)
+        solution = get_react_solution2_with_gemini(question, on_token=on_token)
         if solution:
             print(f"React solution2 generated for question (Gemini)")
-            store_react_solution(screenshot_path, solution) # Use specific react storage
+            store_react_solution(screenshot_path, solution, question) # Use specific react storage
         else:
             print("Failed to generate React solution2 for question (Gemini)")
     except Exception as e:
         print(f"Error processing React solution2 with Gemini: {str(e)}")
 
-def process_followup_solution_with_gemini(current_problem, current_code, transcript, screenshot_path):
+def process_followup_solution_with_gemini(current_problem, current_code, transcript, screenshot_path, on_token=None):
     try:
         print(f"Processing Gemini follow-up request...")
-        solution = get_followup_solution_with_gemini(current_problem, current_code, transcript)
+        solution = get_followup_solution_with_gemini(current_problem, current_code, transcript, on_token=on_token)
         if solution:
             print(f"Gemini follow-up solution generated successfully")
             store_followup_solution(screenshot_path, solution, provider="gemini")
@@ -118,14 +243,14 @@ def process_followup_solution_with_gemini(current_problem, current_code, transcr
     except Exception as e:
         print(f"Error processing Gemini follow-up solution: {str(e)}")
 
-def process_followup_solution_with_claude_react(transcript, react_question, current_solution, screenshot_path, followup_id): # Add followup_id
+def process_followup_solution_with_claude_react(transcript, react_question, current_solution, screenshot_path, followup_id, on_token=None): # Add followup_id
     """Background task to get and store raw Claude React follow-up."""
     try:
         print(f"Processing Claude React follow-up request for ID: {followup_id}...")
         print(f"--- React Question sent to Claude (React Follow-up) ---")
         print(react_question)
         print(f"--- End React Question ---")
-        raw_solution = get_followup_solution_with_claude_react(transcript, react_question, current_solution)
+        raw_solution = get_followup_solution_with_claude_react(transcript, react_question, current_solution, on_token=on_token)
         if raw_solution:
             print(f"Claude React follow-up solution generated successfully for ID: {followup_id} (raw)")
             # Pass followup_id to the storage function
@@ -137,7 +262,7 @@ def process_followup_solution_with_claude_react(transcript, react_question, curr
 
 
 # Update function signature and usage to use storage_key
-def process_react_followup_solution_with_gemini(transcript, react_question, current_solution, storage_key):
+def process_react_followup_solution_with_gemini(transcript, react_question, current_solution, storage_key, on_token=None):
     """Background task to get and store raw Gemini React follow-up."""
     try:
         print(f"Processing Gemini React follow-up request for key: {storage_key}...")
@@ -145,7 +270,7 @@ def process_react_followup_solution_with_gemini(transcript, react_question, curr
         print('--------------------')
         print(current_solution)
         # Assuming the Gemini function takes similar arguments
-        raw_solution = get_react_followup_solution_with_gemini(transcript, react_question, current_solution)
+        raw_solution = get_react_followup_solution_with_gemini(transcript, react_question, current_solution, on_token=on_token)
         if raw_solution:
             print(f"Gemini React follow-up solution generated successfully for key: {storage_key} (raw)")
             # Use the new specific storage function with storage_key
@@ -156,6 +281,39 @@ def process_react_followup_solution_with_gemini(transcript, react_question, curr
         print(f"Error processing follow-up solution (Gemini React raw) for key {storage_key}: {str(e)}")
 
 
+# --- Streamed Generation ---
+
+# Token streams of running and recent generations (relayed by /api/solution/stream/<id>)
+solution_streams = StreamRegistry()
+# Seconds between SSE keep-alive comments while waiting for tokens
+STREAM_KEEPALIVE_SECONDS = 15
+
+def _start_generation(provider, target, *args):
+    """
+    Run a generation on a background thread, streaming its tokens
+
+    Parameters:
+    - provider: Provider label for the stream and its time-to-first-token stats
+    - target: Function called as target(*args, on_token=...)
+
+    Returns:
+    - Stream ID for /api/solution/stream/<stream_id>
+    """
+    stream = solution_streams.open(provider)
+
+    def run():
+        try:
+            target(*args, on_token=stream.append)
+        except Exception as e:
+            print(f"Error in streamed {provider} generation: {str(e)}")
+        finally:
+            solution_streams.finish(stream)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return stream.id
+
 # --- Solution Request Routes (Start Background Threads) ---
 
 @solution_bp.route('/solution', methods=['POST']) # Claude Coding Solution
@@ -166,25 +324,37 @@ def get_solution_claude():
     if not question or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing question or screenshot_path"}), 400
 
-    thread = threading.Thread(target=process_solution_with_claude, args=(question, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Claude solution request submitted"})
+    stream_id = _start_generation("claude", process_solution_with_claude, question, screenshot_path)
+    return jsonify({"status": "success", "message": "Claude solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/solution/followup', methods=['POST']) # Claude Follow-up
 def get_followup_solution_claude():
     data = request.json or {}
-    problem = data.get('problem', '')
-    code = data.get('code', '')
-    transcript = data.get('transcript', '')
-    screenshot_path = data.get('screenshot_path', '')
+    try:
+        problem, code, transcript, screenshot_path = resolve_followup_context(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     if not problem or not code or not transcript or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing required parameters for follow-up"}), 400
 
-    thread = threading.Thread(target=process_followup_solution_with_claude, args=(problem, code, transcript, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Claude follow-up solution request submitted"})
+    # A matching answer pre-generated in the background is stored right away; one still
+    # being generated is joined and stored when it finishes (the UI polls as usual)
+    def on_speculation(solution):
+        if solution:
+            store_followup_solution(screenshot_path, solution, provider="claude")
+        else:
+            _start_generation("claude-followup", process_followup_solution_with_claude, problem, code, transcript, screenshot_path)
+
+    solution, pending = speculative_followups.take(screenshot_path, "claude", (problem, code, transcript),
+                                                    get_last_segment_id(), on_speculation)
+    if solution:
+        store_followup_solution(screenshot_path, solution, provider="claude")
+        return jsonify({"status": "success", "message": "Claude follow-up solution ready (speculative)", "speculative": True})
+    if pending:
+        return jsonify({"status": "success", "message": "Claude follow-up solution request submitted (speculative)", "speculative": True})
+
+    stream_id = _start_generation("claude-followup", process_followup_solution_with_claude, problem, code, transcript, screenshot_path)
+    return jsonify({"status": "success", "message": "Claude follow-up solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/solution-with-openai', methods=['POST']) # OpenAI Coding Solution
 def get_solution_openai():
@@ -194,10 +364,8 @@ def get_solution_openai():
     if not question or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing question or screenshot_path"}), 400
 
-    thread = threading.Thread(target=process_solution_with_openai, args=(question, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "OpenAI solution request submitted"})
+    stream_id = _start_generation("openai", process_solution_with_openai, question, screenshot_path)
+    return jsonify({"status": "success", "message": "OpenAI solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/solution-with-gemini', methods=['POST']) # Gemini Coding Solution
 def get_solution_gemini():
@@ -207,10 +375,8 @@ def get_solution_gemini():
     if not question or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing question or screenshot_path"}), 400
 
-    thread = threading.Thread(target=process_solution_with_gemini, args=(question, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Gemini solution request submitted"})
+    stream_id = _start_generation("gemini", process_solution_with_gemini, question, screenshot_path)
+    return jsonify({"status": "success", "message": "Gemini solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/react-solution-with-gemini', methods=['POST']) # Gemini React Solution
 def get_react_solution_gemini():
@@ -228,10 +394,8 @@ def get_react_solution_gemini():
         return jsonify({"status": "error", "message": "Missing question or storage_key"}), 400
 
     # Pass storage_key to the background process
-    thread = threading.Thread(target=process_react_solution_with_gemini, args=(question, storage_key))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "React Gemini solution request submitted"})
+    stream_id = _start_generation("gemini-react", process_react_solution_with_gemini, question, storage_key)
+    return jsonify({"status": "success", "message": "React Gemini solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/react-solution-with-claude', methods=['POST']) # Claude React Solution
 def get_react_solution_claude():
@@ -241,10 +405,8 @@ def get_react_solution_claude():
     if not question or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing question or screenshot_path"}), 400
 
-    thread = threading.Thread(target=process_react_solution_with_claude, args=(question, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "React Claude solution request submitted"})
+    stream_id = _start_generation("claude-react", process_react_solution_with_claude, question, screenshot_path)
+    return jsonify({"status": "success", "message": "React Claude solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/react-solution2-with-gemini', methods=['POST']) # Gemini React Solution (Claude Prompt)
 def get_react_solution2_gemini():
@@ -254,64 +416,127 @@ def get_react_solution2_gemini():
     if not question or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing question or screenshot_path"}), 400
 
-    thread = threading.Thread(target=process_react_solution2_with_gemini, args=(question, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "React Gemini solution2 request submitted"})
+    stream_id = _start_generation("gemini-react2", process_react_solution2_with_gemini, question, screenshot_path)
+    return jsonify({"status": "success", "message": "React Gemini solution2 request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/solution/followup-with-gemini', methods=['POST']) # Gemini Follow-up
 def get_followup_solution_gemini():
     data = request.json or {}
-    problem = data.get('problem', '')
-    code = data.get('code', '')
-    transcript = data.get('transcript', '')
-    screenshot_path = data.get('screenshot_path', '')
+    try:
+        problem, code, transcript, screenshot_path = resolve_followup_context(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     if not problem or not code or not transcript or not screenshot_path:
         return jsonify({"status": "error", "message": "Missing required parameters for follow-up"}), 400
 
-    thread = threading.Thread(target=process_followup_solution_with_gemini, args=(problem, code, transcript, screenshot_path))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Gemini follow-up solution request submitted"})
+    stream_id = _start_generation("gemini-followup", process_followup_solution_with_gemini, problem, code, transcript, screenshot_path)
+    return jsonify({"status": "success", "message": "Gemini follow-up solution request submitted", "stream_id": stream_id})
 
 @solution_bp.route('/solution/followup-with-claude-react', methods=['POST']) # Claude React Follow-up (Raw)
 def get_followup_solution_claude_react_route():
     data = request.json or {}
-    # Match the keys sent from the frontend
-    react_question = data.get('react_question', '')
-    current_solution = data.get('current_solution', '')
-    transcript = data.get('transcript', '')
-    screenshot_path = data.get('screenshot_path', '')
+    try:
+        react_question, current_solution, transcript, screenshot_path = resolve_followup_context(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     followup_id = data.get('followup_id', None) # Extract the followup_id
     if not react_question or not current_solution or not transcript or not screenshot_path or not followup_id:
         return jsonify({"status": "error", "message": "Missing required parameters (incl. followup_id) for Claude React follow-up"}), 400
 
     # Pass followup_id to the background processing function
-    thread = threading.Thread(target=process_followup_solution_with_claude_react, args=(transcript, react_question, current_solution, screenshot_path, followup_id))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Claude React follow-up solution request submitted"})
+    stream_id = _start_generation("claude-react-followup", process_followup_solution_with_claude_react, transcript, react_question, current_solution, screenshot_path, followup_id)
+    return jsonify({"status": "success", "message": "Claude React follow-up solution request submitted", "stream_id": stream_id})
 
 
 @solution_bp.route('/solution/react-followup-with-gemini', methods=['POST']) # Gemini React Follow-up (Raw)
 def get_react_followup_solution_gemini_route():
     data = request.json or {}
-    # Match the keys sent from the frontend
-    react_question = data.get('react_question', '')
-    current_solution = data.get('current_solution', '')
-    transcript = data.get('transcript', '')
-    storage_key = data.get('storage_key', '') # Expect storage_key
+    try:
+        react_question, current_solution, transcript, storage_key = resolve_followup_context(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     print('---------------------')
     print('get folloow')
     print('---------------------')
     if not react_question or not current_solution or not transcript or not storage_key: # Check for storage_key
         return jsonify({"status": "error", "message": "Missing required parameters (incl. storage_key) for Gemini React follow-up"}), 400
 
+    # A matching answer pre-generated in the background is stored right away; one still
+    # being generated is joined and stored when it finishes (the UI polls as usual)
+    def on_speculation(raw_solution):
+        if raw_solution:
+            store_gemini_react_followup_solution(storage_key, raw_solution)
+        else:
+            _start_generation("gemini-react-followup", process_react_followup_solution_with_gemini, transcript, react_question, current_solution, storage_key)
+
+    raw_solution, pending = speculative_followups.take(storage_key, "gemini-react", (react_question, current_solution, transcript),
+                                                        get_last_segment_id(), on_speculation)
+    if raw_solution:
+        store_gemini_react_followup_solution(storage_key, raw_solution)
+        return jsonify({"status": "success", "message": "Gemini React follow-up solution ready (speculative)", "speculative": True})
+    if pending:
+        return jsonify({"status": "success", "message": "Gemini React follow-up solution request submitted (speculative)", "speculative": True})
+
     # Start background thread using a new processing function, passing storage_key
-    thread = threading.Thread(target=process_react_followup_solution_with_gemini, args=(transcript, react_question, current_solution, storage_key))
-    thread.daemon = True
-    thread.start()
-    return jsonify({"status": "success", "message": "Gemini React follow-up solution request submitted"})
+    stream_id = _start_generation("gemini-react-followup", process_react_followup_solution_with_gemini, transcript, react_question, current_solution, storage_key)
+    return jsonify({"status": "success", "message": "Gemini React follow-up solution request submitted", "stream_id": stream_id})
+
+
+@solution_bp.route('/solution/speculative', methods=['GET', 'POST'])
+def speculative_followups_route():
+    """Get or set ({"enabled": bool}) speculative follow-up generation"""
+    if request.method == 'POST':
+        data = request.json or {}
+        speculative_followups.set_enabled(data.get('enabled', False))
+        print(f"Speculative follow-ups {'enabled' if speculative_followups.enabled else 'disabled'}")
+    return jsonify({"status": "success", **speculative_followups.status()})
+
+
+@solution_bp.route('/solution/stream/<stream_id>', methods=['GET'])
+def stream_solution(stream_id):
+    """
+    Server-Sent Events stream of a generation's text as it is produced.
+    "token" events carry {"text"} with the delta index as ID (reconnects resume from
+    Last-Event-ID); a final "done" event carries the timings.
+    """
+    stream = solution_streams.get(stream_id)
+    if stream is None:
+        return jsonify({"status": "error", "message": "Unknown stream"}), 404
+    try:
+        offset = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '0'))
+    except ValueError:
+        offset = 0
+
+    def format_event(event, data, event_id=None):
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data)}")
+        return "\n".join(lines) + "\n\n"
+
+    def generate():
+        for index, text in solution_streams.follow(stream, offset, STREAM_KEEPALIVE_SECONDS):
+            if index is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield format_event("token", {"text": text}, event_id=index + 1)
+        ttft_ms = stream.ttft_ms()
+        yield format_event("done", {
+            "provider": stream.provider,
+            "ttft_ms": round(ttft_ms) if ttft_ms is not None else None,
+            "total_ms": round(stream.total_ms())
+        })
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@solution_bp.route('/solution/metrics', methods=['GET'])
+def solution_metrics():
+    """Time to first token and total generation time per provider"""
+    return jsonify({"status": "success", "providers": solution_streams.stats()})
 
 
 # --- Solution Retrieval Routes ---
@@ -410,6 +635,11 @@ def get_design_solution_claude_direct():
 
     print(f"Received request for Claude design solution: {question[:100]}...")
 
+    # Streamed: the markdown arrives as "token" events on /api/solution/stream/<stream_id>
+    if data.get('stream'):
+        stream_id = _start_generation("claude-design", get_design_solution_with_claude, question)
+        return jsonify({"status": "success", "stream_id": stream_id})
+
     try:
         # Call the Claude API function directly
         solution_markdown = get_design_solution_with_claude(question)
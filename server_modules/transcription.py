@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+import json
+import os
+import threading
 import traceback # Import traceback for detailed error logging
 
 # Import shared app and data/locks/helpers
@@ -7,16 +9,105 @@ from .config import app, interview_data, interview_data_lock, store_extracted_qu
 
 # Import transcription-specific functionality
 from web_adapter import WebTranscriber, transcriptions, transcription_lock, is_recording
+from web_adapter import transcription_condition, clear_transcriptions, get_transcriptions_after, get_last_segment_id
+from web_adapter import add_transcription_listener, get_recent_transcriptions
+import web_adapter
+
+# BM25 index over transcript segments for search and prompt retrieval
+from transcript_index import TranscriptIndex
+# Token-budgeted context (rolling summary + recent window) for transcript prompts
+from transcript_context import TranscriptContextBuilder, estimate_tokens
+from gemini_api.summarize_transcript_with_gemini import summarize_transcript_with_gemini
+# Lexical detector that spots new interviewer questions without an LLM call
+from question_detector import QuestionDetector
+# Coalesces identical concurrent extraction calls and reuses their results
+from single_flight import SingleFlight, content_key
 
 # Import the new Gemini function
 from gemini_api.extract_transcript_question_with_gemini import extract_question_from_transcript_with_gemini
+from gemini_api.extract_transcript_question_with_gemini import update_question_from_transcript_delta_with_gemini
+# Re-extraction sends only new segments plus the last structured result
+from incremental_extraction import IncrementalDesignExtractor
 
 # Global variable for the transcriber instance within this module
 transcriber = None
 
+# Seconds between SSE keep-alive comments when no segments arrive
+STREAM_KEEPALIVE_SECONDS = 15
+# Reconnect delay (ms) suggested to EventSource clients
+STREAM_RETRY_MS = 2000
+
+# Window served by /api/transcriptions/recent
+RECENT_TRANSCRIPT_SECONDS = 120
+
+# Default retrieval sizes for prompts built from the index
+RETRIEVAL_TOP_K = 8
+RETRIEVAL_RECENT_COUNT = 12
+
+# Token budget for transcript prompts (override with TRANSCRIPT_TOKEN_BUDGET; negative = unlimited)
+TRANSCRIPT_TOKEN_BUDGET = int(os.environ.get("TRANSCRIPT_TOKEN_BUDGET", 12000))
+TRANSCRIPT_RECENT_TOKENS = int(os.environ.get("TRANSCRIPT_RECENT_TOKENS", 6000))
+
+# Search index kept in sync with the transcript (updated as each segment arrives)
+transcript_index = TranscriptIndex()
+add_transcription_listener(transcript_index.add_segment, transcript_index.clear)
+
+# Context builder kept in sync the same way; older segments are summarized in the background
+transcript_context = TranscriptContextBuilder(
+    summarize_transcript_with_gemini,
+    token_budget=TRANSCRIPT_TOKEN_BUDGET,
+    recent_tokens=TRANSCRIPT_RECENT_TOKENS
+)
+add_transcription_listener(transcript_context.add_segment, transcript_context.reset)
+
+# Run question extraction in the background when the detector fires (opt-in: AUTO_EXTRACT_QUESTIONS=1).
+# Off by default: the detector is a cheap lexical heuristic (in-sample precision 0.40-0.81),
+# so many firings would be unrequested, paid Gemini calls. Toggle at runtime with POST /api/auto-extract.
+AUTO_EXTRACT_QUESTIONS = os.environ.get("AUTO_EXTRACT_QUESTIONS", "0") == "1"
+question_detector = QuestionDetector()
+# State of the background extraction worker
+auto_extraction_lock = threading.Lock()
+auto_extraction = {"enabled": AUTO_EXTRACT_QUESTIONS, "running": False, "pending": False}
+
+# One Gemini extraction per distinct transcript context; callers with the same context share it
+question_extraction_flight = SingleFlight()
+# Last transcript segment ID covered by the stored "transcript_latest" question, so an
+# older extraction finishing late never overwrites a newer one
+latest_extraction_state = {"segment_id": -1}
+
+def _extract_question_from_context(transcript_text):
+    """
+    Full extraction from a budgeted transcript context. The unbudgeted transcript is passed
+    along so long sessions switch to map-reduce over all of it (the budgeted context alone
+    never reaches MAP_REDUCE_THRESHOLD_TOKENS).
+    """
+    return extract_question_from_transcript_with_gemini(transcript_text, transcript_context.build(-1))
+
+# Incremental design extraction (set INCREMENTAL_EXTRACTION=0 to always extract from the full context)
+INCREMENTAL_EXTRACTION = os.environ.get("INCREMENTAL_EXTRACTION", "1") != "0"
+incremental_extractor = IncrementalDesignExtractor(
+    _extract_question_from_context,
+    update_question_from_transcript_delta_with_gemini
+)
+
 # Create a Blueprint for transcription routes
 transcription_bp = Blueprint('transcription', __name__, url_prefix='/api')
 
+def get_relevant_transcript(query, top_k=RETRIEVAL_TOP_K, recent_count=RETRIEVAL_RECENT_COUNT):
+    """
+    Build transcript text for a prompt from the segments most relevant to query
+    plus the most recent window, rather than the entire transcript.
+
+    Parameters:
+    - query: What the prompt is about (e.g. the current problem text)
+    - top_k: Number of relevant older segments to include
+    - recent_count: Number of most recent segments always included
+
+    Returns:
+    - Transcript text (empty string if nothing has been transcribed)
+    """
+    return transcript_index.build_retrieval_context(query or "", top_k=top_k, recent_count=recent_count)
+
 # --- Transcription Routes ---
 
 @transcription_bp.route('/transcriptions', methods=['GET'])
@@ -33,23 +124,83 @@ def get_latest_transcription():
             return jsonify({"text": "", "timestamp": ""})
 
 @transcription_bp.route('/transcriptions/recent', methods=['GET'])
-def get_recent_transcriptions():
-    with transcription_lock:
-        if not transcriptions:
-            return jsonify([])
-
-        current_time = datetime.now()
-        recent_transcriptions = []
-        for transcript in transcriptions:
-            try:
-                transcript_time = datetime.strptime(transcript["timestamp"], "%Y-%m-%d %H:%M:%S")
-                time_diff = (current_time - transcript_time).total_seconds()
-                if time_diff <= 120:
-                    recent_transcriptions.append(transcript)
-            except (ValueError, KeyError) as e:
-                print(f"Error parsing timestamp: {e}")
+def get_recent_transcriptions_route():
+    return jsonify(get_recent_transcriptions(RECENT_TRANSCRIPT_SECONDS))
+
+@transcription_bp.route('/transcriptions/search', methods=['GET'])
+def search_transcriptions():
+    """
+    BM25 search over transcript segments.
+    Query parameters: q (search text), k (max results, default 10).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"status": "error", "message": "Missing 'q' query parameter"}), 400
+    try:
+        top_k = max(1, min(int(request.args.get('k', 10)), 100))
+    except ValueError:
+        return jsonify({"status": "error", "message": "'k' must be an integer"}), 400
+
+    results = [dict(segment, score=round(score, 4)) for score, segment in transcript_index.search(query, top_k)]
+    return jsonify({"status": "success", "query": query, "results": results})
+
+@transcription_bp.route('/transcriptions/stream', methods=['GET'])
+def stream_transcriptions():
+    """
+    Server-Sent Events stream of transcript segments.
+    Each segment is sent once with its ID, so EventSource reconnects resume
+    from the Last-Event-ID header (or ?last_event_id=) without gaps or duplicates.
+    Every open tab gets its own generator waiting on the shared condition.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '0')
+    try:
+        cursor = int(last_event_id)
+    except ValueError:
+        cursor = 0
+
+    def format_event(event, data, event_id=None):
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data)}")
+        return "\n".join(lines) + "\n\n"
+
+    def generate():
+        nonlocal cursor
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+        with transcription_condition:
+            reset_count = web_adapter.transcription_reset_count
+            if cursor > get_last_segment_id():
+                # Client's cursor is from before a server restart; replay the current session
+                cursor = 0
+
+        while True:
+            reset = False
+            with transcription_condition:
+                segments = get_transcriptions_after(cursor)
+                if not segments and reset_count == web_adapter.transcription_reset_count:
+                    transcription_condition.wait(timeout=STREAM_KEEPALIVE_SECONDS)
+                    segments = get_transcriptions_after(cursor)
+                if reset_count != web_adapter.transcription_reset_count:
+                    reset_count = web_adapter.transcription_reset_count
+                    reset = True
+
+            if reset:
+                yield format_event("reset", {})
+            if not segments:
+                yield ": keep-alive\n\n"
                 continue
-        return jsonify(recent_transcriptions)
+
+            for segment in segments:
+                yield format_event("segment", segment, event_id=segment["id"])
+                cursor = segment["id"]
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 # --- Recording Routes ---
 
@@ -60,8 +211,7 @@ def start_recording():
     if is_recording:
         return jsonify({"status": "already_recording"})
 
-    with transcription_lock:
-        transcriptions.clear()
+    clear_transcriptions()
 
     data = request.json or {}
     device_name = data.get('device_name', 'BlackHole')
@@ -92,39 +242,156 @@ def recording_status():
 
 # --- Transcript-based Question Extraction ---
 
+def _segments_after(segment_id):
+    """Copy of the segments after segment_id (takes the transcription lock)"""
+    with transcription_lock:
+        return list(get_transcriptions_after(segment_id))
+
+def _extract_and_store_question(transcript_text, segment_id, incremental):
+    """Call Gemini on transcript_text (or just the new segments) and store the result unless a newer one is already stored"""
+    if incremental:
+        extracted_question = incremental_extractor.extract(transcript_text, _segments_after, segment_id)
+    else:
+        print(f"Sending transcript to Gemini for question extraction (length: {len(transcript_text)} chars, ~{estimate_tokens(transcript_text)} tokens)")
+        extracted_question = _extract_question_from_context(transcript_text)
+    if not extracted_question:
+        return None
+
+    with auto_extraction_lock:
+        is_newest = segment_id >= latest_extraction_state["segment_id"]
+        if is_newest:
+            latest_extraction_state["segment_id"] = segment_id
+    if is_newest:
+        # Using a fixed key for now, might need refinement later
+        store_extracted_question("transcript_latest", extracted_question)
+        print("Stored extracted question with key: transcript_latest")
+    return extracted_question
+
+def run_transcript_question_extraction(token_budget=0, incremental=None):
+    """
+    Extract the latest question from the transcript with Gemini and store it
+    under the "transcript_latest" key. Concurrent calls on the same transcript
+    context share one Gemini request, and the result is reused until new segments arrive.
+
+    Parameters:
+    - token_budget: Transcript token budget (0 uses the default, negative means unlimited)
+    - incremental: Send only the segments since the last extraction (defaults to
+      INCREMENTAL_EXTRACTION; a custom token_budget always extracts from the full context)
+
+    Returns:
+    - (extracted_question, shared): the question (None on failure or empty transcript),
+      and True if it came from another caller's request or the result cache
+    """
+    # 1. Build the transcript context: recent window verbatim, older segments as a rolling summary
+    segment_id = get_last_segment_id()
+    transcript_text = transcript_context.build(token_budget)
+
+    if not transcript_text:
+        print("Transcript is empty, cannot extract question.")
+        return None, False
+
+    # 2. Call Gemini once per distinct context
+    if incremental is None:
+        incremental = INCREMENTAL_EXTRACTION
+    incremental = incremental and not token_budget
+    flight_key = content_key(transcript_text) + (":incremental" if incremental else ":full")
+    return question_extraction_flight.do(flight_key, _extract_and_store_question,
+                                         transcript_text, segment_id, incremental)
+
+def _auto_extraction_worker():
+    """Background task: extract the question, then run again if the detector fired meanwhile"""
+    while True:
+        try:
+            run_transcript_question_extraction()
+        except Exception as e:
+            print(f"Error in background question extraction: {e}")
+
+        with auto_extraction_lock:
+            if not auto_extraction["pending"]:
+                auto_extraction["running"] = False
+                return
+            auto_extraction["pending"] = False
+
+def _on_segment_for_detector(segment):
+    """Transcript listener: start a background extraction when a new question is detected"""
+    if not question_detector.observe(segment.get("text", "")):
+        return
+    with auto_extraction_lock:
+        if not auto_extraction["enabled"]:
+            return
+        print(f"Question detected at segment {segment.get('id')}: starting background extraction")
+        if auto_extraction["running"]:
+            # Re-run once the current extraction finishes so the result includes this question
+            auto_extraction["pending"] = True
+            return
+        auto_extraction["running"] = True
+
+    thread = threading.Thread(target=_auto_extraction_worker)
+    thread.daemon = True
+    thread.start()
+
+def _on_reset_for_detector():
+    """Transcript listener: forget detector state, cached extractions and the incremental structure on reset"""
+    question_detector.reset()
+    question_extraction_flight.clear()
+    incremental_extractor.reset()
+    with auto_extraction_lock:
+        latest_extraction_state["segment_id"] = -1
+
+# Replaying history would re-trigger extraction for old questions, so only new segments are observed
+add_transcription_listener(_on_segment_for_detector, _on_reset_for_detector, replay=False)
+
+@transcription_bp.route('/auto-extract', methods=['GET', 'POST'])
+def auto_extract_route():
+    """Get or set ({"enabled": bool}) background extraction when the question detector fires"""
+    if request.method == 'POST':
+        data = request.json or {}
+        if 'enabled' in data:
+            with auto_extraction_lock:
+                auto_extraction["enabled"] = bool(data['enabled'])
+            print(f"Automatic question extraction {'enabled' if data['enabled'] else 'disabled'}")
+    with auto_extraction_lock:
+        return jsonify({"status": "success", "enabled": auto_extraction["enabled"],
+                        "running": auto_extraction["running"]})
+
 @transcription_bp.route('/extract-question-from-transcript', methods=['POST'])
 def extract_question_from_transcript_route():
     """
     Extracts the latest question from the current transcript using Gemini.
+    Optional JSON body: {"token_budget": int} to override the transcript token budget,
+    {"incremental": false} to re-extract from the full transcript context.
+    Identical concurrent requests (and the background auto-extraction) share one Gemini call.
     """
     print("Received request for /api/extract-question-from-transcript")
-    full_transcript = ""
     try:
-        # 1. Get the full transcript text
-        with transcription_lock:
-            # Join text from all segments, assuming chronological order
-            full_transcript = "\n".join([t.get("text", "") for t in transcriptions if t.get("text")])
+        data = request.get_json(silent=True) or {}
+        raw_budget = data.get('token_budget') or 0
+        try:
+            if isinstance(raw_budget, bool) or not float(raw_budget).is_integer():
+                raise ValueError(raw_budget)
+            token_budget = int(float(raw_budget))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({"status": "error", "message": f"Invalid token_budget: {raw_budget!r} (expected an integer)"}), 400
+        incremental = data.get('incremental')
+        storage_key = "transcript_latest"
 
-        if not full_transcript:
+        # 1. Extract (or join / reuse an extraction of the same transcript context)
+        with transcription_lock:
+            transcript_is_empty = not transcriptions
+        if transcript_is_empty:
             print("Transcript is empty, cannot extract question.")
             return jsonify({"status": "error", "message": "Transcript is empty."}), 400
-
-        # 2. Call Gemini function
-        print(f"Sending transcript to Gemini for question extraction (length: {len(full_transcript)} chars)")
-        extracted_question = extract_question_from_transcript_with_gemini(full_transcript)
+        extracted_question, shared = run_transcript_question_extraction(token_budget, incremental)
+        if shared:
+            print("Reused in-flight or cached question extraction")
 
         if extracted_question:
-            # 3. Store the extracted question
-            # Using a fixed key for now, might need refinement later
-            storage_key = "transcript_latest"
-            store_extracted_question(storage_key, extracted_question)
-            print(f"Stored extracted question with key: {storage_key}")
-
-            # 4. Return success response
+            # 2. Return success response
             return jsonify({
                 "status": "success",
                 "extracted_question": extracted_question,
-                "storage_key": storage_key # Return the key used
+                "storage_key": storage_key, # Return the key used
+                "shared": shared
             })
         else:
             print("Failed to extract question from transcript via Gemini.")
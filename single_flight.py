@@ -0,0 +1,89 @@
+# single_flight.py
+# Coalesces identical concurrent calls: the first caller for a key runs the work,
+# everyone else arriving while it is in flight waits for and shares its result.
+# Completed results are kept for the most recent keys so repeat calls return instantly.
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Number of completed results kept for reuse
+DEFAULT_MAX_RESULTS = 8
+
+def content_key(text):
+    """Stable key for a piece of content (SHA-256 hex digest)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+class _Call:
+    """One in-flight call that waiters block on"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Single-flight call coalescing with a small cache of completed results.
+    Failed calls (exception or None result) are shared with the callers that
+    waited on them but not cached, so the next call retries.
+    """
+    def __init__(self, max_results=DEFAULT_MAX_RESULTS):
+        """Create an empty group that keeps up to max_results completed results"""
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._in_flight = {}            # key -> _Call
+        self._results = OrderedDict()   # key -> result, least recently used first
+        self._generation = 0            # bumped by clear() so stale calls don't repopulate the cache
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once per key, sharing the result with concurrent callers
+
+        Parameters:
+        - key: Identity of the work (e.g. content_key of the prompt input)
+        - fn: Function to call when there is no cached or in-flight result
+
+        Returns:
+        - (result, shared): the result, and True if it came from the cache or another caller's call
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key], True
+            call = self._in_flight.get(key)
+            if call is not None:
+                leader = False
+            else:
+                leader = True
+                call = _Call()
+                self._in_flight[key] = call
+                generation = self._generation
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if call.error is None and call.result is not None and generation == self._generation:
+                    self._results[key] = call.result
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result, False
+
+    def clear(self):
+        """Drop cached results (in-flight calls still finish for their current waiters)"""
+        with self._lock:
+            self._results.clear()
+            self._generation += 1
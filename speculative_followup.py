@@ -0,0 +1,180 @@
+# speculative_followup.py
+# Speculative follow-up generation.
+# Watches transcript segments spoken after the current solution; when they look like a
+# follow-up question, the follow-up answer is generated in the background so that a
+# later button press can return it immediately, provided the request resolves exactly the same
+# problem, code and transcript.
+import hashlib
+import threading
+
+from question_detector import QuestionDetector
+
+# A ready result is still used if at most this many segments arrived after it was started
+DEFAULT_MAX_STALE_SEGMENTS = 3
+
+def context_hash(problem, code, transcript):
+    """Fingerprint of the exact (problem, code, transcript) context a follow-up is generated from"""
+    digest = hashlib.sha256()
+    for part in (problem, code, transcript):
+        data = (part or "").encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))  # length prefix keeps the parts unambiguous
+        digest.update(data)
+    return digest.hexdigest()
+
+class SpeculativeFollowups:
+    """
+    Background follow-up pre-generation for the current solution key.
+    One speculation runs at a time; a newer detection replaces an older ready result.
+    """
+    def __init__(self, context_fn, generate_fn, detector=None,
+                 max_stale_segments=DEFAULT_MAX_STALE_SEGMENTS, enabled=False):
+        """
+        Parameters:
+        - context_fn: Callable (key) -> (problem, code, transcript), the same context a button press would use
+        - generate_fn: Callable (key, problem, code, transcript) -> (kind, result); kind names the
+          follow-up route the result answers (e.g. "claude" or "gemini-react")
+        - detector: QuestionDetector used on new segments (a fresh one by default)
+        - max_stale_segments: Segments allowed after the speculation started for it to still match
+        - enabled: Whether speculation starts enabled (opt-in)
+        """
+        self.context_fn = context_fn
+        self.generate_fn = generate_fn
+        self.detector = detector or QuestionDetector()
+        self.max_stale_segments = max_stale_segments
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._key = None
+        self._entry = None          # current speculation (running or finished)
+        self._stats = {"started": 0, "hits": 0, "misses": 0}
+
+    def set_enabled(self, enabled):
+        """Turn speculation on or off; turning it off drops any pending result"""
+        with self._lock:
+            self.enabled = bool(enabled)
+            if not self.enabled:
+                self._entry = None
+
+    def status(self):
+        """Enabled flag, watched key, state of the current speculation and hit counters"""
+        with self._lock:
+            entry = self._entry
+            return {
+                "enabled": self.enabled,
+                "key": self._key,
+                "speculation": None if entry is None else {
+                    "kind": entry["kind"],
+                    "segment_id": entry["segment_id"],
+                    "ready": entry["done"].is_set() and entry["result"] is not None
+                },
+                **self._stats
+            }
+
+    def reset(self):
+        """Forget the watched key and any speculation (transcript or interview reset)"""
+        with self._lock:
+            self._key = None
+            self._entry = None
+        self.detector.reset()
+
+    def observe(self, segment, current_key):
+        """
+        Feed a new transcript segment; may start a background speculation
+
+        Parameters:
+        - segment: Segment dict with id and text
+        - current_key: Key of the most recent solution (None if there is none yet)
+        """
+        with self._lock:
+            if current_key != self._key:
+                # New solution: only segments spoken after it count as follow-ups
+                self._key = current_key
+                self._entry = None
+                self.detector.reset()
+            if not self.enabled or current_key is None:
+                return
+            if not self.detector.observe(segment.get("text", "")):
+                return
+            if self._entry is not None and not self._entry["done"].is_set():
+                # Already generating; the button-press staleness check decides whether it still fits
+                return
+            entry = {"key": current_key, "kind": None, "context_hash": None,
+                     "segment_id": segment.get("id", 0), "result": None, "done": threading.Event(),
+                     "claimed": False, "waiters": []}
+            self._entry = entry
+            self._stats["started"] += 1
+
+        print(f"Possible follow-up at segment {entry['segment_id']}: generating speculative answer for {current_key}")
+        thread = threading.Thread(target=self._run, args=(entry,))
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, entry):
+        """Background task: generate the follow-up for entry, then hand it to waiting requests"""
+        try:
+            problem, code, transcript = self.context_fn(entry["key"])
+            if problem and code and transcript:
+                entry["context_hash"] = context_hash(problem, code, transcript)
+                entry["kind"], entry["result"] = self.generate_fn(entry["key"], problem, code, transcript)
+        except Exception as e:
+            print(f"Error generating speculative follow-up: {e}")
+        finally:
+            with self._lock:
+                entry["done"].set()
+                waiters, entry["waiters"] = entry["waiters"], []
+            for kind, request_hash, on_result in waiters:
+                result = self._claim(entry, kind, request_hash)
+                try:
+                    on_result(result)
+                except Exception as e:
+                    print(f"Error handing speculative follow-up to a request: {e}")
+
+    def _claim(self, entry, kind, request_hash):
+        """Claim a finished entry for one request; returns its result, or None if it doesn't match"""
+        with self._lock:
+            matches = (not entry["claimed"] and entry["result"] is not None and
+                       entry["kind"] == kind and entry["context_hash"] == request_hash)
+            if matches:
+                entry["claimed"] = True  # each speculation answers one request
+                if self._entry is entry:
+                    self._entry = None
+                self._stats["hits"] += 1
+                return entry["result"]
+            self._stats["misses"] += 1
+            return None
+
+    def take(self, key, kind, context, last_segment_id, on_result=None):
+        """
+        Claim the speculative result for a button press if it was generated from exactly the
+        context the request resolved (same problem, code and transcript).
+        Never blocks: a matching speculation that is still running is joined by passing its
+        result to on_result when it finishes.
+
+        Parameters:
+        - key: Solution key of the request
+        - kind: Follow-up kind the route produces
+        - context: (problem, code, transcript) the request would generate from
+        - last_segment_id: Newest transcript segment ID at the time of the request
+        - on_result: Optional callable (result or None) called from the speculation thread
+          when a joined speculation finishes; None means it did not match and the request
+          has to generate the follow-up itself
+
+        Returns:
+        - (result, pending): the result if a finished speculation matches; pending is True
+          if the request joined a running speculation (on_result will be called)
+        """
+        request_hash = context_hash(*context)
+        with self._lock:
+            entry = self._entry
+            if (not self.enabled or entry is None or entry["key"] != key or
+                    last_segment_id - entry["segment_id"] > self.max_stale_segments):
+                entry = None
+            elif not entry["done"].is_set() and on_result is not None:
+                entry["waiters"].append((kind, request_hash, on_result))
+                return None, True
+        if entry is not None and entry["done"].is_set():
+            result = self._claim(entry, kind, request_hash)
+            return result, False
+        with self._lock:
+            self._stats["misses"] += 1
+        return None, False
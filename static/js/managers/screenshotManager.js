@@ -13,6 +13,9 @@ export class ScreenshotManager {
    */
   constructor(elements) {
     this.elements = elements;
+    // Polling interval and limit for background extraction jobs
+    this.EXTRACTION_POLL_MS = 300;
+    this.EXTRACTION_TIMEOUT_MS = 120000;
     this.setupEventListeners();
     this.setupStateSubscriptions();
   }
@@ -66,6 +69,30 @@ export class ScreenshotManager {
     });
   }
 
+  /**
+   * Wait for the background extraction started by a capture route
+   * @param {Object} data - Capture response (job_id, extracted_question)
+   * @returns {Promise<string|null>} The extracted question, or null
+   */
+  async waitForExtraction(data) {
+    if (!data.job_id) {
+      return data.extracted_question || null;
+    }
+    const deadline = Date.now() + this.EXTRACTION_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      const response = await apiRequest(`/api/jobs/${data.job_id}`);
+      const job = response.job;
+      if (job && job.state === "done") {
+        return job.result ? job.result.extracted_question : null;
+      }
+      if (!job || job.state === "error") {
+        return null;
+      }
+      await new Promise((resolve) => setTimeout(resolve, this.EXTRACTION_POLL_MS));
+    }
+    return null;
+  }
+
   /**
    * Take a screenshot and extract with Claude
    */
@@ -104,6 +131,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         // If it's a coding question and we have an extracted question
         if (questionType === "coding") {
           if (data.extracted_question) {
@@ -177,6 +207,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         // If it's a coding question and we have an extracted question
         if (questionType === "coding") {
           if (data.extracted_question) {
@@ -251,6 +284,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         if (data.extracted_question) {
           // Display the extracted question
           this.elements.extractedQuestionContainer.innerHTML = `<p>${data.extracted_question}</p>`;
@@ -327,6 +363,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         if (data.extracted_question) {
           // Display the extracted question
           this.elements.extractedQuestionContainer.innerHTML = `<p>${data.extracted_question}</p>`;
@@ -408,6 +447,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         if (data.extracted_question) {
           // Display the extracted question
           this.elements.extractedQuestionContainer.innerHTML = `<p>${data.extracted_question}</p>`;
@@ -489,6 +531,9 @@ export class ScreenshotManager {
         ];
         appState.update("screenshots.items", screenshots);
 
+        // The route returns once the screenshot is captured; wait for the extraction job
+        data.extracted_question = await this.waitForExtraction(data);
+
         // If it's a coding question and we have an extracted question
         if (questionType === "coding") {
           if (data.extracted_question) {
@@ -603,9 +648,9 @@ export class ScreenshotManager {
         .map(
           (screenshot) => `
             <div class="screenshot-item" data-path="${screenshot.path}">
-              <img src="/screenshots/${screenshot.path
+              <img src="/screenshots/thumbnails/${screenshot.path
                 .split("/")
-                .pop()}" alt="Screenshot">
+                .pop()}" alt="Screenshot" loading="lazy">
               <div class="screenshot-info">
                 <div>${screenshot.timestamp}</div>
                 <div>${screenshot.question_type}</div>
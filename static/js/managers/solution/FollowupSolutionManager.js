@@ -1,5 +1,5 @@
 import { appState } from "../../state/AppState.js";
-import { apiRequest } from "../../utils/utils.js";
+import { apiRequest, streamGeneratedText } from "../../utils/utils.js";
 
 /**
  * Manages fetching and handling follow-up solutions.
@@ -13,6 +13,8 @@ export class FollowupSolutionManager {
   constructor(uiStateManager, pollingManager) {
     this.uiStateManager = uiStateManager;
     this.pollingManager = pollingManager;
+    // Seconds of recent transcript the server includes as follow-up context
+    this.FOLLOWUP_TRANSCRIPT_SECONDS = 120;
   }
 
   /**
@@ -96,7 +98,24 @@ export class FollowupSolutionManager {
     );
   }
 
-  // --- Private Helper Method ---
+  // --- Private Helper Methods ---
+
+  /**
+   * Element that shows a follow-up's streamed text.
+   * @param {string} providerName - Name passed to _fetchFollowupSolution.
+   * @returns {HTMLElement|null}
+   * @private
+   */
+  _streamTarget(providerName) {
+    if (providerName === "standard") {
+      return document.getElementById("followup-explanation-tab");
+    }
+    if (providerName === "Gemini") {
+      return document.getElementById("gemini-followup-explanation-tab");
+    }
+    // Claude React and Gemini React share the React follow-up area
+    return this.uiStateManager.elements.followupReactContent;
+  }
 
   /**
    * Generic method to fetch a follow-up solution.
@@ -116,7 +135,6 @@ export class FollowupSolutionManager {
     startPollingFn,
     followupId = null // Add followupId parameter
   ) {
-    // Get the current extracted question (could be coding or React)
     // Get the current extracted question (could be coding or React)
     const currentExtractedQuestion = appState.get(
       "question.currentExtractedQuestion"
@@ -130,21 +148,18 @@ export class FollowupSolutionManager {
     // Determine the key to use for this follow-up context
     const keyToUse = currentScreenshotPath || currentStorageKey;
 
-    // Follow-up needs the *current* solution's code.
-    // Check both standard solution and React solution from the combined object.
+    // The server already holds the question and the solution for this key,
+    // so only check that they exist before sending references
     const currentSolutionData = appState.get("solution.currentSolution");
-    const currentStandardSolutionCode = currentSolutionData?.solution?.code;
-    const currentReactSolutionCode = currentSolutionData?.react_solution; // Raw React code
-
-    // Prioritize React solution code if available, otherwise use standard code
-    const currentSolutionCode =
-      currentReactSolutionCode || currentStandardSolutionCode;
+    const hasCurrentSolution =
+      !!currentSolutionData?.react_solution ||
+      !!currentSolutionData?.solution?.code;
 
     // Use keyToUse in the validation check
     if (
       !currentExtractedQuestion ||
       !keyToUse || // Check the determined key
-      !currentSolutionCode
+      !hasCurrentSolution
     ) {
       console.error(
         `Cannot fetch ${providerName} follow-up: Missing question, identifying key (${keyToUse}), or current solution code.`
@@ -160,38 +175,16 @@ export class FollowupSolutionManager {
     showLoadingFn();
 
     try {
-      console.log(
-        `Getting recent transcriptions for ${providerName} follow-up solution`
-      );
-      const transcriptData = await apiRequest("/api/transcriptions/recent");
-
-      if (!transcriptData || transcriptData.length === 0) {
-        console.error("No recent transcriptions available for follow-up.");
-        appState.update("solution.isGenerating", false);
-        showErrorFn(
-          "No recent transcriptions found. Please ensure there was recent conversation."
-        );
-        return;
-      }
-
-      console.log(`Found ${transcriptData.length} recent transcriptions.`);
-      const transcriptText = transcriptData.map((item) => item.text).join("\n");
-      console.log(
-        `Combined transcript length: ${transcriptText.length} characters`
-      );
-
       console.log(`Sending ${providerName} follow-up solution request`);
+      // Send references only; the server assembles problem, code and transcript itself
       const data = await apiRequest(endpoint, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
         },
         body: JSON.stringify({
-          // Send both the extracted question and the current solution code
-          react_question: currentExtractedQuestion,
-          current_solution: currentSolutionCode,
-          transcript: transcriptText,
-          storage_key: keyToUse, // Send the determined key
+          storage_key: keyToUse, // Key of the question and its current solution
+          transcript_seconds: this.FOLLOWUP_TRANSCRIPT_SECONDS, // Recent conversation window
           followup_id: followupId, // Include the unique ID (if applicable)
         }),
       });
@@ -200,6 +193,8 @@ export class FollowupSolutionManager {
         console.log(
           `${providerName} follow-up solution request submitted successfully.`
         );
+        // Show the text as it is generated until the parsed follow-up arrives
+        streamGeneratedText(data.stream_id, this._streamTarget(providerName));
         // Start polling, passing the keyToUse if the polling function needs it
         // (The binding in getReactFollowupSolutionWithGemini handles passing the key)
         startPollingFn(keyToUse); // Pass keyToUse to the bound polling function starter
@@ -1,5 +1,5 @@
 import { appState } from "../../state/AppState.js";
-import { apiRequest } from "../../utils/utils.js";
+import { apiRequest, streamGeneratedText } from "../../utils/utils.js";
 
 /**
  * Manages fetching solutions from various API endpoints.
@@ -115,6 +115,8 @@ export class SolutionFetchManager {
 
       if (data.status === "success") {
         console.log(`${providerName} solution request submitted successfully.`);
+        // Show the text as it is generated until the parsed solution arrives
+        streamGeneratedText(data.stream_id, this.uiStateManager.elements.explanationTab);
         // Start polling for the solution using the same key we sent
         this.pollingManager.pollForSolution(keyToSend);
       } else {
@@ -1,6 +1,6 @@
 import { appState } from "../../state/AppState.js";
 import { StateEvents } from "../../state/StateEvents.js";
-import { apiRequest } from "../../utils/utils.js"; // Import apiRequest
+import { apiRequest, streamGeneratedText } from "../../utils/utils.js"; // Import apiRequest
 import { SolutionUIStateManager } from "./SolutionUIStateManager.js";
 import { SolutionPollingManager } from "./SolutionPollingManager.js";
 import { SolutionDisplayManager } from "./SolutionDisplayManager.js";
@@ -188,10 +188,22 @@ export class SolutionManager {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ question: currentQuestion }),
+        body: JSON.stringify({ question: currentQuestion, stream: true }),
       });
 
-      if (data.status === "success" && data.solution_markdown) {
+      if (data.status === "success" && data.stream_id) {
+        // The markdown arrives token by token
+        streamGeneratedText(
+          data.stream_id,
+          this.elements.designSolutionContent,
+          (text) => {
+            if (!text) {
+              this.elements.designSolutionContent.innerHTML =
+                "<p><em>Error generating design solution. Please check logs.</em></p>";
+            }
+          }
+        );
+      } else if (data.status === "success" && data.solution_markdown) {
         console.log("Received Claude design solution.");
         // Display the raw Markdown for now. Needs a Markdown renderer for proper display.
         // Using innerHTML is a security risk if the markdown isn't sanitized.
@@ -13,7 +13,113 @@ export class TranscriptionManager {
    */
   constructor(elements) {
     this.elements = elements;
+    // Segments received over the SSE stream, in order
+    this.segments = [];
+    this.eventSource = null;
+    this.isStreaming = false;
     this.setupStateSubscriptions();
+    this.connectStream();
+  }
+
+  /**
+   * Subscribe to the transcript SSE stream.
+   * EventSource reconnects on its own and sends Last-Event-ID, so the server
+   * resumes from the last segment we rendered. Polling is used only while the
+   * stream is down.
+   */
+  connectStream() {
+    if (typeof EventSource === "undefined") {
+      return;
+    }
+
+    this.eventSource = new EventSource("/api/transcriptions/stream");
+
+    this.eventSource.onopen = () => {
+      this.isStreaming = true;
+    };
+
+    this.eventSource.onerror = () => {
+      // Fall back to polling until EventSource reconnects
+      this.isStreaming = false;
+    };
+
+    this.eventSource.addEventListener("segment", (event) => {
+      const segment = JSON.parse(event.data);
+      this.handleStreamedSegment(segment);
+    });
+
+    this.eventSource.addEventListener("reset", () => {
+      this.segments = [];
+      appState.update("recording.transcriptionCount", 0);
+      this.elements.transcriptionHistory.innerHTML = "";
+    });
+  }
+
+  /**
+   * Render a single segment received from the stream
+   * @param {Object} segment - The segment ({id, text, timestamp})
+   */
+  handleStreamedSegment(segment) {
+    const lastSegment = this.segments[this.segments.length - 1];
+    if (lastSegment && segment.id <= lastSegment.id) {
+      // Already rendered (e.g. replayed after a reconnect)
+      return;
+    }
+
+    if (this.segments.length === 0) {
+      // Drop the "No transcriptions yet" placeholder
+      this.elements.transcriptionHistory.innerHTML = "";
+    }
+    this.segments.push(segment);
+
+    this.renderLatestTranscription(segment);
+
+    this.elements.transcriptionHistory.insertAdjacentHTML(
+      "beforeend",
+      this.renderHistoryItem(segment)
+    );
+    this.elements.transcriptionHistory.scrollTop =
+      this.elements.transcriptionHistory.scrollHeight;
+
+    appState.update("recording.transcriptionCount", this.segments.length);
+  }
+
+  /**
+   * Build the HTML for one history entry
+   * @param {Object} item - The transcription item
+   * @returns {string} HTML string
+   */
+  renderHistoryItem(item) {
+    return `
+                <div class="transcription-item">
+                  <p class="transcription-text">${item.text}</p>
+                  <p class="transcription-timestamp">Time: ${item.timestamp}</p>
+                </div>
+              `;
+  }
+
+  /**
+   * Show a transcription in the latest-transcription boxes
+   * @param {Object} data - The transcription item
+   */
+  renderLatestTranscription(data) {
+    // Toggle between interviewer and interviewee for demo purposes
+    // In a real implementation, you would use speaker diarization or manual selection
+    const currentSpeaker = appState.get("recording.currentSpeaker");
+    const newSpeaker =
+      currentSpeaker === "interviewer" ? "interviewee" : "interviewer";
+    appState.update("recording.currentSpeaker", newSpeaker);
+
+    const transcriptionHTML = `
+          <p class="transcription-text">${data.text}</p>
+          <p class="transcription-timestamp">Time: ${data.timestamp}</p>
+        `;
+
+    if (newSpeaker === "interviewer") {
+      this.elements.interviewerTranscription.innerHTML = transcriptionHTML;
+    } else {
+      this.elements.latestTranscription.innerHTML = transcriptionHTML;
+    }
   }
 
   /**
@@ -39,23 +145,7 @@ export class TranscriptionManager {
       const data = await apiRequest("/api/transcriptions/latest");
 
       if (data.text) {
-        // Toggle between interviewer and interviewee for demo purposes
-        // In a real implementation, you would use speaker diarization or manual selection
-        const currentSpeaker = appState.get("recording.currentSpeaker");
-        const newSpeaker =
-          currentSpeaker === "interviewer" ? "interviewee" : "interviewer";
-        appState.update("recording.currentSpeaker", newSpeaker);
-
-        const transcriptionHTML = `
-          <p class="transcription-text">${data.text}</p>
-          <p class="transcription-timestamp">Time: ${data.timestamp}</p>
-        `;
-
-        if (newSpeaker === "interviewer") {
-          this.elements.interviewerTranscription.innerHTML = transcriptionHTML;
-        } else {
-          this.elements.latestTranscription.innerHTML = transcriptionHTML;
-        }
+        this.renderLatestTranscription(data);
       }
     } catch (error) {
       console.error("Error fetching latest transcription:", error);
@@ -78,14 +168,7 @@ export class TranscriptionManager {
 
           // Update the history display
           const historyHTML = data
-            .map(
-              (item) => `
-                <div class="transcription-item">
-                  <p class="transcription-text">${item.text}</p>
-                  <p class="transcription-timestamp">Time: ${item.timestamp}</p>
-                </div>
-              `
-            )
+            .map((item) => this.renderHistoryItem(item))
             .join("");
 
           this.elements.transcriptionHistory.innerHTML = historyHTML;
@@ -130,9 +213,12 @@ export class TranscriptionManager {
   }
 
   /**
-   * Poll for updates
+   * Poll for updates (only while the SSE stream is unavailable)
    */
   poll() {
+    if (this.isStreaming) {
+      return;
+    }
     this.updateLatestTranscription();
     this.updateTranscriptionHistory();
   }
@@ -115,3 +115,59 @@ export async function apiRequest(url, options = {}) {
     throw error;
   }
 }
+
+/**
+ * Render a generation's text into an element as it streams from the server (SSE).
+ * The final, parsed result still arrives through the usual polling and replaces it.
+ * @param {string} streamId - Stream ID returned by a solution request
+ * @param {HTMLElement} element - Element to render the streamed text into
+ * @param {Function} [onDone] - Called with the full text and timings ({ttft_ms, total_ms}) when done
+ * @returns {EventSource|null} The open event source, or null without a stream or element
+ */
+export function streamGeneratedText(streamId, element, onDone = null) {
+  if (!streamId || !element) {
+    return null;
+  }
+  const source = new EventSource(`/api/solution/stream/${streamId}`);
+  const pre = document.createElement("pre");
+  pre.style.whiteSpace = "pre-wrap";
+  pre.style.wordWrap = "break-word";
+  let text = "";
+  let finished = false;
+
+  source.addEventListener("token", (event) => {
+    if (text && !element.contains(pre)) {
+      // The final result has already been rendered over the streamed text
+      finished = true;
+      source.close();
+      return;
+    }
+    if (!text) {
+      element.innerHTML = ""; // Replace the loading message on the first token
+      element.appendChild(pre);
+    }
+    text += JSON.parse(event.data).text;
+    pre.textContent = text;
+  });
+
+  source.addEventListener("done", (event) => {
+    finished = true;
+    source.close();
+    const timings = JSON.parse(event.data);
+    console.log(
+      `${timings.provider} stream done: first token ${timings.ttft_ms} ms, total ${timings.total_ms} ms`
+    );
+    if (onDone) {
+      onDone(text, timings);
+    }
+  });
+
+  source.onerror = () => {
+    // EventSource reconnects (resuming from the last token) unless the stream is gone
+    if (finished || source.readyState === EventSource.CLOSED) {
+      source.close();
+    }
+  };
+
+  return source;
+}
@@ -0,0 +1,444 @@
+# Tests for provider_uploads.UploadCache against a local stand-in for a provider file API.
+# The stand-in accepts uploads (POST /files -> {"id"}), answers requests that reference a
+# file ID or carry the image inline (POST /generate) and can forget files, the way a
+# provider does when they expire. It also serves the OpenAI (/v1/...) and Gemini
+# (discovery document, resumable upload, /v1beta/...) endpoints the SDKs call, so the
+# upload paths in openai_api and gemini_api.common run against it unchanged.
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+import provider_uploads
+from provider_uploads import UploadCache, is_rejected_reference
+
+IMAGE = b"\x89PNG" + bytes(range(256)) * 64
+OTHER_IMAGE = b"\x89PNG" + bytes(reversed(range(256))) * 64
+
+class StandInProvider:
+    """Local HTTP server imitating a provider's file and generation endpoints"""
+    def __init__(self, upload_delay=0.0):
+        self.upload_delay = upload_delay
+        self.files = {}        # file ID -> bytes
+        self.uploads = 0
+        self.file_requests = 0
+        self.inline_requests = 0
+        self.bad_request = None  # error message returned for every generation request when set
+        self._lock = threading.Lock()
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/$discovery/rest":
+                    self._reply(200, provider.gemini_discovery_document())
+                elif path.startswith("/v1beta/files/"):
+                    file_id = path[len("/v1beta/"):]
+                    if file_id not in provider.files:
+                        self._gemini_file_error(file_id)
+                        return
+                    self._reply(200, provider.gemini_file(file_id))
+                else:
+                    self._reply(404, {"error": "unknown endpoint"})
+
+            def do_PUT(self):
+                path = urlparse(self.path).path
+                if not path.startswith("/upload-session/"):
+                    self._reply(404, {"error": "unknown endpoint"})
+                    return
+                file_id = provider.store_upload(self._body(), prefix="files/")
+                self._reply(200, {"file": provider.gemini_file(file_id)})
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                body = self._body()
+                if path == "/files":
+                    file_id = provider.store_upload(body)
+                    self._reply(200, {"id": file_id})
+                elif path == "/generate":
+                    request = json.loads(body)
+                    if "file_id" in request and request["file_id"] not in provider.files:
+                        self._reply(404, {"error": "file not found"})
+                        return
+                    self._reply(200, {"text": provider.answer("file" if "file_id" in request else "inline")})
+                elif path == "/v1/files":
+                    file_id = provider.store_upload(body)
+                    self._reply(200, {
+                        "id": file_id, "object": "file", "bytes": len(body), "created_at": int(time.time()),
+                        "filename": "screenshot", "purpose": "vision", "status": "processed"
+                    })
+                elif path == "/v1/responses":
+                    self._openai_response(json.loads(body))
+                elif path == "/v1/chat/completions":
+                    self._openai_chat_completion()
+                elif path == "/upload/v1beta/files":
+                    # Start of a resumable Gemini upload: the bytes follow with PUT
+                    self.send_response(200)
+                    self.send_header("Location", f"{provider.url}/upload-session/{provider.uploads + 1}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                elif path.startswith("/v1beta/models/") and path.endswith(":generateContent"):
+                    self._gemini_generate(json.loads(body))
+                else:
+                    self._reply(404, {"error": "unknown endpoint"})
+
+            def _openai_response(self, request):
+                if provider.bad_request:
+                    self._openai_error(400, provider.bad_request)
+                    return
+                file_ids = [part["file_id"] for message in request["input"] for part in message["content"]
+                            if part.get("type") == "input_image" and "file_id" in part]
+                for file_id in file_ids:
+                    if file_id not in provider.files:
+                        self._openai_error(404, f"No such File object: {file_id}")
+                        return
+                self._reply(200, {
+                    "id": "resp_1", "object": "response", "created_at": int(time.time()), "status": "completed",
+                    "model": "gpt-4o-mini", "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+                    "output": [{
+                        "type": "message", "id": "msg_1", "role": "assistant", "status": "completed",
+                        "content": [{"type": "output_text", "text": provider.answer("file"), "annotations": []}]
+                    }]
+                })
+
+            def _openai_chat_completion(self):
+                if provider.bad_request:
+                    self._openai_error(400, provider.bad_request)
+                    return
+                self._reply(200, {
+                    "id": "chatcmpl-1", "object": "chat.completion", "created": int(time.time()),
+                    "model": "gpt-4o-mini",
+                    "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": provider.answer("inline")}
+                    }]
+                })
+
+            def _openai_error(self, status, message):
+                self._reply(status, {"error": {"message": message, "type": "invalid_request_error",
+                                               "param": None, "code": None}})
+
+            def _gemini_generate(self, request):
+                if provider.bad_request:
+                    self._reply(400, {"error": {"code": 400, "message": provider.bad_request,
+                                                "status": "INVALID_ARGUMENT"}})
+                    return
+                parts = [part for content in request["contents"] for part in content["parts"]]
+                source = "inline"
+                for part in parts:
+                    file_data = part.get("fileData") or part.get("file_data")
+                    if file_data:
+                        file_id = file_data.get("fileUri", file_data.get("file_uri")).rsplit("/", 1)[-1]
+                        if f"files/{file_id}" not in provider.files:
+                            self._gemini_file_error(file_id)
+                            return
+                        source = "file"
+                self._reply(200, {"candidates": [{
+                    "content": {"role": "model", "parts": [{"text": provider.answer(source)}]},
+                    "finishReason": "STOP", "index": 0
+                }]})
+
+            def _gemini_file_error(self, file_id):
+                self._reply(403, {"error": {
+                    "code": 403, "status": "PERMISSION_DENIED",
+                    "message": f"You do not have permission to access the File {file_id} or it may not exist."
+                }})
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- Server side ---
+
+    def store_upload(self, data, prefix="file-"):
+        """Keep uploaded bytes and return the new file ID (OpenAI style, or "files/N" for Gemini)"""
+        time.sleep(self.upload_delay)
+        with self._lock:
+            self.uploads += 1
+            file_id = f"{prefix}{self.uploads}"
+            self.files[file_id] = data
+            return file_id
+
+    def answer(self, source):
+        """Generation result, counting whether the image came by reference or inline"""
+        with self._lock:
+            if source == "file":
+                self.file_requests += 1
+            else:
+                self.inline_requests += 1
+        return f"answer from {source}"
+
+    def gemini_file(self, file_id):
+        data = self.files[file_id]
+        return {"name": file_id, "mimeType": "image/webp", "sizeBytes": str(len(data)),
+                "uri": f"{self.url}/v1beta/{file_id}", "state": "ACTIVE"}
+
+    def gemini_discovery_document(self):
+        """The part of the Gemini discovery document the File API upload uses"""
+        return {
+            "kind": "discovery#restDescription", "discoveryVersion": "v1", "protocol": "rest",
+            "id": "generativelanguage:v1beta", "name": "generativelanguage", "version": "v1beta",
+            "rootUrl": f"{self.url}/", "servicePath": "", "baseUrl": f"{self.url}/", "batchPath": "batch",
+            "parameters": {"key": {"type": "string", "location": "query"},
+                           "alt": {"type": "string", "location": "query", "default": "json"}},
+            "schemas": {
+                "CreateFileRequest": {"id": "CreateFileRequest", "type": "object",
+                                      "properties": {"file": {"type": "object"}}},
+                "CreateFileResponse": {"id": "CreateFileResponse", "type": "object",
+                                       "properties": {"file": {"type": "object"}}}
+            },
+            "resources": {"media": {"methods": {"upload": {
+                "id": "generativelanguage.media.upload", "path": "v1beta/files", "flatPath": "v1beta/files",
+                "httpMethod": "POST", "parameters": {}, "parameterOrder": [],
+                "request": {"$ref": "CreateFileRequest"}, "response": {"$ref": "CreateFileResponse"},
+                "supportsMediaUpload": True,
+                "mediaUpload": {"accept": ["*/*"], "protocols": {
+                    "simple": {"multipart": True, "path": "/upload/v1beta/files"},
+                    "resumable": {"multipart": True, "path": "/resumable/upload/v1beta/files"}
+                }}
+            }}}}
+        }
+
+    # --- Client side (what the provider SDK would do) ---
+
+    def upload(self, data, mime_type):
+        request = urllib.request.Request(f"{self.url}/files", data=data, headers={"Content-Type": mime_type})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read())["id"]
+
+    def generate(self, payload):
+        request = urllib.request.Request(f"{self.url}/generate", data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())["text"]
+        except urllib.error.HTTPError as e:
+            e.status_code = e.code
+            e.msg = json.loads(e.read())["error"]
+            raise
+
+@pytest.fixture
+def provider():
+    stand_in = StandInProvider()
+    yield stand_in
+    stand_in.close()
+
+@pytest.fixture(autouse=True)
+def upload_everything():
+    """Upload regardless of size so small test images take the upload path"""
+    original = provider_uploads.UPLOAD_MIN_BYTES, provider_uploads.PROVIDER_UPLOADS
+    provider_uploads.UPLOAD_MIN_BYTES, provider_uploads.PROVIDER_UPLOADS = 0, True
+    yield
+    provider_uploads.UPLOAD_MIN_BYTES, provider_uploads.PROVIDER_UPLOADS = original
+
+@pytest.fixture
+def screenshot(tmp_path):
+    """A screenshot with some code on it"""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    image = Image.new("RGB", (800, 400), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(10):
+        draw.text((20, 20 + 30 * line), f"def two_sum(nums, target):  # line {line}", fill="black")
+    path = tmp_path / "screenshot.png"
+    image.save(path)
+    return str(path)
+
+def test_one_upload_per_content_hash(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+    cache.get(IMAGE, "image/png")
+    cache.get(IMAGE, "image/png")
+    cache.get(OTHER_IMAGE, "image/png")
+    assert provider.uploads == 2
+    assert cache.stats()["uploads"] == 2
+
+def test_cached_id_is_reused(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+    first = cache.get(IMAGE, "image/png")
+    second = cache.get(IMAGE, "image/png")
+    assert first == second == "file-1"
+    assert cache.stats()["hits"] == 1
+    assert provider.generate({"file_id": second}) == "answer from file"
+
+def test_reference_expires_after_ttl(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=0.2, name="stand-in")
+    first = cache.get(IMAGE, "image/png")
+    time.sleep(0.3)
+    second = cache.get(IMAGE, "image/png")
+    assert first != second
+    assert provider.uploads == 2
+    assert cache.stats()["hits"] == 0
+
+def test_concurrent_callers_share_one_upload():
+    provider = StandInProvider(upload_delay=0.3)
+    try:
+        cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            references = list(executor.map(lambda _: cache.get(IMAGE, "image/png"), range(8)))
+        assert set(references) == {"file-1"}
+        assert provider.uploads == 1
+    finally:
+        provider.close()
+
+def test_small_images_are_not_uploaded(provider):
+    provider_uploads.UPLOAD_MIN_BYTES = len(IMAGE) + 1
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+    assert cache.get(IMAGE, "image/png") is None
+    assert provider.uploads == 0
+
+def test_rejected_reference_is_invalidated_and_retried_inline(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+
+    def with_reference(file_id):
+        return provider.generate({"file_id": file_id})
+
+    def inline():
+        return provider.generate({"inline": len(IMAGE)})
+
+    assert cache.call_with_reference(IMAGE, "image/png", with_reference, inline) == "answer from file"
+    provider.files.clear()  # the provider deleted the file before our TTL ran out
+    assert cache.call_with_reference(IMAGE, "image/png", with_reference, inline) == "answer from inline"
+    assert provider.inline_requests == 1
+    # The stale ID was dropped, so the next call uploads again
+    assert cache.call_with_reference(IMAGE, "image/png", with_reference, inline) == "answer from file"
+    assert provider.uploads == 2
+
+def test_other_errors_are_not_retried_inline(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+
+    def with_reference(file_id):
+        raise TimeoutError("provider timed out")
+
+    with pytest.raises(TimeoutError):
+        cache.call_with_reference(IMAGE, "image/png", with_reference, lambda: "inline")
+    assert cache.get(IMAGE, "image/png") == "file-1"
+
+def test_bad_request_is_not_taken_for_a_rejected_reference(provider):
+    cache = UploadCache(provider.upload, ttl_seconds=60, name="stand-in")
+
+    def with_reference(file_id):
+        error = ValueError("Invalid value for 'max_output_tokens': must be at least 16")
+        error.status_code = 400
+        raise error
+
+    with pytest.raises(ValueError):
+        cache.call_with_reference(IMAGE, "image/png", with_reference, lambda: "inline")
+    assert cache.stats()["references"] == 1
+
+def test_rejected_reference_messages():
+    def error(status, message):
+        e = Exception(message)
+        e.status_code = status
+        return e
+
+    assert is_rejected_reference(error(404, "Error code: 404 - No such File object: file-abc"))
+    assert is_rejected_reference(error(400, "The file file-abc has expired"))
+    assert is_rejected_reference(error(403, "You do not have permission to access the File abc or it may not exist."))
+    assert not is_rejected_reference(error(400, "Invalid image: could not decode"))
+    assert not is_rejected_reference(error(500, "file not found"))
+
+# --- OpenAI SDK against the stand-in ---
+
+@pytest.fixture
+def openai_client(provider, monkeypatch):
+    openai = pytest.importorskip("openai")
+    import openai_api
+    monkeypatch.setattr(openai_api, "openai_uploads",
+                        UploadCache(openai_api._upload_to_openai, 60, name="OpenAI"))
+    return openai.OpenAI(api_key="test", base_url=f"{provider.url}/v1", max_retries=0)
+
+def test_openai_upload_returns_file_id(provider, openai_client):
+    import openai_api
+    file_id = openai_api._upload_to_openai(IMAGE, "image/png", openai_client)
+    assert file_id == "file-1"
+    assert IMAGE in provider.files[file_id]  # multipart body carrying the image bytes
+
+def test_openai_request_references_uploaded_file(provider, openai_client, screenshot):
+    import openai_api
+    for _ in range(2):
+        assert openai_api._complete_with_image(openai_client, "Extract", screenshot, 100) == "answer from file"
+    assert provider.uploads == 1
+    assert provider.file_requests == 2
+    assert provider.inline_requests == 0
+
+def test_openai_deleted_file_is_retried_inline(provider, openai_client, screenshot):
+    import openai_api
+    openai_api._complete_with_image(openai_client, "Extract", screenshot, 100)
+    provider.files.clear()
+    assert openai_api._complete_with_image(openai_client, "Extract", screenshot, 100) == "answer from inline"
+    assert provider.inline_requests == 1
+
+def test_openai_bad_request_is_not_retried_inline(provider, openai_client, screenshot):
+    import openai
+    import openai_api
+    provider.bad_request = "Invalid value for 'max_output_tokens': must be at least 16"
+    with pytest.raises(openai.BadRequestError):
+        openai_api._complete_with_image(openai_client, "Extract", screenshot, 1)
+    assert provider.inline_requests == 0
+
+# --- Gemini SDK against the stand-in ---
+
+@pytest.fixture
+def gemini(provider, monkeypatch):
+    pytest.importorskip("google.generativeai")
+    import google.generativeai as genai
+    from google.generativeai import client as genai_client
+    from gemini_api import common
+    # Fresh SDK clients pointed at the stand-in (the File API upload reads the discovery document first)
+    monkeypatch.setattr(genai_client, "_client_manager", genai_client._ClientManager())
+    monkeypatch.setattr(genai_client, "GENAI_API_DISCOVERY_URL", f"{provider.url}/$discovery/rest")
+    genai.configure(api_key="test", transport="rest", client_options={"api_endpoint": provider.url})
+    monkeypatch.setattr(common, "gemini_uploads",
+                        UploadCache(common._upload_to_gemini, 60, name="Gemini"))
+    return common
+
+def test_gemini_upload_goes_through_file_api(provider, gemini):
+    uploaded = gemini._upload_to_gemini(IMAGE, "image/png")
+    assert uploaded.name == "files/1"
+    assert provider.files["files/1"] == IMAGE
+
+def test_gemini_request_references_uploaded_file(provider, gemini, screenshot):
+    model = gemini.GeminiModel("gemini-2.0-flash")
+    for _ in range(2):
+        assert gemini.generate_content_with_image(model, "Extract", screenshot).text == "answer from file"
+    assert provider.uploads == 1
+    assert provider.file_requests == 2
+
+def test_gemini_deleted_file_is_retried_inline(provider, gemini, screenshot):
+    model = gemini.GeminiModel("gemini-2.0-flash")
+    gemini.generate_content_with_image(model, "Extract", screenshot)
+    provider.files.clear()
+    assert gemini.generate_content_with_image(model, "Extract", screenshot).text == "answer from inline"
+    assert provider.inline_requests == 1
+
+def test_gemini_bad_request_is_not_retried_inline(provider, gemini, screenshot):
+    from google.api_core import exceptions
+    provider.bad_request = "Request contains an invalid argument."
+    with pytest.raises(exceptions.BadRequest):
+        gemini.generate_content_with_image(gemini.GeminiModel("gemini-2.0-flash"), "Extract", screenshot)
+    assert provider.inline_requests == 0
@@ -0,0 +1,179 @@
+# transcript_context.py
+# Token-budgeted transcript context for LLM prompts.
+# The most recent part of the transcript is kept verbatim; older segments are folded
+# into a rolling summary in the background as they age out of the recent window,
+# so prompt size stays roughly constant however long the session runs.
+import threading
+
+# Rough chars-per-token ratio for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 12000
+# Share of the budget reserved for the verbatim recent window
+DEFAULT_RECENT_TOKENS = 6000
+# Aged-out text is summarized once at least this many tokens have accumulated
+DEFAULT_SUMMARY_CHUNK_TOKENS = 1500
+
+def estimate_tokens(text):
+    """Approximate the number of LLM tokens in text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class TranscriptContextBuilder:
+    """
+    Builds prompt-ready transcript text within a token budget:
+    rolling summary of older segments + verbatim recent window.
+    """
+    def __init__(self, summarize_fn, token_budget=DEFAULT_TOKEN_BUDGET,
+                 recent_tokens=DEFAULT_RECENT_TOKENS,
+                 summary_chunk_tokens=DEFAULT_SUMMARY_CHUNK_TOKENS):
+        """
+        Parameters:
+        - summarize_fn: Callable (previous_summary, new_text) -> updated summary or None
+        - token_budget: Default maximum size of the built context
+        - recent_tokens: Size of the verbatim recent window
+        - summary_chunk_tokens: Minimum amount of aged-out text per summarization call
+        """
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.recent_tokens = recent_tokens
+        self.summary_chunk_tokens = summary_chunk_tokens
+
+        self._lock = threading.Lock()
+        self._segments = []           # (segment_id, text, tokens) in order
+        self._total_tokens = 0
+        self._summary = ""
+        self._summary_through_id = 0  # last segment ID folded into the summary
+        self._summarizing = False
+        self._generation = 0          # bumped on reset so stale summaries are discarded
+
+    # --- Transcript listener callbacks ---
+
+    def add_segment(self, segment):
+        """Track a new segment and schedule summarization of aged-out text if needed"""
+        text = segment.get("text", "").strip()
+        if not text:
+            return
+        tokens = estimate_tokens(text)
+        with self._lock:
+            self._segments.append((segment["id"], text, tokens))
+            self._total_tokens += tokens
+        self._maybe_start_summary()
+
+    def reset(self):
+        """Forget all segments and the summary"""
+        with self._lock:
+            self._segments = []
+            self._total_tokens = 0
+            self._summary = ""
+            self._summary_through_id = 0
+            self._generation += 1
+
+    # --- Context building ---
+
+    def build(self, token_budget=None):
+        """
+        Build transcript text for a prompt
+
+        Parameters:
+        - token_budget: Override for the default budget (0 or None uses the default;
+          a negative value disables the budget and returns the full transcript)
+
+        Returns:
+        - Transcript text no larger than the budget (approximately)
+        """
+        budget = token_budget or self.token_budget
+        with self._lock:
+            segments = list(self._segments)
+            total_tokens = self._total_tokens
+            summary = self._summary
+            summary_through_id = self._summary_through_id
+
+        if budget < 0 or total_tokens <= budget:
+            return "\n".join(text for _, text, _ in segments)
+
+        recent_start = self._recent_window_start(segments, min(self.recent_tokens, budget))
+        recent = segments[recent_start:]
+        older = segments[:recent_start]
+
+        remaining = budget - sum(tokens for _, _, tokens in recent)
+        summary_part = ""
+        if summary and remaining > 0:
+            summary_part = summary if estimate_tokens(summary) <= remaining else summary[-remaining * CHARS_PER_TOKEN:]
+            remaining -= estimate_tokens(summary_part)
+
+        # Aged-out segments the background summarizer hasn't reached yet:
+        # include as many of the newest ones as still fit
+        pending = [item for item in older if item[0] > summary_through_id]
+        pending_part = []
+        for segment_id, text, tokens in reversed(pending):
+            if tokens > remaining:
+                break
+            pending_part.append(text)
+            remaining -= tokens
+        pending_part.reverse()
+
+        sections = []
+        if summary_part:
+            sections.append(f"[Summary of earlier conversation]\n{summary_part}")
+        if pending_part:
+            sections.append("[Earlier transcript]\n" + "\n".join(pending_part))
+        sections.append("[Recent transcript]\n" + "\n".join(text for _, text, _ in recent))
+        return "\n\n".join(sections)
+
+    # --- Internal Helpers ---
+
+    @staticmethod
+    def _recent_window_start(segments, recent_tokens):
+        """Index of the first segment in the verbatim recent window"""
+        used = 0
+        index = len(segments)
+        while index > 0 and used + segments[index - 1][2] <= recent_tokens:
+            index -= 1
+            used += segments[index][2]
+        return index
+
+    def _maybe_start_summary(self):
+        """Start a background summarization if enough text has aged out of the recent window"""
+        with self._lock:
+            if self._summarizing:
+                return
+            recent_start = self._recent_window_start(self._segments, self.recent_tokens)
+            pending = [item for item in self._segments[:recent_start] if item[0] > self._summary_through_id]
+            if sum(tokens for _, _, tokens in pending) < self.summary_chunk_tokens:
+                return
+            # Cap each call so a summarizer that fell behind catches up in bounded steps
+            chunk = []
+            chunk_tokens = 0
+            for item in pending:
+                if chunk and chunk_tokens + item[2] > self.summary_chunk_tokens * 4:
+                    break
+                chunk.append(item)
+                chunk_tokens += item[2]
+            self._summarizing = True
+            previous_summary = self._summary
+            generation = self._generation
+
+        thread = threading.Thread(target=self._summarize_chunk, args=(previous_summary, chunk, generation))
+        thread.daemon = True
+        thread.start()
+
+    def _summarize_chunk(self, previous_summary, chunk, generation):
+        """Background task: fold chunk into the rolling summary"""
+        updated = None
+        try:
+            chunk_text = "\n".join(text for _, text, _ in chunk)
+            updated = self.summarize_fn(previous_summary, chunk_text)
+            with self._lock:
+                if updated and generation == self._generation:
+                    self._summary = updated
+                    self._summary_through_id = chunk[-1][0]
+                    print(f"Transcript summary updated through segment {self._summary_through_id}")
+        except Exception as e:
+            print(f"Error summarizing transcript: {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
+        # More text may have aged out while this chunk was being summarized;
+        # after a failure wait for the next segment instead of retrying in a loop
+        if updated:
+            self._maybe_start_summary()
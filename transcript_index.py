@@ -0,0 +1,154 @@
+# transcript_index.py
+# Incrementally updated inverted index over transcript segments with BM25 ranking.
+import math
+import re
+import threading
+
+# BM25 parameters (standard Okapi defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Common conversational words that carry no topic information
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been before being
+but by can could did do does doing don for from had has have having he her here
+him his how i if in into is it its just know let like me mean my no not now of
+off okay on one or our out really right say see she so some that the their them
+then there these they thing think this those to too um uh up us very want was
+we well were what when where which who why will with would yeah yes you your
+""".split())
+
+def tokenize(text):
+    """
+    Split text into lowercase index terms, dropping stopwords
+
+    Parameters:
+    - text: Text to tokenize
+
+    Returns:
+    - List of terms
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS and len(token) > 1]
+
+class TranscriptIndex:
+    """
+    Inverted index of transcript segments ranked with BM25.
+    Segments are added one at a time as they are transcribed; no rebuild is
+    needed until the transcript is reset.
+    """
+    def __init__(self):
+        """Create an empty index"""
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Drop every indexed segment"""
+        with self._lock:
+            self._postings = {}        # term -> {segment_id: term frequency}
+            self._doc_lengths = {}     # segment_id -> number of terms
+            self._segments = {}        # segment_id -> segment dict
+            self._ordered_ids = []     # segment IDs in arrival order
+            self._total_length = 0
+
+    def add_segment(self, segment):
+        """
+        Index a single transcript segment
+
+        Parameters:
+        - segment: Segment dict with id, text and timestamp
+        """
+        segment_id = segment.get("id")
+        if segment_id is None:
+            return
+        terms = tokenize(segment.get("text", ""))
+
+        with self._lock:
+            if segment_id in self._segments:
+                return
+            self._segments[segment_id] = segment
+            self._ordered_ids.append(segment_id)
+            self._doc_lengths[segment_id] = len(terms)
+            self._total_length += len(terms)
+
+            frequencies = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, {})[segment_id] = frequency
+
+    def __len__(self):
+        return len(self._segments)
+
+    def search(self, query, top_k=10):
+        """
+        Rank segments against a free-text query
+
+        Parameters:
+        - query: Search text
+        - top_k: Maximum number of results
+
+        Returns:
+        - List of (score, segment) tuples, best first
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if doc_count == 0:
+                return []
+            average_length = (self._total_length / doc_count) or 1.0
+
+            scores = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                # BM25 idf with the +1 smoothing that keeps it positive for common terms
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for segment_id, frequency in postings.items():
+                    length_norm = 1 - BM25_B + BM25_B * self._doc_lengths[segment_id] / average_length
+                    scores[segment_id] = scores.get(segment_id, 0.0) + idf * (
+                        frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm))
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [(score, self._segments[segment_id]) for segment_id, score in ranked]
+
+    def recent_segments(self, count):
+        """Return the last count indexed segments in chronological order"""
+        with self._lock:
+            return [self._segments[segment_id] for segment_id in self._ordered_ids[-count:]]
+
+    def build_retrieval_context(self, query, top_k=8, recent_count=12):
+        """
+        Build prompt transcript text from the top_k segments relevant to query
+        plus the most recent window, instead of the whole transcript.
+
+        Parameters:
+        - query: Text describing what the prompt is about (e.g. the current problem)
+        - top_k: Number of relevant older segments to include
+        - recent_count: Number of most recent segments always included verbatim
+
+        Returns:
+        - Transcript text in chronological order, with "..." marking skipped stretches
+        """
+        recent = self.recent_segments(recent_count)
+        recent_ids = {segment["id"] for segment in recent}
+        relevant = [segment for _, segment in self.search(query, top_k + len(recent_ids))
+                    if segment["id"] not in recent_ids][:top_k]
+
+        selected = sorted(relevant + recent, key=lambda segment: segment["id"])
+
+        lines = []
+        previous_id = None
+        for segment in selected:
+            # IDs within a session are consecutive, so a jump means segments were skipped
+            if previous_id is not None and segment["id"] > previous_id + 1:
+                lines.append("...")
+            lines.append(segment.get("text", ""))
+            previous_id = segment["id"]
+        return "\n".join(lines)
@@ -0,0 +1,209 @@
+# transcript_journal.py
+# Append-only JSONL journal for transcript segments.
+# Writes are batched by a single writer thread and made durable with one fsync per
+# batch (group commit), so the transcription thread never waits on the disk.
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_JOURNAL_PATH = os.path.join("transcripts", "transcript_journal.jsonl")
+# Rotate the active journal file once it grows past this many bytes
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+# Number of rotated files (journal.jsonl.1 ... .N) kept next to the active one
+DEFAULT_KEEP_FILES = 5
+# Maximum time a record waits in the queue before its batch is committed
+DEFAULT_COMMIT_INTERVAL = 0.2
+# Maximum number of records written per fsync
+DEFAULT_MAX_BATCH = 256
+
+class TranscriptJournal:
+    """
+    Append-only transcript journal with group commit, size-based rotation
+    and crash recovery.
+
+    Each line is a JSON record:
+    - {"type": "segment", "seq": 12, "timestamp": "...", "source": "...", "text": "..."}
+    - {"type": "reset", "timestamp": "..."} when the transcript is cleared
+    """
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, max_bytes=DEFAULT_MAX_BYTES,
+                 keep_files=DEFAULT_KEEP_FILES, commit_interval=DEFAULT_COMMIT_INTERVAL,
+                 max_batch=DEFAULT_MAX_BATCH):
+        """Open (or create) the journal at path and start the writer thread"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._file = open(self.path, "ab")
+        self._terminate_torn_line()
+
+        self._writer_thread = threading.Thread(target=self._writer_loop)
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+    # --- Public API ---
+
+    def append_segment(self, segment, source):
+        """
+        Queue a transcript segment for the next group commit.
+
+        Parameters:
+        - segment: Segment dict with id, text and timestamp
+        - source: Where the segment came from (e.g. the recording device)
+        """
+        self._queue.put({
+            "type": "segment",
+            "seq": segment["id"],
+            "timestamp": segment["timestamp"],
+            "source": source,
+            "text": segment["text"]
+        })
+
+    def append_reset(self):
+        """Queue a reset marker; recovery ignores every segment written before it."""
+        self._queue.put({
+            "type": "reset",
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    def flush(self, timeout=5.0):
+        """Block until every record queued so far has been committed to disk"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Commit pending records and stop the writer thread"""
+        if self._closed.is_set():
+            return
+        self.flush()
+        self._closed.set()
+        self._queue.put(None)
+        self._writer_thread.join(timeout=5.0)
+        self._file.close()
+
+    def recover(self):
+        """
+        Rebuild the current session from the journal files on disk.
+
+        Returns:
+        - (segments, last_seq): the segments after the most recent reset marker,
+          and the highest sequence number ever written (so IDs keep increasing)
+        """
+        segments = []
+        last_seq = 0
+        for file_path in self._journal_files_oldest_first():
+            with open(file_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write from a crash mid-line; the rest of the batch was never committed
+                        continue
+
+                    if record.get("type") == "reset":
+                        segments = []
+                    elif record.get("type") == "segment":
+                        seq = record.get("seq", 0)
+                        last_seq = max(last_seq, seq)
+                        segments.append({
+                            "id": seq,
+                            "text": record.get("text", ""),
+                            "timestamp": record.get("timestamp", ""),
+                            "source": record.get("source", "")
+                        })
+        return segments, last_seq
+
+    # --- Internal Helpers ---
+
+    def _journal_files_oldest_first(self):
+        """Rotated files (highest suffix is oldest) followed by the active file"""
+        files = []
+        for index in range(self.keep_files, 0, -1):
+            rotated = f"{self.path}.{index}"
+            if os.path.exists(rotated):
+                files.append(rotated)
+        if os.path.exists(self.path):
+            files.append(self.path)
+        return files
+
+    def _terminate_torn_line(self):
+        """End a partial last line left by a crash so the next record starts on its own line"""
+        if self._file.tell() == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                self._file.write(b"\n")
+                self._file.flush()
+
+    def _writer_loop(self):
+        """Collect queued records into batches and commit each batch with a single fsync"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.commit_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    # flush() marker: commit now instead of waiting for more records
+                    waiters.append(item)
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    print(f"Error writing transcript journal: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+    def _commit(self, batch):
+        """Write a batch of records, fsync once, and rotate if the file is too large"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch)
+        self._file.write(data.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """Shift journal.jsonl -> .1 -> .2 ... and start a fresh active file"""
+        self._file.close()
+        oldest = f"{self.path}.{self.keep_files}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.keep_files - 1, 0, -1):
+            rotated = f"{self.path}.{index}"
+            if os.path.exists(rotated):
+                os.replace(rotated, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "ab")
+        print(f"Rotated transcript journal: {self.path}")
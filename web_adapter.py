@@ -1,15 +1,209 @@
 # web_adapter.py
 from datetime import datetime
+import bisect
 import threading
 
 # Import the WhisperTranscriber class from your existing file
 from record_and_transcript import WhisperTranscriber
+from transcript_journal import TranscriptJournal, DEFAULT_JOURNAL_PATH
 
 # Global variables to store transcriptions
 transcriptions = []
 transcription_lock = threading.Lock()
 is_recording = False
 
+# Condition sharing transcription_lock, notified whenever segments are appended or cleared.
+# Streaming clients (SSE) wait on it instead of polling.
+transcription_condition = threading.Condition(transcription_lock)
+
+# Segment IDs keep increasing across clears so that a reconnecting client's
+# Last-Event-ID never collides with a segment from a newer session.
+_next_segment_id = 1
+# Incremented on every clear so streams can tell the browser to drop its history.
+transcription_reset_count = 0
+
+# Durable append-only journal of segments (None until init_transcript_journal is called)
+transcript_journal = None
+
+# Callbacks keeping derived structures (search index, context builders, ...) in sync.
+# Each entry is (on_segment, on_reset); both are called outside transcription_lock.
+transcription_listeners = []
+
+def add_transcription_listener(on_segment, on_reset=None, replay=True):
+    """
+    Register callbacks for transcript changes.
+
+    Parameters:
+    - on_segment: Called with each new segment dict
+    - on_reset: Called with no arguments when the transcript is cleared or rebuilt
+    - replay: If True, on_segment is first called for every segment already stored
+      (and again for recovered segments after a rebuild)
+    """
+    with transcription_lock:
+        transcription_listeners.append((on_segment, on_reset, replay))
+        existing = list(transcriptions) if replay else []
+    for segment in existing:
+        on_segment(segment)
+
+def _notify_segment(segment):
+    for on_segment, _, _ in list(transcription_listeners):
+        try:
+            on_segment(segment)
+        except Exception as e:
+            print(f"Error in transcription listener: {e}")
+
+def _notify_reset(segments):
+    """Tell listeners the transcript was replaced by segments (empty after a clear)"""
+    for on_segment, on_reset, replay in list(transcription_listeners):
+        try:
+            if on_reset:
+                on_reset()
+            for segment in (segments if replay else []):
+                on_segment(segment)
+        except Exception as e:
+            print(f"Error in transcription listener: {e}")
+
+def init_transcript_journal(path=DEFAULT_JOURNAL_PATH, **journal_options):
+    """
+    Open the transcript journal and rebuild the in-memory transcriptions from it.
+
+    Parameters:
+    - path: Path of the active journal file
+    - journal_options: Extra TranscriptJournal options (max_bytes, keep_files, ...)
+
+    Returns:
+    - Number of segments recovered
+    """
+    global transcript_journal, _next_segment_id
+    if transcript_journal is not None:
+        return len(transcriptions)
+
+    journal = TranscriptJournal(path, **journal_options)
+    recovered_segments, last_seq = journal.recover()
+
+    with transcription_condition:
+        transcriptions[:] = recovered_segments
+        _next_segment_id = max(_next_segment_id, last_seq + 1)
+        transcription_condition.notify_all()
+    _notify_reset(recovered_segments)
+
+    transcript_journal = journal
+    print(f"Recovered {len(recovered_segments)} transcript segments from {path}")
+    return len(recovered_segments)
+
+def close_transcript_journal():
+    """Commit any pending journal records (called on shutdown)"""
+    global transcript_journal
+    if transcript_journal is not None:
+        transcript_journal.close()
+        transcript_journal = None
+
+def append_transcription(text, timestamp=None, source="whisper"):
+    """
+    Append a new transcript segment, journal it and wake up any waiting stream clients.
+
+    Parameters:
+    - text: The transcribed text
+    - timestamp: Optional "%Y-%m-%d %H:%M:%S" timestamp (defaults to now)
+    - source: Where the segment came from (e.g. the recording device)
+
+    Returns:
+    - The stored segment dict (id, text, timestamp, source)
+    """
+    global _next_segment_id
+    if timestamp is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with transcription_condition:
+        segment = {
+            "id": _next_segment_id,
+            "text": text,
+            "timestamp": timestamp,
+            "source": source
+        }
+        _next_segment_id += 1
+        transcriptions.append(segment)
+        # Enqueue under the lock so journal order always matches segment IDs
+        if transcript_journal is not None:
+            transcript_journal.append_segment(segment, source)
+        transcription_condition.notify_all()
+    _notify_segment(segment)
+    return segment
+
+def clear_transcriptions():
+    """Clear all transcript segments and notify stream clients of the reset."""
+    global transcription_reset_count
+    with transcription_condition:
+        transcriptions.clear()
+        transcription_reset_count += 1
+        if transcript_journal is not None:
+            transcript_journal.append_reset()
+        transcription_condition.notify_all()
+    _notify_reset([])
+
+def get_last_segment_id():
+    """Return the ID of the most recently assigned segment (0 if none yet)."""
+    return _next_segment_id - 1
+
+def get_transcriptions_after(last_id):
+    """
+    Return the segments with an ID greater than last_id.
+    Must be called with transcription_lock held.
+
+    Parameters:
+    - last_id: The last segment ID the caller has seen (0 for all)
+
+    Returns:
+    - List of segment dicts in chronological order
+    """
+    # Segment IDs are strictly increasing, so a binary search finds the resume point
+    start = bisect.bisect_right(transcriptions, last_id, key=lambda t: t.get("id", 0))
+    return transcriptions[start:]
+
+def get_transcriptions_in_range(first_id, last_id=None):
+    """
+    Return the segments with first_id <= ID <= last_id (takes transcription_lock).
+
+    Parameters:
+    - first_id: First segment ID of the range
+    - last_id: Last segment ID of the range (None for everything up to now)
+
+    Returns:
+    - List of segment dicts in chronological order
+    """
+    with transcription_lock:
+        start = bisect.bisect_left(transcriptions, first_id, key=lambda t: t.get("id", 0))
+        if last_id is None:
+            return transcriptions[start:]
+        end = bisect.bisect_right(transcriptions, last_id, key=lambda t: t.get("id", 0))
+        return transcriptions[start:end]
+
+def get_recent_transcriptions(seconds):
+    """
+    Return the segments transcribed in the last `seconds` seconds (takes transcription_lock).
+
+    Parameters:
+    - seconds: Size of the time window
+
+    Returns:
+    - List of segment dicts in chronological order
+    """
+    current_time = datetime.now()
+    recent = []
+    with transcription_lock:
+        # Segments are in time order, so scan back from the newest and stop at the window edge
+        for transcript in reversed(transcriptions):
+            try:
+                transcript_time = datetime.strptime(transcript["timestamp"], "%Y-%m-%d %H:%M:%S")
+            except (ValueError, KeyError) as e:
+                print(f"Error parsing timestamp: {e}")
+                continue
+            if (current_time - transcript_time).total_seconds() > seconds:
+                break
+            recent.append(transcript)
+    recent.reverse()
+    return recent
+
 class WebTranscriber:
     """
     A wrapper class around WhisperTranscriber that adds web functionality
@@ -82,15 +276,10 @@ class WebTranscriber:
             
             text = transcript.text.strip()
             if text:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 print(f"\nTranscription: {text}")
                 
-                # Add to global transcriptions list with timestamp
-                with transcription_lock:
-                    transcriptions.append({
-                        "text": text,
-                        "timestamp": timestamp
-                    })
+                # Add to global transcriptions list with timestamp (also journals it and notifies stream clients)
+                append_transcription(text, source=self.transcriber.device_name)
                 
                 # Also add to the original text queue for file saving
                 self.transcriber.text_queue.put(text)